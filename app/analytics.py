@@ -0,0 +1,127 @@
+# app/analytics.py
+"""Visual acuity trend analytics computed column-wise with NumPy/pandas."""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import models
+
+# 測定距離（cm）-> test_type
+DISTANCE_LABELS = {30: "30cm", 300: "3m"}
+
+# 変化率は30日あたりで表す
+RATE_DAYS = 30
+
+
+def load_eye_test_frame(db: Session, child_id: int) -> pd.DataFrame:
+    """子供の視力チェック履歴を列ごとの配列として読み込む（古い順）"""
+    EyeTest = models.EyeTest
+    rows = db.execute(
+        select(EyeTest.test_id, EyeTest.check_date, EyeTest.left_eye, EyeTest.right_eye, EyeTest.test_distance_cm)
+        .where(EyeTest.child_id == child_id)
+        .order_by(EyeTest.check_date, EyeTest.test_id)
+    ).all()
+    frame = pd.DataFrame(rows, columns=["test_id", "check_date", "left_eye", "right_eye", "test_distance_cm"])
+    frame["check_date"] = pd.to_datetime(frame["check_date"])
+    for column in ("left_eye", "right_eye", "test_distance_cm"):
+        frame[column] = pd.to_numeric(frame[column], errors="coerce").astype(float)
+    return frame
+
+
+def _value(value) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(float(value), 3)
+
+
+def _values(series: pd.Series) -> List[Optional[float]]:
+    return [_value(v) for v in series.to_numpy(dtype=float)]
+
+
+def _slope_per_period(days: np.ndarray, values: np.ndarray) -> Optional[float]:
+    """最小二乗の傾き（30日あたり）。2日以上の測定がなければNone"""
+    mask = ~np.isnan(values)
+    if mask.sum() < 2 or np.ptp(days[mask]) == 0:
+        return None
+    slope, _ = np.polyfit(days[mask], values[mask], 1)
+    return _value(slope * RATE_DAYS)
+
+
+def compute_eye_trends(frame: pd.DataFrame, window: int = 3) -> dict:
+    """移動平均・左右差・変化率（30日あたり）と、3m / 30cm ごとの比較
+
+    距離が違う測定は比べられないので、移動平均と変化率は測定距離ごとに計算する。
+    """
+    if frame.empty:
+        return {"count": 0, "window": window, "mean_divergence": None, "series": [], "by_distance": []}
+
+    eyes = ["left_eye", "right_eye"]
+    days = (frame["check_date"] - frame["check_date"].iloc[0]).dt.days.astype(float)
+    # 距離不明（古いデータ）は -1 のグループにまとめる
+    distance_key = frame["test_distance_cm"].fillna(-1)
+    grouped = frame[eyes].groupby(distance_key)
+
+    moving_avg = grouped.transform(lambda s: s.rolling(window, min_periods=1).mean())
+    # 前回（同じ距離）との差 / 経過日数 × 30。同じ日の再測定は変化率なし
+    elapsed = days.groupby(distance_key).diff().replace(0, np.nan)
+    rate = grouped.diff().div(elapsed, axis=0) * RATE_DAYS
+    average = frame[eyes].mean(axis=1)
+    divergence = frame["left_eye"] - frame["right_eye"]
+
+    columns = {
+        "left_eye": _values(frame["left_eye"]),
+        "right_eye": _values(frame["right_eye"]),
+        "average": _values(average),
+        "left_moving_avg": _values(moving_avg["left_eye"]),
+        "right_moving_avg": _values(moving_avg["right_eye"]),
+        "divergence": _values(divergence),
+        "left_rate": _values(rate["left_eye"]),
+        "right_rate": _values(rate["right_eye"]),
+    }
+    series = [
+        {
+            "test_id": int(test_id),
+            "check_date": check_date.date(),
+            "test_type": DISTANCE_LABELS.get(int(distance)),
+            **{name: values[i] for name, values in columns.items()},
+        }
+        for i, (test_id, check_date, distance) in enumerate(zip(frame["test_id"], frame["check_date"], distance_key))
+    ]
+
+    by_distance = []
+    day_values = days.to_numpy()
+    for distance_cm, label in DISTANCE_LABELS.items():
+        mask = (distance_key == distance_cm).to_numpy()
+        if not mask.any():
+            continue
+        group = frame[mask]
+        by_distance.append({
+            "test_type": label,
+            "count": int(mask.sum()),
+            "left_mean": _value(group["left_eye"].mean()),
+            "right_mean": _value(group["right_eye"].mean()),
+            "latest_average": _value(average[mask].iloc[-1]),
+            "trend_per_30_days": _slope_per_period(day_values[mask], average[mask].to_numpy(dtype=float)),
+        })
+
+    return {
+        "count": len(frame),
+        "window": window,
+        "mean_divergence": _value(divergence.abs().mean()),
+        "series": series,
+        "by_distance": by_distance,
+    }
+
+
+def get_eye_trends(db: Session, child_id: int, window: int = 3) -> Dict:
+    return compute_eye_trends(load_eye_test_frame(db, child_id), window)
+
+
+def eye_test_fingerprint(db: Session, child_id: int) -> Tuple[Optional[int], int]:
+    """最新のtest_idと件数。child_idの索引だけで答えられ、どのワーカーの追加・削除でも変わる"""
+    EyeTest = models.EyeTest
+    latest, count = db.execute(
+        select(func.max(EyeTest.test_id), func.count()).where(EyeTest.child_id == child_id)
+    ).one()
+    return latest, count
@@ -0,0 +1,71 @@
+# app/auth_purge.py
+"""Deletes expired verification codes and refresh tokens.
+
+Both tables get a row per login / verify-code and nothing else removes them.
+Rows are deleted oldest first in batches of AUTH_PURGE_BATCH_SIZE, each in its
+own short transaction, so locks are held only for one batch. Several workers
+may run this at once; they just delete fewer rows each, and a pass stops at
+the first short batch, leaving any remainder to the next run.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+
+from app import crud, models
+from app.background import PeriodicTask, register
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+AUTH_PURGE_INTERVAL_SECONDS = int(os.getenv("AUTH_PURGE_INTERVAL_SECONDS", "3600"))
+AUTH_PURGE_BATCH_SIZE = int(os.getenv("AUTH_PURGE_BATCH_SIZE", "1000"))
+
+# result key -> (model, primary key column)
+PURGE_TARGETS = {
+    "verification_codes": (models.VerificationCode, models.VerificationCode.verification_id),
+    "refresh_tokens": (models.RefreshToken, models.RefreshToken.token_id),
+}
+
+
+def purge_expired_auth_rows(
+    session_factory=SessionLocal,
+    now: Optional[datetime] = None,
+    batch_size: int = AUTH_PURGE_BATCH_SIZE,
+) -> dict:
+    """One purge pass; returns rows removed per table"""
+    start = time.perf_counter()
+    # expires_at is stored in UTC (see crud.store_verification_code / store_refresh_token)
+    now = now or datetime.utcnow()
+    result = {name: 0 for name in PURGE_TARGETS}
+    batches = 0
+
+    db = session_factory()
+    try:
+        for name, (model, id_column) in PURGE_TARGETS.items():
+            while True:
+                deleted = crud.delete_expired_batch(db, model, id_column, now, batch_size)
+                db.commit()
+                if not deleted:
+                    break
+                result[name] += deleted
+                batches += 1
+                if deleted < batch_size:
+                    break
+    finally:
+        db.close()
+
+    result["batches"] = batches
+    result["duration_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    if batches:
+        logger.info(
+            "Purged %d verification codes and %d refresh tokens in %.1f ms",
+            result["verification_codes"], result["refresh_tokens"], result["duration_ms"],
+        )
+    return result
+
+
+auth_purger = register(
+    PeriodicTask("auth_purge", purge_expired_auth_rows, AUTH_PURGE_INTERVAL_SECONDS)
+)
@@ -0,0 +1,98 @@
+# app/background.py
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicTask:
+    """Runs a blocking function every interval_seconds on a worker thread.
+
+    Started and stopped from the app lifespan; each worker process runs its own
+    copy, so the function must be safe to run concurrently (e.g. SKIP LOCKED).
+    An interval of 0 or less disables the task. With run_on_stop the function
+    runs once more on shutdown (e.g. to flush buffered writes).
+    """
+
+    def __init__(self, name: str, func: Callable[[], Any], interval_seconds: float, run_on_stop: bool = False):
+        self.name = name
+        self.func = func
+        self.interval_seconds = interval_seconds
+        self.run_on_stop = run_on_stop
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.errors = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_result: Any = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self):
+        if self.interval_seconds <= 0 or self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._loop(), name=self.name)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.run_on_stop:
+            await self.run_once()
+
+    async def run_once(self) -> Any:
+        start = time.perf_counter()
+        try:
+            self.last_result = await asyncio.to_thread(self.func)
+        except Exception:
+            self.errors += 1
+            logger.exception("Background task %s failed", self.name)
+        finally:
+            self.runs += 1
+            self.last_run_at = datetime.now()
+            self.last_duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        return self.last_result
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.run_once()
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval_seconds,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run_at": self.last_run_at,
+            "last_duration_ms": self.last_duration_ms,
+            "last_result": self.last_result,
+        }
+
+
+# name -> task, started/stopped together by the lifespan
+background_tasks: Dict[str, PeriodicTask] = {}
+
+
+def register(task: PeriodicTask) -> PeriodicTask:
+    background_tasks[task.name] = task
+    return task
+
+
+def start_all():
+    for task in background_tasks.values():
+        task.start()
+
+
+async def stop_all():
+    for task in background_tasks.values():
+        await task.stop()
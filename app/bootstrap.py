@@ -0,0 +1,115 @@
+# app/bootstrap.py
+"""Schema creation and demo seeding, run once per deployment.
+
+Workers compare a fingerprint of the current models and seed data with the one
+stored in `app_meta` and skip all schema/seed work when they match. The work
+itself is serialized with a MySQL named lock so workers that boot together
+don't race each other. Deployments can also run it ahead of time with
+`python -m app.bootstrap` and set RUN_BOOTSTRAP_ON_STARTUP=false.
+"""
+import hashlib
+import logging
+import os
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app import crud, models
+from app.database import Base, SessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+RUN_BOOTSTRAP_ON_STARTUP = os.getenv("RUN_BOOTSTRAP_ON_STARTUP", "true").lower() == "true"
+
+# Bump when crud.init_db seeds different data
+SEED_VERSION = "1"
+FINGERPRINT_KEY = "schema_fingerprint"
+LOCK_NAME = "merelax_bootstrap"
+LOCK_TIMEOUT_SECONDS = 60
+
+# Result of the last startup run (exposed via /metrics/startup)
+startup_report = {}
+
+
+def schema_fingerprint(bind=None) -> str:
+    """DDL of every model plus the seed version, hashed"""
+    bind = bind or engine
+    digest = hashlib.sha256()
+    for table in sorted(Base.metadata.tables.values(), key=lambda t: t.name):
+        digest.update(str(CreateTable(table).compile(dialect=bind.dialect)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name or ""):
+            digest.update(str(CreateIndex(index).compile(dialect=bind.dialect)).encode())
+    digest.update(f"seed:{SEED_VERSION}".encode())
+    return digest.hexdigest()
+
+
+def stored_fingerprint(bind=None):
+    bind = bind or engine
+    if not inspect(bind).has_table(models.AppMeta.__tablename__):
+        return None
+    with bind.connect() as conn:
+        return conn.execute(
+            text("SELECT meta_value FROM app_meta WHERE meta_key = :key"),
+            {"key": FINGERPRINT_KEY}
+        ).scalar()
+
+
+@contextmanager
+def bootstrap_lock(bind=None):
+    """Serialize bootstrap across workers (MySQL named lock, no-op on SQLite)"""
+    bind = bind or engine
+    if bind.dialect.name != "mysql":
+        yield
+        return
+
+    with bind.connect() as conn:
+        acquired = conn.execute(
+            text("SELECT GET_LOCK(:name, :timeout)"),
+            {"name": LOCK_NAME, "timeout": LOCK_TIMEOUT_SECONDS}
+        ).scalar()
+        if not acquired:
+            raise RuntimeError("Timed out waiting for the bootstrap lock")
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+
+
+def run_startup(bind=None, session_factory=None) -> dict:
+    """Create tables and seed demo data unless the stored fingerprint already matches"""
+    bind = bind or engine
+    session_factory = session_factory or SessionLocal
+    start = time.perf_counter()
+
+    fingerprint = schema_fingerprint(bind)
+    status = "skipped"
+    if stored_fingerprint(bind) != fingerprint:
+        with bootstrap_lock(bind):
+            # Another worker may have finished while we waited for the lock
+            if stored_fingerprint(bind) != fingerprint:
+                Base.metadata.create_all(bind=bind)
+                db = session_factory()
+                try:
+                    crud.init_db(db)
+                    db.merge(models.AppMeta(meta_key=FINGERPRINT_KEY, meta_value=fingerprint))
+                    db.commit()
+                finally:
+                    db.close()
+                status = "applied"
+
+    duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    startup_report.clear()
+    startup_report.update({
+        "status": status,
+        "fingerprint": fingerprint,
+        "duration_ms": duration_ms,
+    })
+    logger.info("Startup bootstrap %s in %.1f ms", status, duration_ms)
+    return dict(startup_report)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(run_startup())
@@ -0,0 +1,64 @@
+# app/bulk.py
+"""Per-item validation and results for the bulk ingestion endpoints"""
+from typing import Any, Callable, Dict, List, Set, Tuple, Type
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+
+
+def validate_items(items: List[Dict[str, Any]], model: Type[BaseModel]) -> Tuple[List[Tuple[int, BaseModel]], Dict[int, schemas.BulkItemResult]]:
+    """Validate every item; returns the valid (index, item) pairs and results for the invalid ones"""
+    valid = []
+    results = {}
+    for index, raw in enumerate(items):
+        try:
+            valid.append((index, model.model_validate(raw)))
+        except ValidationError as e:
+            results[index] = invalid(index, [
+                f"{'.'.join(str(loc) for loc in error['loc'])}: {error['msg']}" for error in e.errors()
+            ])
+    return valid, results
+
+
+def invalid(index: int, errors: List[str]) -> schemas.BulkItemResult:
+    return schemas.BulkItemResult(index=index, status="invalid", errors=errors)
+
+
+def created(index: int) -> schemas.BulkItemResult:
+    return schemas.BulkItemResult(index=index, status="created")
+
+
+def build_response(results: Dict[int, schemas.BulkItemResult]) -> schemas.BulkResponse:
+    ordered = [results[index] for index in sorted(results)]
+    created_count = sum(1 for result in ordered if result.status == "created")
+    return schemas.BulkResponse(created=created_count, failed=len(ordered) - created_count, results=ordered)
+
+
+def store_items(
+    db: Session,
+    model,
+    valid: List[Tuple[int, BaseModel]],
+    results: Dict[int, schemas.BulkItemResult],
+    to_row: Callable[[BaseModel], dict],
+) -> Set[int]:
+    """Check the children exist, then write every remaining item with one multi-row INSERT.
+
+    Returns the child_ids that got new rows; their home data versions are bumped in the same transaction.
+    """
+    known_children = crud.existing_child_ids(db, {item.child_id for _, item in valid})
+    rows = []
+    for index, item in valid:
+        if item.child_id not in known_children:
+            results[index] = invalid(index, ["child_id: Child not found"])
+            continue
+        rows.append((index, to_row(item)))
+
+    child_ids = {row["child_id"] for _, row in rows}
+    crud.insert_many(db, model, [row for _, row in rows])
+    crud.bump_home_versions(db, child_ids)
+    db.commit()
+    for index, _ in rows:
+        results[index] = created(index)
+    return child_ids
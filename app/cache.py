@@ -0,0 +1,110 @@
+# app/cache.py
+import os
+import threading
+from typing import Any, Callable, Hashable
+
+from cachetools import TTLCache
+
+# Authenticated principal cache (get_current_user)
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "1024"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
+# Home screen missions / last results cache (GET /home/{child_id})
+HOME_CACHE_SIZE = int(os.getenv("HOME_CACHE_SIZE", "2048"))
+HOME_CACHE_TTL_SECONDS = int(os.getenv("HOME_CACHE_TTL_SECONDS", "300"))
+
+# Recently revoked / rotated refresh token IDs (POST /auth/refresh, /auth/logout)
+REVOKED_TOKEN_CACHE_SIZE = int(os.getenv("REVOKED_TOKEN_CACHE_SIZE", "10000"))
+REVOKED_TOKEN_CACHE_TTL_SECONDS = int(os.getenv("REVOKED_TOKEN_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Eye test trend analytics cache (GET /analytics/eyetests/{child_id})
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "512"))
+ANALYTICS_CACHE_TTL_SECONDS = int(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", "3600"))
+
+_MISSING = object()
+
+
+class LocalCache:
+    """Thread-safe in-process LRU cache with a TTL and hit/miss counters.
+
+    Entries live in a single worker process, so invalidation only reaches the
+    worker that handled the write; the TTL bounds staleness across workers.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._cache.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._cache[key] = value
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            return self._cache.pop(key, default)
+
+    def invalidate_where(self, predicate: Callable[[Hashable, Any], bool]) -> int:
+        """Drop every entry for which predicate(key, value) is true"""
+        with self._lock:
+            keys = [k for k, v in self._cache.items() if predicate(k, v)]
+            for key in keys:
+                self._cache.pop(key, None)
+            return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": self._cache.currsize,
+                "maxsize": self._cache.maxsize,
+                "ttl_seconds": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# token hash -> Parent snapshot
+principal_cache = LocalCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+
+def invalidate_principal(parent_id: int) -> int:
+    """Forget every cached token of a parent after their record changes"""
+    return principal_cache.invalidate_where(lambda _, parent: parent.parent_id == parent_id)
+
+
+# jti -> True. Only a shortcut for rejecting replays: refresh_tokens stays the source of truth,
+# so an entry that was evicted or lives in another worker is still rejected by the database.
+revoked_refresh_tokens = LocalCache(REVOKED_TOKEN_CACHE_SIZE, REVOKED_TOKEN_CACHE_TTL_SECONDS)
+
+
+# (child_id, date) -> (version, missions, last_results); the date in the key rolls missions over
+# at midnight. Eye test, distance check, exercise and screen time writes bump the child's
+# home:<child_id> row in cache_versions, and an entry is only served while its version matches,
+# so a write on any worker is seen by every worker's next read.
+# The cost of that: a hit is still one primary-key query (the version), only the home data
+# query is skipped, and every such write upserts one cache_versions row per child.
+home_cache = LocalCache(HOME_CACHE_SIZE, HOME_CACHE_TTL_SECONDS)
+
+
+# (child_id, window) -> (fingerprint, computed trends). The fingerprint is the child's latest
+# EyeTest test_id and row count, re-read on every request, so an eye test written or deleted
+# on any worker makes the entry stale.
+eye_analytics_cache = LocalCache(ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL_SECONDS)
@@ -1,22 +1,101 @@
 # app/crud.py
-from sqlalchemy.orm import Session
-from sqlalchemy import func, distinct
-from datetime import date, datetime, timedelta
-from typing import List, Tuple, Optional
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import func, delete, distinct, insert, select, update, bindparam, and_, or_
+from sqlalchemy.dialects import mysql, sqlite
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+import math
+from typing import Dict, Iterable, List, Tuple, Optional
 from app import models, schemas, utils
+from app.cache import invalidate_principal
+from app.screentime_alerts import ActiveSession
+
+# すべてのエクササイズタイプ
+EXERCISE_TYPES = ["distance_view", "blink", "eye_tracking"]
+
+# この分数以上続いたスクリーンタイムはアラート扱い
+SCREENTIME_ALERT_MINUTES = 30
+
+# exercise_id -> exercise_type（Exerciseはマスタデータなのでプロセス内で保持）
+_exercise_type_cache: Dict[int, str] = {}
+
+def insert_or_ignore(db: Session, model, values: dict, conflict_columns: List[str]) -> bool:
+    """一意制約に反する行は無視してINSERT（1往復）。挿入できたらTrue"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(model).values(**values).prefix_with("IGNORE")
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).values(**values).on_conflict_do_nothing(index_elements=conflict_columns)
+    else:
+        stmt = insert(model).values(**values)
+    return db.execute(stmt).rowcount == 1
+
+def insert_many(db: Session, model, rows: List[dict]):
+    """複数行を1つのINSERT文で追加（コミットは呼び出し側）"""
+    if rows:
+        db.execute(insert(model).values(rows))
+
+def existing_child_ids(db: Session, child_ids) -> set:
+    """存在する child_id だけを返す（1クエリ）"""
+    if not child_ids:
+        return set()
+    return set(db.scalars(select(models.Child.child_id).where(models.Child.child_id.in_(child_ids))))
+
+def upsert_add(db: Session, model, rows: List[dict], key_columns: List[str]):
+    """キーが同じ行があれば残りの列を加算、なければINSERT（複数行を1往復）"""
+    if not rows:
+        return
+    add_columns = [c for c in rows[0] if c not in key_columns]
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update({c: getattr(model, c) + stmt.inserted[c] for c in add_columns})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=key_columns,
+            set_={c: getattr(model, c) + stmt.excluded[c] for c in add_columns}
+        )
+    else:
+        for row in rows:
+            updated = db.query(model)\
+                .filter_by(**{c: row[c] for c in key_columns})\
+                .update({getattr(model, c): getattr(model, c) + row[c] for c in add_columns}, synchronize_session=False)
+            if not updated:
+                db.add(model(**row))
+        return
+    db.execute(stmt)
 
 def get_exercise_stats(db: Session, child_id: int) -> dict:
-    """統計情報を計算"""
-    
-    # 連続実施日数を計算
-    consecutive_days = calculate_consecutive_days(db, child_id)
-    
-    # 今週の実施日数を計算
-    this_week_count = calculate_this_week_count(db, child_id)
-    
+    """統計情報を取得（ExerciseStreakの主キー参照のみ）"""
+    streak = db.get(models.ExerciseStreak, child_id)
+    if streak is None:
+        # 集計レコードがまだない子供（既存データ）は履歴から一度だけ作成
+        streak = rebuild_exercise_streak(db, child_id)
+        if streak.last_exercise_date is not None:
+            db.add(streak)
+            db.commit()
+
+    return exercise_stats_from_streak(streak)
+
+def exercise_stats_from_streak(streak: models.ExerciseStreak, today: Optional[date] = None) -> dict:
+    """集計レコードから統計情報を計算"""
+    today = today or date.today()
+    last_date = streak.last_exercise_date
+
+    # 連続実施日数: 最後の実施日が今日か昨日なら連続中
+    if last_date in (today, today - timedelta(days=1)):
+        consecutive_days = streak.current_streak
+    else:
+        consecutive_days = 0
+
+    # 今週の実施日数
+    this_week_count = streak.week_count if streak.week_start == get_week_start(today) else 0
+
     # 今日の達成状況
-    today_completed, today_pending = get_today_status(db, child_id)
-    
+    today_completed = split_types(streak.last_day_types) if last_date == today else []
+    today_pending = [t for t in EXERCISE_TYPES if t not in today_completed]
+
     return {
         "consecutive_days": consecutive_days,
         "this_week_count": this_week_count,
@@ -24,110 +103,152 @@ def get_exercise_stats(db: Session, child_id: int) -> dict:
         "today_pending": today_pending
     }
 
-def calculate_consecutive_days(db: Session, child_id: int) -> int:
-    """連続実施日数を計算"""
+def get_week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())  # 月曜日
+
+def split_types(types: Optional[str]) -> List[str]:
+    return types.split(",") if types else []
+
+def get_exercise_type(db: Session, exercise_id: int) -> Optional[str]:
+    if exercise_id not in _exercise_type_cache:
+        exercise = db.get(models.Exercise, exercise_id)
+        if exercise is None:
+            return None
+        _exercise_type_cache[exercise_id] = exercise.exercise_type
+    return _exercise_type_cache[exercise_id]
+
+def rebuild_exercise_streak(db: Session, child_id: int, streak: Optional[models.ExerciseStreak] = None) -> models.ExerciseStreak:
+    """履歴全体から集計レコードを作成（初回と過去日付の記録時のみ）"""
+    streak = streak or models.ExerciseStreak(child_id=child_id)
+
     # 実施日一覧を取得（降順）
     logs = db.query(distinct(models.ExerciseLog.exercise_date))\
         .filter(models.ExerciseLog.child_id == child_id)\
         .order_by(models.ExerciseLog.exercise_date.desc())\
         .all()
-    
-    if not logs:
-        return 0
-    
     dates = [log[0] for log in logs]
-    today = date.today()
-    
-    # 今日から連続しているか確認
+
     if not dates:
-        return 0
-        
-    current_idx = 0
-    # If the latest log is not today or yesterday, streak is broken, unless we just want to count contiguous block from latest
-    # Usually apps allow "today" to be missing if checked in the morning, but let's stick to strict continuity from "today" or "yesterday"
-    
-    if dates[0] == today:
-        consecutive = 1
-        current_idx = 0
-    elif dates[0] == today - timedelta(days=1):
-        consecutive = 1 # Streak continues from yesterday? Or streak is 0 if not done today yet? 
-        # Requirement: "Continuous execution days". If I did it yesterday, streak is alive.
-        # Let's count backwards from dates[0]
-        consecutive = 1
-        current_idx = 0
-    else:
-        return 0 # Last log was before yesterday
-        
-    # Check previous dates
+        streak.current_streak = 0
+        streak.last_exercise_date = None
+        streak.last_day_types = None
+        streak.week_start = None
+        streak.week_count = 0
+        return streak
+
+    # 最新の実施日から遡って連続日数を数える
+    consecutive = 1
     for i in range(1, len(dates)):
-        diff = dates[i-1] - dates[i]
-        if diff.days == 1:
+        if (dates[i-1] - dates[i]).days == 1:
             consecutive += 1
         else:
             break
-            
-    return consecutive
-
-def calculate_this_week_count(db: Session, child_id: int) -> int:
-    """今週の実施日数を計算"""
-    today = date.today()
-    start_of_week = today - timedelta(days=today.weekday())  # 月曜日
-    end_of_week = start_of_week + timedelta(days=6)  # 日曜日
-    
-    count = db.query(func.count(distinct(models.ExerciseLog.exercise_date)))\
-        .filter(models.ExerciseLog.child_id == child_id)\
-        .filter(models.ExerciseLog.exercise_date >= start_of_week)\
-        .filter(models.ExerciseLog.exercise_date <= end_of_week)\
-        .scalar()
-    
-    return count or 0
-
-def get_today_status(db: Session, child_id: int) -> Tuple[List[str], List[str]]:
-    """今日の達成状況を取得"""
-    today = date.today()
-    
-    # 今日実施済みのエクササイズ
-    completed_logs = db.query(models.Exercise.exercise_type)\
+
+    last_date = dates[0]
+    week_start = get_week_start(last_date)
+    last_day_types = db.query(models.Exercise.exercise_type)\
         .join(models.ExerciseLog, models.ExerciseLog.exercise_id == models.Exercise.exercise_id)\
         .filter(models.ExerciseLog.child_id == child_id)\
-        .filter(models.ExerciseLog.exercise_date == today)\
+        .filter(models.ExerciseLog.exercise_date == last_date)\
         .all()
-    
-    completed = [log[0] for log in completed_logs]
-    
-    # すべてのエクササイズタイプ
-    all_types = ["distance_view", "blink", "eye_tracking"]
-    pending = [t for t in all_types if t not in completed]
-    
-    return completed, pending
+
+    streak.current_streak = consecutive
+    streak.last_exercise_date = last_date
+    streak.last_day_types = ",".join(t[0] for t in last_day_types)
+    streak.week_start = week_start
+    streak.week_count = len([d for d in dates if d >= week_start])
+    return streak
+
+def update_exercise_streak(db: Session, streak: models.ExerciseStreak, exercise_date: date, exercise_type: Optional[str]) -> models.ExerciseStreak:
+    """新しい実施記録を集計レコードへ差分反映"""
+    last_date = streak.last_exercise_date
+    if last_date and exercise_date < last_date:
+        # 過去日付の記録は履歴から作り直す
+        return rebuild_exercise_streak(db, streak.child_id, streak)
+
+    if last_date == exercise_date:
+        # 同じ日の別のエクササイズ
+        types = split_types(streak.last_day_types)
+        if exercise_type and exercise_type not in types:
+            streak.last_day_types = ",".join(types + [exercise_type])
+        return streak
+
+    # 新しい実施日
+    if last_date and (exercise_date - last_date).days == 1:
+        streak.current_streak += 1
+    else:
+        streak.current_streak = 1
+
+    week_start = get_week_start(exercise_date)
+    if streak.week_start == week_start:
+        streak.week_count += 1
+    else:
+        streak.week_start = week_start
+        streak.week_count = 1
+
+    streak.last_exercise_date = exercise_date
+    streak.last_day_types = exercise_type
+    return streak
 
 def log_exercise(db: Session, child_id: int, exercise_id: int, exercise_date: date) -> dict:
-    """エクササイズ実施を記録"""
-    # 既存レコードをチェック
-    existing = db.query(models.ExerciseLog)\
-        .filter(models.ExerciseLog.child_id == child_id)\
-        .filter(models.ExerciseLog.exercise_id == exercise_id)\
-        .filter(models.ExerciseLog.exercise_date == exercise_date)\
-        .first()
-    
-    if existing:
+    """エクササイズ実施を記録し、更新後の統計情報を同じトランザクションで返す"""
+    # INSERT IGNORE は外部キー違反も無視する（SQLiteは外部キー自体を検査しない）ので、
+    # 子供とエクササイズの存在を先にチェック（エクササイズはキャッシュ済み）
+    if not existing_child_ids(db, [child_id]):
+        raise ValueError(f"Child not found: {child_id}")
+    exercise_type = get_exercise_type(db, exercise_id)
+    if exercise_type is None:
+        raise ValueError(f"Unknown exercise_id: {exercise_id}")
+
+    # unique_child_exercise_date に任せて重複は無視（同時タップでもエラーにならない）
+    inserted = insert_or_ignore(
+        db,
+        models.ExerciseLog,
+        {"child_id": child_id, "exercise_id": exercise_id, "exercise_date": exercise_date},
+        ["child_id", "exercise_id", "exercise_date"]
+    )
+
+    if not inserted:
+        db.rollback()
         return {
             "success": False,
-            "message": "今日はもうやったよ！"
+            "message": "今日はもうやったよ！",
+            "stats": get_exercise_stats(db, child_id)
         }
-    
-    # 新規記録
-    new_log = models.ExerciseLog(
-        child_id=child_id,
-        exercise_id=exercise_id,
-        exercise_date=exercise_date
-    )
-    db.add(new_log)
+
+    # 集計レコードを行ロックして差分反映
+    streak = db.query(models.ExerciseStreak)\
+        .filter(models.ExerciseStreak.child_id == child_id)\
+        .with_for_update()\
+        .first()
+    if streak is None:
+        created = insert_or_ignore(
+            db,
+            models.ExerciseStreak,
+            {"child_id": child_id, "current_streak": 0, "week_count": 0},
+            ["child_id"]
+        )
+        streak = db.query(models.ExerciseStreak)\
+            .filter(models.ExerciseStreak.child_id == child_id)\
+            .with_for_update()\
+            .populate_existing()\
+            .one()
+        if created:
+            # 初めての集計: 既存の履歴（今回の記録を含む）から作成
+            rebuild_exercise_streak(db, child_id, streak)
+        else:
+            update_exercise_streak(db, streak, exercise_date, exercise_type)
+    else:
+        update_exercise_streak(db, streak, exercise_date, exercise_type)
+
+    stats = exercise_stats_from_streak(streak)
+    bump_home_versions(db, [child_id])
     db.commit()
-    
+
     return {
         "success": True,
-        "message": "よくできたね！"
+        "message": "よくできたね！",
+        "stats": stats
     }
 
 def init_db(db: Session):
@@ -188,8 +309,9 @@ def init_db(db: Session):
 def get_parent_by_email(db: Session, email: str):
     return db.query(models.Parent).filter(models.Parent.email == email).first()
 
-def create_parent(db: Session, user: schemas.UserRegister):
-    hashed_password = utils.get_password_hash(user.password)
+def create_parent(db: Session, user: schemas.UserRegister, hashed_password: Optional[str] = None):
+    # Callers on the async path hash on the bcrypt executor and pass the result in
+    hashed_password = hashed_password or utils.get_password_hash(user.password)
     db_user = models.Parent(email=user.email, password_hash=hashed_password)
     db.add(db_user)
     db.commit()
@@ -211,12 +333,13 @@ def update_parent_line_id(db: Session, parent_id: int, line_id: str):
         parent.updated_at = datetime.utcnow() # Update timestamp
         db.commit()
         db.refresh(parent)
+        invalidate_principal(parent_id)
     return parent
 
-def store_verification_code(db: Session, email: str, code: str, session_id: str):
+def store_verification_code(db: Session, email: str, code: str, session_id: str, ttl_seconds: int = 300):
     # Use lightweight SHA256 hashing instead of bcrypt for performance
     code_hash = utils.get_token_hash(code)
-    expires_at = datetime.utcnow() + timedelta(minutes=5)
+    expires_at = datetime.utcnow() + timedelta(seconds=ttl_seconds)
 
     db_code = models.VerificationCode(
         session_id=session_id,
@@ -229,54 +352,432 @@ def store_verification_code(db: Session, email: str, code: str, session_id: str)
     return db_code
 
 def verify_code(db: Session, session_id: str, plain_code: str):
-    record = db.query(models.VerificationCode).filter(models.VerificationCode.session_id == session_id).first()
-    if not record:
-        return None
-
-    if record.expires_at < datetime.utcnow():
-        return None # Expired
+    """コードが正しく未使用・期限内なら使用済みにして記録を返す
 
-    if not utils.verify_token_hash(plain_code, record.code_hash):
-        return None # Invalid code
-        
-    # Mark as verified (or delete)
-    record.verified = True
+    確認と使用済みへの更新を条件付きUPDATE 1文で行うので、同時に来た2つのリクエストでも成功は1回だけ
+    """
+    VerificationCode = models.VerificationCode
+    result = db.execute(
+        update(VerificationCode)
+        .where(
+            VerificationCode.session_id == session_id,
+            VerificationCode.verified == False,
+            VerificationCode.expires_at >= datetime.utcnow(),
+            VerificationCode.code_hash == utils.get_token_hash(plain_code),
+        )
+        .values(verified=True)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount != 1:
+        # Unknown, expired, already used or wrong code
+        db.rollback()
+        return None
     db.commit()
-    return record
+    return db.query(VerificationCode).filter(VerificationCode.session_id == session_id).first()
 
 def store_refresh_token(db: Session, parent_id: int, token: str):
-    token_hash = utils.get_token_hash(token)
-    expires_at = datetime.utcnow() + timedelta(days=7)
-    
+    claims = utils.get_unverified_claims(token)
     db_token = models.RefreshToken(
         parent_id=parent_id,
-        token_hash=token_hash,
-        expires_at=expires_at
+        jti=claims["jti"],
+        token_hash=utils.get_token_hash(token),
+        expires_at=datetime.utcfromtimestamp(claims["exp"])
     )
     db.add(db_token)
     db.commit()
     return db_token
 
-def get_refresh_token_record(db: Session, token: str):
-    # This is tricky since we store hash. We can't query by token.
-    # Usually refresh token rotation involves sending the token, finding the user/session associated (if we stored it unhashed or with an ID), 
-    # but spec says store hash.
-    # If we store ONLY hash, we can't find the record efficiently without an ID.
-    # But usually the client sends the refresh token. 
-    # Let's assume for now we verify it against all tokens for the user? No, that's inefficient.
-    # Re-reading spec: "データベースに保存(ハッシュ化)"
-    # A standard way is to return a transparent token ID or just handle it like a password.
-    # However, for refresh tokens, usually we store them so we can REVOKE them.
-    # Unlike passwords, we can store the token itself or a hash. If hash, we need a way to look it up.
-    # Maybe the refresh token contains the ID? 
-    # For now, let's implement lookup by verifying it against user's tokens if we had logical association, 
-    # but to be practical: we might need to store the raw token or use the JWT ID (jti) in the DB.
-    # Given the spec, let's assume we decode the JWT to get the user ID, then iterate/check? 
-    # Or simply: The RefreshToken model has `token_hash`. 
-    # If we receive a JWT refresh token, we can get `sub` (parent_id). 
-    # Then we check valid refresh tokens for that parent.
-    return None 
-    
-def revoke_refresh_token(db: Session, token: str):
-    # Need to find it first.
-    pass
+def get_refresh_token_record(db: Session, jti: str, token: str) -> Optional[models.RefreshToken]:
+    """jti（ユニークインデックス）で1件取得。ハッシュが一致し期限内のものだけ"""
+    return db.query(models.RefreshToken).filter(
+        models.RefreshToken.jti == jti,
+        models.RefreshToken.token_hash == utils.get_token_hash(token),
+        models.RefreshToken.expires_at > datetime.utcnow()
+    ).first()
+
+def rotate_refresh_token(db: Session, jti: str, token: str, new_token: str) -> bool:
+    """Swap the stored token for new_token in one UPDATE; False if it was unknown, expired or already used"""
+    claims = utils.get_unverified_claims(new_token)
+    RefreshToken = models.RefreshToken
+    result = db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.jti == jti,
+            RefreshToken.token_hash == utils.get_token_hash(token),
+            RefreshToken.expires_at > datetime.utcnow(),
+        )
+        .values(
+            jti=claims["jti"],
+            token_hash=utils.get_token_hash(new_token),
+            expires_at=datetime.utcfromtimestamp(claims["exp"]),
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def revoke_refresh_token(db: Session, jti: str, token: str) -> bool:
+    result = db.execute(
+        delete(models.RefreshToken).where(
+            models.RefreshToken.jti == jti,
+            models.RefreshToken.token_hash == utils.get_token_hash(token),
+        )
+    )
+    db.commit()
+    return result.rowcount == 1
+
+def delete_expired_batch(db: Session, model, id_column, now: datetime, batch_size: int) -> int:
+    """Delete up to batch_size rows with expires_at <= now (oldest first, via the expires_at index)
+
+    Returns the rows actually deleted, which is fewer than selected when another
+    worker got there first or a row was extended in between.
+    """
+    ids = db.execute(
+        select(id_column).where(model.expires_at <= now).order_by(model.expires_at).limit(batch_size)
+    ).scalars().all()
+    if not ids:
+        return 0
+    # Re-check expiry so a row rotated (and extended) since the SELECT is kept
+    result = db.execute(delete(model).where(id_column.in_(ids), model.expires_at <= now))
+    return result.rowcount
+
+# --- Settings CRUD ---
+
+def get_or_create_settings(db: Session, parent_id: int) -> models.Settings:
+    """保護者の設定を取得（なければ既定値で作成）"""
+    settings = db.query(models.Settings).filter(models.Settings.parent_id == parent_id).first()
+    if not settings:
+        # Create default settings if not exists
+        # Ensure parent exists first (Mock logic: create parent if not exists for prototype)
+        parent = db.query(models.Parent).filter(models.Parent.parent_id == parent_id).first()
+        if not parent:
+            parent = models.Parent(parent_id=parent_id, email=f"parent{parent_id}@example.com")
+            db.add(parent)
+            db.commit()
+            
+        settings = models.Settings(parent_id=parent_id, voice_enabled=True)
+        # Try to set default child
+        child = db.query(models.Child).filter(models.Child.parent_id == parent_id).first()
+        if child:
+            settings.child_id = child.child_id
+            
+        db.add(settings)
+        db.commit()
+        db.refresh(settings)
+        
+    return settings
+
+# --- Dashboard CRUD ---
+
+# ダッシュボードで表示する各記録の件数（子供ごと）
+DASHBOARD_RECENT_LIMITS = {
+    "recent_exercises": 5,
+    "recent_distance_checks": 5,
+    "recent_eye_tests": 30,
+    "recent_screentime": 30,
+}
+
+def get_latest_per_child(db: Session, model, child_ids: List[int], order_by: list, limit: int) -> Dict[int, list]:
+    """子供ごとに最新N件を1クエリで取得（ROW_NUMBER() によるTop-N per group）"""
+    result = {child_id: [] for child_id in child_ids}
+    if not child_ids:
+        return result
+
+    row_number = func.row_number().over(
+        partition_by=model.child_id,
+        order_by=order_by
+    ).label("row_number")
+    ranked = db.query(model, row_number)\
+        .filter(model.child_id.in_(child_ids))\
+        .subquery()
+    ranked_model = aliased(model, ranked)
+
+    rows = db.query(ranked_model)\
+        .filter(ranked.c.row_number <= limit)\
+        .order_by(ranked.c.child_id, ranked.c.row_number)\
+        .all()
+
+    for row in rows:
+        result[row.child_id].append(row)
+    return result
+
+def load_dashboard_data(db: Session, child_ids: List[int]) -> Dict[int, dict]:
+    """複数の子供のダッシュボード用データを固定回数（4クエリ）で取得"""
+    exercises = get_latest_per_child(
+        db, models.ExerciseLog, child_ids,
+        [models.ExerciseLog.exercise_date.desc()],
+        DASHBOARD_RECENT_LIMITS["recent_exercises"]
+    )
+    distance_checks = get_latest_per_child(
+        db, models.DistanceCheck, child_ids,
+        [models.DistanceCheck.check_date.desc()],
+        DASHBOARD_RECENT_LIMITS["recent_distance_checks"]
+    )
+    eye_tests = get_latest_per_child(
+        db, models.EyeTest, child_ids,
+        [models.EyeTest.check_date.desc(), models.EyeTest.created_at.desc()],
+        DASHBOARD_RECENT_LIMITS["recent_eye_tests"]
+    )
+    screentime = get_latest_per_child(
+        db, models.ScreenTime, child_ids,
+        [models.ScreenTime.start_time.desc()],
+        DASHBOARD_RECENT_LIMITS["recent_screentime"]
+    )
+
+    return {
+        child_id: {
+            "recent_exercises": exercises[child_id],
+            "recent_distance_checks": distance_checks[child_id],
+            "recent_eye_tests": eye_tests[child_id],
+            "recent_screentime": screentime[child_id],
+        }
+        for child_id in child_ids
+    }
+
+# --- Home CRUD ---
+
+def home_data_statement(child_id: int):
+    """子供と最新の視力チェック・距離チェック・終了済みスクリーンタイムを1クエリで取得する文
+
+    各テーブルは (child_id, 日付) の複合インデックスを使う相関サブクエリで最新1件の主キーを求め、
+    その行をLEFT JOINする（記録がなければNone）。同期・非同期どちらのセッションでも実行できる。
+    """
+    Child, EyeTest, DistanceCheck, ScreenTime = models.Child, models.EyeTest, models.DistanceCheck, models.ScreenTime
+    # サブクエリ側は別名にして、外側のJOINと区別する
+    eye_test, distance_check, screentime = aliased(EyeTest), aliased(DistanceCheck), aliased(ScreenTime)
+    latest_eye_test = select(eye_test.test_id)\
+        .where(eye_test.child_id == Child.child_id)\
+        .order_by(eye_test.check_date.desc(), eye_test.created_at.desc())\
+        .limit(1)\
+        .correlate(Child)\
+        .scalar_subquery()
+    latest_distance_check = select(distance_check.distance_id)\
+        .where(distance_check.child_id == Child.child_id)\
+        .order_by(distance_check.check_date.desc())\
+        .limit(1)\
+        .correlate(Child)\
+        .scalar_subquery()
+    latest_screentime = select(screentime.screentime_id)\
+        .where(screentime.child_id == Child.child_id)\
+        .where(screentime.end_time != None)\
+        .order_by(screentime.end_time.desc())\
+        .limit(1)\
+        .correlate(Child)\
+        .scalar_subquery()
+
+    return select(Child, EyeTest, DistanceCheck, ScreenTime)\
+        .select_from(Child)\
+        .outerjoin(EyeTest, EyeTest.test_id == latest_eye_test)\
+        .outerjoin(DistanceCheck, DistanceCheck.distance_id == latest_distance_check)\
+        .outerjoin(ScreenTime, ScreenTime.screentime_id == latest_screentime)\
+        .where(Child.child_id == child_id)
+
+# --- Cache version CRUD ---
+
+def get_cache_version(db: Session, name: str) -> int:
+    version = db.query(models.CacheVersion.version)\
+        .filter(models.CacheVersion.name == name)\
+        .scalar()
+    return version or 0
+
+def home_version_name(child_id: int) -> str:
+    return f"home:{child_id}"
+
+def bump_home_versions(db: Session, child_ids: Iterable[int]):
+    """ホーム画面キャッシュの子供ごとのバージョンを+1（1往復・コミットは呼び出し側）"""
+    # Sorted so concurrent writers lock the rows in the same order
+    rows = [{"name": home_version_name(child_id), "version": 1} for child_id in sorted(set(child_ids))]
+    upsert_add(db, models.CacheVersion, rows, ["name"])
+
+def get_cache_versions(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """複数のバージョンを1クエリで取得（未作成は0）"""
+    names = list(names)
+    rows = db.query(models.CacheVersion.name, models.CacheVersion.version)\
+        .filter(models.CacheVersion.name.in_(names))\
+        .all()
+    versions = dict.fromkeys(names, 0)
+    versions.update({name: version or 0 for name, version in rows})
+    return versions
+
+def bump_cache_version(db: Session, name: str) -> int:
+    """バージョンを+1して新しい値を返す（コミットは呼び出し側）"""
+    increment = {models.CacheVersion.version: models.CacheVersion.version + 1}
+    updated = db.query(models.CacheVersion)\
+        .filter(models.CacheVersion.name == name)\
+        .update(increment, synchronize_session=False)
+    if not updated:
+        if insert_or_ignore(db, models.CacheVersion, {"name": name, "version": 1}, ["name"]):
+            return 1
+        db.query(models.CacheVersion)\
+            .filter(models.CacheVersion.name == name)\
+            .update(increment, synchronize_session=False)
+    return get_cache_version(db, name)
+
+# --- ScreenTime CRUD ---
+
+def get_active_screentime_sessions(
+    db: Session, shards: Optional[Iterable[int]] = None, shard_count: int = 1
+) -> Dict[int, ActiveSession]:
+    """終了していないセッションを子供ごとに取得（shards指定時は child_id % shard_count がそれに含まれる子供のみ）"""
+    query = db.query(models.ScreenTime.child_id, models.ScreenTime.screentime_id, models.ScreenTime.start_time)\
+        .filter(models.ScreenTime.end_time == None)
+    if shards is not None:
+        query = query.filter((models.ScreenTime.child_id % shard_count).in_(list(shards)))
+    rows = query.order_by(models.ScreenTime.screentime_id).all()
+
+    sessions = {}
+    for child_id, screentime_id, start_time in rows:
+        sessions.setdefault(child_id, ActiveSession(screentime_id, start_time))
+    return sessions
+
+def split_by_day(start: datetime, end: datetime) -> List[Tuple[date, int]]:
+    """start〜end を日ごとの秒数に分割（日をまたぐセッション用）"""
+    parts = []
+    cursor = start
+    while cursor.date() < end.date():
+        midnight = datetime.combine(cursor.date() + timedelta(days=1), time.min)
+        parts.append((cursor.date(), int((midnight - cursor).total_seconds())))
+        cursor = midnight
+    parts.append((cursor.date(), max(int((end - cursor).total_seconds()), 0)))
+    return parts
+
+# 日別集計・一括終了で使う終了済みセッションの最小限の情報
+ClosedScreenTime = namedtuple("ClosedScreenTime", ["child_id", "start_time", "end_time", "alert_flag"])
+
+def screentime_close_values(start_time: datetime, end_time: datetime) -> dict:
+    """セッション終了時に保存する値（end_screentime と放置セッションの一括終了で共通）"""
+    total_minutes = math.ceil((end_time - start_time).total_seconds() / 60)
+    return {
+        "end_time": end_time,
+        "total_minutes": total_minutes,
+        "alert_flag": total_minutes >= SCREENTIME_ALERT_MINUTES,
+    }
+
+def close_screentime_session(db: Session, session: models.ScreenTime, end_time: datetime):
+    """セッションを終了して日別集計に加算（コミットは呼び出し側）"""
+    for column, value in screentime_close_values(session.start_time, end_time).items():
+        setattr(session, column, value)
+    add_screentime_to_daily(db, [session])
+
+def add_screentime_to_daily(db: Session, sessions: List):
+    """終了したセッションを日別集計に加算（コミットは呼び出し側）"""
+    totals: Dict[Tuple[int, date], dict] = {}
+    for session in sessions:
+        for i, (day, seconds) in enumerate(split_by_day(session.start_time, session.end_time)):
+            row = totals.setdefault(
+                (session.child_id, day),
+                {"child_id": session.child_id, "day": day, "total_seconds": 0, "session_count": 0, "alert_count": 0}
+            )
+            row["total_seconds"] += seconds
+            # 回数とアラートはセッション開始日に計上
+            if i == 0:
+                row["session_count"] += 1
+                row["alert_count"] += 1 if session.alert_flag else 0
+    upsert_add(db, models.ScreenTimeDaily, list(totals.values()), ["child_id", "day"])
+
+def close_abandoned_screentime(
+    db: Session, idle_cap: timedelta, heartbeat_timeout: timedelta, now: datetime, batch_size: int
+) -> List[ClosedScreenTime]:
+    """放置された未終了セッションを終了（1バッチ分、コミットは呼び出し側）
+
+    ハートビートがあるセッションは最後のハートビートから heartbeat_timeout 経過で
+    その時刻に、ないセッションは開始から idle_cap 経過で start+idle_cap に終了する。
+    """
+    ScreenTime = models.ScreenTime
+    # end_screentime が処理中の行はロック済みなので飛ばす（SQLiteでは無視される）
+    rows = db.query(ScreenTime.screentime_id, ScreenTime.child_id, ScreenTime.start_time, ScreenTime.last_heartbeat_at)\
+        .filter(ScreenTime.end_time == None)\
+        .filter(or_(
+            and_(ScreenTime.last_heartbeat_at != None, ScreenTime.last_heartbeat_at < now - heartbeat_timeout),
+            and_(ScreenTime.last_heartbeat_at == None, ScreenTime.start_time < now - idle_cap),
+        ))\
+        .order_by(ScreenTime.start_time)\
+        .limit(batch_size)\
+        .with_for_update(skip_locked=True)\
+        .all()
+    if not rows:
+        return []
+
+    closed = []
+    params = []
+    for screentime_id, child_id, start_time, last_heartbeat_at in rows:
+        values = screentime_close_values(start_time, last_heartbeat_at or start_time + idle_cap)
+        params.append({"b_id": screentime_id, **{f"b_{k}": v for k, v in values.items()}})
+        closed.append(ClosedScreenTime(child_id, start_time, values["end_time"], values["alert_flag"]))
+
+    table = models.ScreenTime.__table__
+    db.execute(
+        update(table)
+        .where(table.c.screentime_id == bindparam("b_id"))
+        .where(table.c.end_time.is_(None))
+        .values(
+            end_time=bindparam("b_end_time"),
+            total_minutes=bindparam("b_total_minutes"),
+            alert_flag=bindparam("b_alert_flag"),
+        ),
+        params
+    )
+    add_screentime_to_daily(db, closed)
+    return closed
+
+def record_screentime_heartbeats(db: Session, beats: List[Tuple[int, datetime, datetime]]) -> int:
+    """(screentime_id, start_time, beat_at) をまとめて反映（executemany 1回、コミットは呼び出し側）
+
+    終了済みのセッションと、より新しいハートビートが反映済みの行は更新しない。
+    """
+    if not beats:
+        return 0
+    table = models.ScreenTime.__table__
+    params = [
+        {
+            "b_id": screentime_id,
+            "b_beat_at": beat_at,
+            "b_total_minutes": screentime_close_values(start_time, beat_at)["total_minutes"],
+        }
+        for screentime_id, start_time, beat_at in beats
+    ]
+    result = db.execute(
+        update(table)
+        .where(table.c.screentime_id == bindparam("b_id"))
+        .where(table.c.end_time.is_(None))
+        .where(or_(table.c.last_heartbeat_at.is_(None), table.c.last_heartbeat_at < bindparam("b_beat_at")))
+        .values(last_heartbeat_at=bindparam("b_beat_at"), total_minutes=bindparam("b_total_minutes")),
+        params
+    )
+    return result.rowcount
+
+def get_screentime_summary(db: Session, child_id: int, days: int, today: Optional[date] = None) -> dict:
+    """直近days日分の日別・週別合計（ScreenTimeDailyの主キー範囲スキャン1回）"""
+    today = today or date.today()
+    first_day = today - timedelta(days=days - 1)
+    rows = db.query(models.ScreenTimeDaily)\
+        .filter(models.ScreenTimeDaily.child_id == child_id)\
+        .filter(models.ScreenTimeDaily.day >= first_day)\
+        .filter(models.ScreenTimeDaily.day <= today)\
+        .all()
+    by_day = {row.day: row for row in rows}
+
+    daily = []
+    weeks: Dict[date, dict] = {}
+    for offset in range(days):
+        day = first_day + timedelta(days=offset)
+        row = by_day.get(day)
+        totals = {
+            "total_seconds": row.total_seconds if row else 0,
+            "session_count": row.session_count if row else 0,
+            "alert_count": row.alert_count if row else 0,
+        }
+        daily.append({"day": day, **totals})
+        week = weeks.setdefault(get_week_start(day), {"total_seconds": 0, "session_count": 0, "alert_count": 0})
+        for key, value in totals.items():
+            week[key] += value
+
+    total_seconds = sum(d["total_seconds"] for d in daily)
+    for totals in [*daily, *weeks.values()]:
+        totals["total_minutes"] = round(totals["total_seconds"] / 60)
+    return {
+        "child_id": child_id,
+        "days": daily,
+        "weeks": [{"week_start": week_start, **totals} for week_start, totals in weeks.items()],
+        "total_seconds": total_seconds,
+        "total_minutes": round(total_seconds / 60),
+    }
@@ -1,7 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
+import ssl
+import threading
+import time
 from dotenv import load_dotenv
 
 # Load .env file
@@ -16,6 +22,109 @@ DB_PORT = os.getenv("DB_PORT", "3306")
 DB_NAME = os.getenv("DB_NAME")
 SSL_CERT_PATH = os.getenv("SSL_CERT_PATH")
 
+# Connection pool settings
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Azure MySQL drops idle connections, so recycle them before that happens
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+
+class PoolMetrics:
+    """Collects how long requests wait for a pooled connection"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.wait_count = 0
+            self.total_wait_seconds = 0.0
+            self.max_wait_seconds = 0.0
+            self.timeouts = 0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self.wait_count += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            avg_wait = self.total_wait_seconds / self.wait_count if self.wait_count else 0.0
+            return {
+                "pool_size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+                "max_overflow": pool._max_overflow,
+                "checkouts": self.wait_count,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(avg_wait * 1000, 3),
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+            }
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
+
+class WaitTimingMixin:
+    """Records the time spent waiting for a connection into `metrics`"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return conn
+
+
+class InstrumentedQueuePool(WaitTimingMixin, QueuePool):
+    metrics = pool_metrics
+
+
+class InstrumentedAsyncQueuePool(WaitTimingMixin, AsyncAdaptedQueuePool):
+    metrics = async_pool_metrics
+
+
+def pool_options(poolclass=InstrumentedQueuePool) -> dict:
+    return {
+        "poolclass": poolclass,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+def create_ssl_context(ca_path: str) -> ssl.SSLContext:
+    # aiomysql expects an SSLContext instead of PyMySQL's ssl dict
+    context = ssl.create_default_context(cafile=ca_path)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+def to_async_url(url: str):
+    """Swap the sync DBAPI driver for its async counterpart"""
+    url = make_url(url)
+    if url.get_backend_name() == "mysql":
+        return url.set(drivername="mysql+aiomysql")
+    if url.get_backend_name() == "sqlite":
+        return url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
 if DATABASE_URL:
     # Use explicit DATABASE_URL (e.g. from Azure)
     SQLALCHEMY_DATABASE_URL = DATABASE_URL
@@ -31,9 +140,14 @@ if DATABASE_URL:
 
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        connect_args=connect_args
+        connect_args=connect_args,
+        **pool_options()
     )
 
+    async_connect_args = {}
+    if "azure.com" in SQLALCHEMY_DATABASE_URL:
+        async_connect_args["ssl"] = create_ssl_context(SSL_CERT_PATH)
+
 elif DB_USER and DB_PASSWORD and DB_HOST and DB_NAME:
     # Legacy/Individual vars
     SQLALCHEMY_DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
@@ -48,24 +162,60 @@ elif DB_USER and DB_PASSWORD and DB_HOST and DB_NAME:
 
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL,
-        connect_args=connect_args
+        connect_args=connect_args,
+        **pool_options()
     )
+
+    async_connect_args = {}
+    if SSL_CERT_PATH and os.path.exists(SSL_CERT_PATH):
+        async_connect_args["ssl"] = create_ssl_context(SSL_CERT_PATH)
 else:
     # Fallback to local SQLite
     SQLALCHEMY_DATABASE_URL = "sqlite:///./merelax.db"
     
     engine = create_engine(
         SQLALCHEMY_DATABASE_URL, 
-        connect_args={"check_same_thread": False}
+        connect_args={"check_same_thread": False},
+        **pool_options()
     )
 
+    async_connect_args = {}
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for handlers that should not block a threadpool worker while waiting on the DB
+async_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_DATABASE_URL),
+    connect_args=async_connect_args,
+    **pool_options(InstrumentedAsyncQueuePool)
+)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 Base = declarative_base()
 
+def get_pool_status() -> dict:
+    return {
+        "sync": pool_metrics.snapshot(engine.pool),
+        "async": async_pool_metrics.snapshot(async_engine.sync_engine.pool),
+    }
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+def get_session_factory():
+    """For work that outlives the request's session (e.g. streaming responses)"""
+    return SessionLocal
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
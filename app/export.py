@@ -0,0 +1,122 @@
+# app/export.py
+"""Streams a child's full history as NDJSON or CSV.
+
+Each record type is read with a server-side cursor (yield_per), so memory stays
+at one batch no matter how many years of data a child has, and the first batch
+is sent as soon as the first query returns. Record types are read one after
+another because a connection can only have one streaming result open.
+"""
+import csv
+import io
+import json
+import os
+from datetime import date, datetime
+from typing import Callable, Iterator, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
+
+# CSV columns: record_type + the union of every record's fields
+CSV_FIELDS = [
+    "record_type", "id", "date", "left_eye", "right_eye", "test_distance_cm",
+    "avg_distance_cm", "posture_score", "exercise_id", "exercise_type",
+    "start_time", "end_time", "total_minutes", "alert_flag", "created_at",
+]
+
+
+def _eye_tests(child_id: int):
+    EyeTest = models.EyeTest
+    return select(
+        EyeTest.test_id.label("id"), EyeTest.check_date.label("date"), EyeTest.left_eye,
+        EyeTest.right_eye, EyeTest.test_distance_cm, EyeTest.created_at,
+    ).where(EyeTest.child_id == child_id).order_by(EyeTest.check_date, EyeTest.test_id)
+
+
+def _distance_checks(child_id: int):
+    DistanceCheck = models.DistanceCheck
+    return select(
+        DistanceCheck.distance_id.label("id"), DistanceCheck.check_date.label("date"),
+        DistanceCheck.avg_distance_cm, DistanceCheck.posture_score, DistanceCheck.alert_flag,
+        DistanceCheck.created_at,
+    ).where(DistanceCheck.child_id == child_id).order_by(DistanceCheck.check_date, DistanceCheck.distance_id)
+
+
+def _exercise_logs(child_id: int):
+    ExerciseLog = models.ExerciseLog
+    return select(
+        ExerciseLog.log_id.label("id"), ExerciseLog.exercise_date.label("date"), ExerciseLog.exercise_id,
+        models.Exercise.exercise_type, ExerciseLog.created_at,
+    ).outerjoin(models.Exercise, models.Exercise.exercise_id == ExerciseLog.exercise_id)\
+        .where(ExerciseLog.child_id == child_id)\
+        .order_by(ExerciseLog.exercise_date, ExerciseLog.log_id)
+
+
+def _screen_time(child_id: int):
+    ScreenTime = models.ScreenTime
+    return select(
+        ScreenTime.screentime_id.label("id"), ScreenTime.start_time, ScreenTime.end_time,
+        ScreenTime.total_minutes, ScreenTime.alert_flag,
+    ).where(ScreenTime.child_id == child_id).order_by(ScreenTime.start_time, ScreenTime.screentime_id)
+
+
+# record_type -> statement builder, in export order
+RECORD_TYPES: List[Tuple[str, Callable]] = [
+    ("eye_test", _eye_tests),
+    ("distance_check", _distance_checks),
+    ("exercise_log", _exercise_logs),
+    ("screen_time", _screen_time),
+]
+
+
+def iter_record_batches(db: Session, child_id: int, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[List[dict]]:
+    """Yields lists of at most batch_size records, each tagged with its record_type"""
+    for record_type, statement in RECORD_TYPES:
+        result = db.execute(statement(child_id).execution_options(yield_per=batch_size))
+        try:
+            for rows in result.partitions():
+                yield [{"record_type": record_type, **row._asdict()} for row in rows]
+        finally:
+            result.close()
+
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _format_ndjson(batches: Iterator[List[dict]]) -> Iterator[str]:
+    for records in batches:
+        yield "".join(json.dumps(record, default=_json_default, ensure_ascii=False) + "\n" for record in records)
+
+
+def _format_csv(batches: Iterator[List[dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+    for records in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(records)
+        yield buffer.getvalue()
+
+
+FORMATS = {
+    "ndjson": ("application/x-ndjson", _format_ndjson),
+    "csv": ("text/csv; charset=utf-8", _format_csv),
+}
+
+
+def stream_child_history(session_factory, child_id: int, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    """Opens its own session: the request's session is closed before the body is sent"""
+    _, formatter = FORMATS[fmt]
+    db = session_factory()
+    try:
+        yield from formatter(iter_record_batches(db, child_id, batch_size))
+    finally:
+        db.close()
@@ -0,0 +1,202 @@
+# app/line_client.py
+"""Async client for LINE Login.
+
+One httpx.AsyncClient (connection pool) is shared by every request and closed
+from the app lifespan. Calls have a timeout and are retried with backoff when
+LINE could not be reached or answered 502/503/504. The base URLs are
+configurable so the login flow can be load-tested against a local mock.
+
+ID tokens are verified locally: HS256 with the channel secret, ES256 with
+LINE's published keys (JWKS), which are cached and only refetched for an
+unknown key id. The verified token already carries the LINE user ID, so the
+profile endpoint is only called when no ID token was returned.
+"""
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, Optional
+
+import httpx
+from jose import JWTError, jwt
+
+logger = logging.getLogger(__name__)
+
+LINE_CHANNEL_ID = os.getenv("LINE_CHANNEL_ID")
+LINE_CHANNEL_SECRET = os.getenv("LINE_CHANNEL_SECRET")
+LINE_REDIRECT_URI = os.getenv("LINE_REDIRECT_URI") # e.g. http://localhost:3000/auth/callback
+
+LINE_API_BASE_URL = os.getenv("LINE_API_BASE_URL", "https://api.line.me")
+LINE_ACCESS_BASE_URL = os.getenv("LINE_ACCESS_BASE_URL", "https://access.line.me")
+LINE_ID_TOKEN_ISSUER = os.getenv("LINE_ID_TOKEN_ISSUER", "https://access.line.me")
+
+LINE_HTTP_TIMEOUT_SECONDS = float(os.getenv("LINE_HTTP_TIMEOUT_SECONDS", "5"))
+LINE_HTTP_RETRIES = int(os.getenv("LINE_HTTP_RETRIES", "2"))
+LINE_HTTP_MAX_CONNECTIONS = int(os.getenv("LINE_HTTP_MAX_CONNECTIONS", "20"))
+LINE_JWKS_CACHE_SECONDS = int(os.getenv("LINE_JWKS_CACHE_SECONDS", "3600"))
+# An unknown kid triggers at most one JWKS refetch per this many seconds
+LINE_JWKS_MIN_REFRESH_SECONDS = int(os.getenv("LINE_JWKS_MIN_REFRESH_SECONDS", "60"))
+
+RETRY_STATUS_CODES = {502, 503, 504}
+RETRY_BACKOFF_SECONDS = 0.2
+
+
+class LineError(Exception):
+    """LINE was unreachable, rejected the request or returned an invalid ID token"""
+
+
+class LineClient:
+    def __init__(
+        self,
+        channel_id: Optional[str] = LINE_CHANNEL_ID,
+        channel_secret: Optional[str] = LINE_CHANNEL_SECRET,
+        redirect_uri: Optional[str] = LINE_REDIRECT_URI,
+        api_base_url: str = LINE_API_BASE_URL,
+        access_base_url: str = LINE_ACCESS_BASE_URL,
+        timeout: float = LINE_HTTP_TIMEOUT_SECONDS,
+        retries: int = LINE_HTTP_RETRIES,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.channel_id = channel_id
+        self.channel_secret = channel_secret
+        self.redirect_uri = redirect_uri
+        self.api_base_url = api_base_url.rstrip("/")
+        self.access_base_url = access_base_url.rstrip("/")
+        self.timeout = timeout
+        self.retries = retries
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # kid -> JWK
+        self._jwks: Dict[str, dict] = {}
+        self._jwks_fetched_at: Optional[float] = None
+        self._jwks_lock = asyncio.Lock()
+        self.requests = 0
+        self.retried = 0
+        self.jwks_fetches = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.channel_id and self.channel_secret and self.redirect_uri)
+
+    def authorize_url(self, state: str) -> str:
+        query = httpx.QueryParams({
+            "response_type": "code",
+            "client_id": self.channel_id,
+            "redirect_uri": self.redirect_uri,
+            "state": state,
+            "scope": "profile openid email",
+        })
+        return f"{self.access_base_url}/oauth2/v2.1/authorize?{query}"
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=LINE_HTTP_MAX_CONNECTIONS),
+                transport=self._transport,
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            self.requests += 1
+            try:
+                response = await self.client.request(method, url, **kwargs)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout) as e:
+                # The request never reached LINE, so even a POST is safe to resend
+                if last_attempt:
+                    raise LineError(f"LINE unreachable: {e}") from e
+            except httpx.HTTPError as e:
+                if last_attempt or method != "GET":
+                    raise LineError(f"LINE request failed: {e}") from e
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or last_attempt:
+                    return response
+            self.retried += 1
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
+
+    async def exchange_code(self, code: str) -> dict:
+        response = await self._request(
+            "POST",
+            f"{self.api_base_url}/oauth2/v2.1/token",
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "redirect_uri": self.redirect_uri,
+                "client_id": self.channel_id,
+                "client_secret": self.channel_secret,
+            },
+        )
+        if response.status_code != 200:
+            raise LineError(f"Token exchange failed with {response.status_code}")
+        return response.json()
+
+    async def get_profile(self, access_token: str) -> dict:
+        response = await self._request(
+            "GET", f"{self.api_base_url}/v2/profile", headers={"Authorization": f"Bearer {access_token}"}
+        )
+        if response.status_code != 200:
+            raise LineError(f"Profile request failed with {response.status_code}")
+        return response.json()
+
+    def _jwks_age(self) -> float:
+        return float("inf") if self._jwks_fetched_at is None else time.monotonic() - self._jwks_fetched_at
+
+    async def _signing_key(self, kid: Optional[str]) -> dict:
+        if kid in self._jwks and self._jwks_age() < LINE_JWKS_CACHE_SECONDS:
+            return self._jwks[kid]
+        async with self._jwks_lock:
+            # Re-checked under the lock: a concurrent request may have just refetched
+            age = self._jwks_age()
+            if age >= LINE_JWKS_CACHE_SECONDS or (kid not in self._jwks and age >= LINE_JWKS_MIN_REFRESH_SECONDS):
+                await self._fetch_jwks()
+        if kid not in self._jwks:
+            raise LineError("Unknown ID token signing key")
+        return self._jwks[kid]
+
+    async def _fetch_jwks(self):
+        response = await self._request("GET", f"{self.api_base_url}/oauth2/v2.1/certs")
+        if response.status_code != 200:
+            raise LineError(f"JWKS request failed with {response.status_code}")
+        self._jwks = {key["kid"]: key for key in response.json().get("keys", [])}
+        self._jwks_fetched_at = time.monotonic()
+        self.jwks_fetches += 1
+
+    async def verify_id_token(self, id_token: str) -> dict:
+        """Checks signature, audience (channel ID), issuer and expiry; returns the claims"""
+        try:
+            header = jwt.get_unverified_header(id_token)
+        except JWTError as e:
+            raise LineError(f"Malformed ID token: {e}") from e
+        algorithm = header.get("alg")
+        if algorithm == "HS256":
+            key = self.channel_secret
+        elif algorithm == "ES256":
+            key = await self._signing_key(header.get("kid"))
+        else:
+            raise LineError(f"Unsupported ID token algorithm: {algorithm}")
+        try:
+            return jwt.decode(
+                id_token, key, algorithms=[algorithm], audience=self.channel_id, issuer=LINE_ID_TOKEN_ISSUER,
+                options={"verify_at_hash": False},
+            )
+        except JWTError as e:
+            raise LineError(f"Invalid ID token: {e}") from e
+
+    def stats(self) -> dict:
+        return {
+            "requests": self.requests,
+            "retried": self.retried,
+            "jwks_fetches": self.jwks_fetches,
+            "jwks_keys": len(self._jwks),
+        }
+
+
+line_client = LineClient()
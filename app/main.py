@@ -1,6 +1,12 @@
 # app/main.py
+import time
+
+# Measured from import so cold-start regressions show up in /metrics/startup
+BOOT_STARTED = time.perf_counter()
+
 from fastapi import FastAPI, Depends, HTTPException
 from dotenv import load_dotenv
+from contextlib import asynccontextmanager
 import os
 
 load_dotenv()
@@ -10,15 +16,11 @@ from datetime import date
 from typing import List, Optional
 
 from app.routers import exercise, vision_test
-from app.database import engine, get_db, SessionLocal
-from app import models, crud, schemas
-
-models.Base.metadata.create_all(bind=engine)
-
-# Initialize data
-db = SessionLocal()
-crud.init_db(db)
-db.close()
+from app.database import get_db
+from app import models, crud, schemas, bootstrap, background, bulk
+from app.line_client import line_client
+from app.screentime_registry import rebuild_registry
+from app import screentime_sweeper, screentime_heartbeats, auth_purge  # register background tasks
 
 # 環境変数からドキュメント設定を読み込む
 ENABLE_DOCS = os.getenv("ENABLE_DOCS", "false").lower() == "true"
@@ -29,8 +31,22 @@ docs_url: Optional[str] = "/docs" if ENABLE_DOCS else None
 redoc_url: Optional[str] = "/redoc" if ENABLE_DOCS else None
 openapi_url: Optional[str] = "/openapi.json" if ENABLE_DOCS else None
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema creation and seeding are skipped when the stored fingerprint matches
+    if bootstrap.RUN_BOOTSTRAP_ON_STARTUP:
+        bootstrap.run_startup()
+    # Load open screen time sessions so status checks can be answered from memory
+    rebuild_registry()
+    bootstrap.startup_report["boot_ms"] = round((time.perf_counter() - BOOT_STARTED) * 1000, 1)
+    background.start_all()
+    yield
+    await background.stop_all()
+    await line_client.close()
+
 app = FastAPI(
     title="Mememe API",
+    lifespan=lifespan,
     docs_url=docs_url,
     redoc_url=redoc_url,
     openapi_url=openapi_url,
@@ -43,15 +59,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 app.include_router(exercise.router, prefix="/api", tags=["exercise"])
 app.include_router(vision_test.router, prefix="/api", tags=["vision_test"])
-from app.routers import auth, home, dashboard, screentime
+from app.routers import auth, home, dashboard, screentime, metrics, launch, analytics, export
 app.include_router(auth.router, prefix="/api/v1", tags=["auth"])
 app.include_router(home.router, prefix="/api/v1", tags=["home"])
 app.include_router(dashboard.router, prefix="/api/v1", tags=["dashboard"])
 app.include_router(screentime.router, prefix="/api/v1", tags=["screentime"])
+app.include_router(metrics.router, prefix="/api/v1", tags=["metrics"])
+app.include_router(launch.router, prefix="/api/v1", tags=["bootstrap"])
+app.include_router(analytics.router, prefix="/api/v1", tags=["analytics"])
+app.include_router(export.router, prefix="/api/v1", tags=["export"])
 
 from app.routers import settings
 app.include_router(settings.router) # Prefix is defined in settings.py as /api
@@ -72,10 +93,25 @@ def create_distance_check(check: schemas.DistanceCheckCreate, db: Session = Depe
         alert_flag=check.alert_flag
     )
     db.add(db_check)
+    crud.bump_home_versions(db, [check.child_id])
     db.commit()
     db.refresh(db_check)
     return db_check
 
+@app.post("/api/distance-check/bulk", response_model=schemas.BulkResponse)
+def create_distance_checks_bulk(request: schemas.BulkRequest, db: Session = Depends(get_db)):
+    """オフライン中にためた距離チェックをまとめて登録（1トランザクション・1 INSERT）"""
+    valid, results = bulk.validate_items(request.items, schemas.DistanceCheckBulkItem)
+    today = date.today()
+    bulk.store_items(db, models.DistanceCheck, valid, results, lambda item: {
+        "child_id": item.child_id,
+        "check_date": item.check_date or today,
+        "avg_distance_cm": item.distance_cm,
+        "posture_score": 0,
+        "alert_flag": item.alert_flag,
+    })
+    return bulk.build_response(results)
+
 @app.post("/api/seed-child", response_model=schemas.Child)
 def create_child(child: schemas.ChildCreate, db: Session = Depends(get_db)):
     db_child = models.Child(name=child.name, parent_id=1) # Default parent
@@ -1,5 +1,5 @@
 # app/models.py
-from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, UniqueConstraint, Boolean, Float
+from sqlalchemy import Column, Integer, String, Text, DateTime, Date, ForeignKey, UniqueConstraint, Boolean, Float, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -25,8 +25,21 @@ class ExerciseLog(Base):
     __table_args__ = (
         UniqueConstraint('child_id', 'exercise_id', 'exercise_date', 
                         name='unique_child_exercise_date'),
+        Index('idx_exerciselog_child_date', 'child_id', 'exercise_date'),
     )
 
+class ExerciseStreak(Base):
+    __tablename__ = "ExerciseStreak"
+
+    # 子供ごとの集計（log_exercise で差分更新し、統計取得は主キー1件参照のみ）
+    child_id = Column(Integer, primary_key=True, autoincrement=False)
+    current_streak = Column(Integer, nullable=False, default=0) # last_exercise_date で終わる連続日数
+    last_exercise_date = Column(Date, nullable=True)
+    last_day_types = Column(String(255), nullable=True) # last_exercise_date に実施した種別（カンマ区切り）
+    week_start = Column(Date, nullable=True) # last_exercise_date を含む週の月曜日
+    week_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
 # --- New Models for Distance Check ---
 
 class Child(Base):
@@ -53,6 +66,10 @@ class DistanceCheck(Base):
 
     child = relationship("Child", back_populates="distance_checks")
 
+    __table_args__ = (
+        Index('idx_distancecheck_child_date', 'child_id', 'check_date'),
+    )
+
 class Parent(Base):
     __tablename__ = "Parent"
 
@@ -72,12 +89,18 @@ class RefreshToken(Base):
 
     token_id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     parent_id = Column(Integer, ForeignKey("Parent.parent_id"), nullable=False)
+    jti = Column(String(36), unique=True, index=True, nullable=True) # JWTのjti（トークンごとに一意）
     token_hash = Column(String(255), nullable=False)
     expires_at = Column(DateTime, nullable=False)
     created_at = Column(DateTime, server_default=func.now())
 
     parent = relationship("Parent", back_populates="refresh_tokens")
 
+    __table_args__ = (
+        # Purge of expired tokens (app/auth_purge.py)
+        Index('idx_refreshtoken_expires', 'expires_at'),
+    )
+
 class VerificationCode(Base):
     __tablename__ = "verification_codes"
 
@@ -89,6 +112,11 @@ class VerificationCode(Base):
     verified = Column(Boolean, default=False)
     created_at = Column(DateTime, server_default=func.now())
 
+    __table_args__ = (
+        # Purge of expired codes (app/auth_purge.py)
+        Index('idx_verification_expires', 'expires_at'),
+    )
+
 class Settings(Base):
     __tablename__ = "Settings"
 
@@ -109,6 +137,13 @@ class EyeTest(Base):
     created_at = Column(DateTime, server_default=func.now())
     test_distance_cm = Column(Integer, nullable=True) # Added for measurement distance
 
+    __table_args__ = (
+        Index('idx_eyetest_child_date_created', 'child_id', 'check_date', 'created_at'),
+        # Keyset pagination of GET /eyetests (with and without child_id)
+        Index('idx_eyetest_child_date_id', 'child_id', 'check_date', 'test_id'),
+        Index('idx_eyetest_date_id', 'check_date', 'test_id'),
+    )
+
 class MeasurementResult(Base):
     __tablename__ = "measurement_results"
 
@@ -118,6 +153,11 @@ class MeasurementResult(Base):
     distance = Column(String(10)) # "30cm" or "3m"
     visual_acuity = Column(Float)
 
+    __table_args__ = (
+        # Keyset pagination of GET /results
+        Index('idx_measurement_date_id', 'date', 'id'),
+    )
+
 class RfpEyeTest(Base):
     __tablename__ = "rfp_eye_tests"
 
@@ -137,4 +177,35 @@ class ScreenTime(Base):
     start_time = Column(DateTime, nullable=False)
     end_time = Column(DateTime, nullable=True)
     total_minutes = Column(Integer, nullable=True)
-    alert_flag = Column(Boolean, default=False)
\ No newline at end of file
+    alert_flag = Column(Boolean, default=False)
+    last_heartbeat_at = Column(DateTime, nullable=True) # アプリからの最後のハートビート
+
+    __table_args__ = (
+        Index('idx_screentime_child_start', 'child_id', 'start_time'),
+        Index('idx_screentime_child_end', 'child_id', 'end_time'),
+    )
+
+class ScreenTimeDaily(Base):
+    __tablename__ = "ScreenTimeDaily"
+
+    # 子供・日ごとの集計（end_screentime で加算。日をまたぐセッションは日ごとに分割）
+    child_id = Column(Integer, primary_key=True, autoincrement=False)
+    day = Column(Date, primary_key=True)
+    total_seconds = Column(Integer, nullable=False, default=0)
+    session_count = Column(Integer, nullable=False, default=0) # 開始日に計上
+    alert_count = Column(Integer, nullable=False, default=0) # 開始日に計上
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class AppMeta(Base):
+    __tablename__ = "app_meta"
+
+    meta_key = Column(String(50), primary_key=True)
+    meta_value = Column(String(255), nullable=True)
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+
+    # Bumped in the same transaction as writes that in-process caches must notice
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
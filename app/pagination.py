@@ -0,0 +1,58 @@
+# app/pagination.py
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional, Sequence
+
+from fastapi import HTTPException, Response
+from sqlalchemy import and_, or_
+
+# Response header carrying the cursor of the next page (absent on the last page)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque cursor for the last row of a page (dates are kept as ISO strings)"""
+    raw = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[type]) -> List[Any]:
+    """Inverse of encode_cursor; raises 400 for cursors we did not issue
+
+    A date/datetime may come back as None (a page ending on a NULL sort value).
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return [
+            (None if v is None else t.fromisoformat(v)) if t in (date, datetime) else t(v)
+            for t, v in zip(types, values)
+        ]
+    except (ValueError, TypeError, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_before(sort_column, id_column, sort_value, id_value, nullable: bool = False):
+    """WHERE for the rows after (sort_value, id_value) in (sort DESC, id DESC) order
+
+    With nullable=True, NULL sort values come after every date, which is where MySQL
+    and SQLite put them in DESC order, and sort_value may be None.
+    """
+    if sort_value is None:
+        return and_(sort_column.is_(None), id_column < id_value)
+    after = or_(
+        sort_column < sort_value,
+        and_(sort_column == sort_value, id_column < id_value),
+    )
+    return or_(after, sort_column.is_(None)) if nullable else after
+
+
+def paginate(rows: list, limit: int, response: Response, cursor_of) -> list:
+    """Trim the extra lookahead row and set the next-page cursor header"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*cursor_of(rows[-1]))
+    return rows
@@ -0,0 +1,184 @@
+# app/rate_limit.py
+"""Per-email / per-IP throttling of the login endpoints.
+
+Rules are "N/S": at most N requests per S seconds per key. The check runs as a
+route dependency, before the handler touches the database or bcrypt, and an
+over-limit request gets 429 with Retry-After.
+
+RATE_LIMIT_BACKEND selects where the counters live:
+- "memory" (default): a token bucket per key in this worker. Keys are kept in
+  an LRU/TTL cache, so memory is bounded by RATE_LIMIT_MAX_KEYS per rule, and
+  a key idle for S seconds (a full bucket) is simply dropped.
+- "redis": a sliding window (current + weighted previous fixed window) in the
+  Redis at REDIS_URL, shared by every worker. If Redis is unavailable the
+  request is let through, so logins do not depend on Redis being up.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from cachetools import TTLCache
+from fastapi import HTTPException, Request, status
+
+from app import schemas
+from app.redis_client import RedisClient, RedisError
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "10000"))
+# Use the first X-Forwarded-For address (only behind a proxy that sets it)
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() == "true"
+
+# rule name -> "N/S"
+RATE_LIMIT_RULES = {
+    "login_email": os.getenv("RATE_LIMIT_LOGIN_EMAIL", "5/60"),
+    "login_ip": os.getenv("RATE_LIMIT_LOGIN_IP", "30/60"),
+    "verify_session": os.getenv("RATE_LIMIT_VERIFY_SESSION", "5/300"),
+    "verify_ip": os.getenv("RATE_LIMIT_VERIFY_IP", "30/60"),
+}
+RATE_LIMIT_REDIS_PREFIX = "ratelimit:"
+
+
+def parse_rule(rule: str) -> Tuple[int, float]:
+    limit, seconds = rule.split("/")
+    return int(limit), float(seconds)
+
+
+class TokenBucketLimiter:
+    """In-process token bucket: `limit` tokens, refilled over `window_seconds`"""
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.refill_per_second = limit / window_seconds
+        # key -> (tokens, updated_at); an entry idle for a full window would be a full bucket anyway
+        self._buckets = TTLCache(maxsize=max_keys, ttl=window_seconds)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        """Takes a token; returns None if allowed, otherwise seconds until a token is available"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (self.limit, now))
+            tokens = min(self.limit, tokens + (now - updated_at) * self.refill_per_second)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return None
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.refill_per_second
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class RedisSlidingWindowLimiter:
+    """Shared limiter: previous window's count weighted by its remaining overlap + current count"""
+
+    def __init__(self, client: RedisClient, name: str, limit: int, window_seconds: float):
+        self.client = client
+        self.prefix = f"{RATE_LIMIT_REDIS_PREFIX}{name}:"
+        self.limit = limit
+        self.window_seconds = window_seconds
+
+    def hit(self, key: str, now: Optional[float] = None) -> Optional[float]:
+        now = time.time() if now is None else now
+        window = int(now // self.window_seconds)
+        elapsed = now - window * self.window_seconds
+        current_key = f"{self.prefix}{key}:{window}"
+        try:
+            current, _, previous = self.client.execute_many(
+                ("INCR", current_key),
+                ("EXPIRE", current_key, math.ceil(self.window_seconds * 2)),
+                ("GET", f"{self.prefix}{key}:{window - 1}"),
+            )
+        except RedisError as e:
+            logger.warning("Rate limit backend unavailable, allowing request: %s", e)
+            return None
+        weight = 1 - elapsed / self.window_seconds
+        if int(previous or 0) * weight + current <= self.limit:
+            return None
+        return self.window_seconds - elapsed
+
+    def reset(self):
+        pass
+
+
+class RateLimitRule:
+    def __init__(self, name: str, limiter):
+        self.name = name
+        self.limiter = limiter
+        self.allowed = 0
+        self.limited = 0
+
+    def check(self, key: str):
+        retry_after = self.limiter.hit(key)
+        if retry_after is None:
+            self.allowed += 1
+            return
+        self.limited += 1
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many attempts, please retry later",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limiter.limit,
+            "window_seconds": self.limiter.window_seconds,
+            "allowed": self.allowed,
+            "limited": self.limited,
+        }
+
+
+def create_rules(backend: str = RATE_LIMIT_BACKEND) -> Dict[str, RateLimitRule]:
+    client = RedisClient() if backend == "redis" else None
+    rules = {}
+    for name, rule in RATE_LIMIT_RULES.items():
+        limit, seconds = parse_rule(rule)
+        if backend == "memory":
+            limiter = TokenBucketLimiter(limit, seconds)
+        elif backend == "redis":
+            limiter = RedisSlidingWindowLimiter(client, name, limit, seconds)
+        else:
+            raise ValueError(f"Unknown RATE_LIMIT_BACKEND: {backend}")
+        rules[name] = RateLimitRule(name, limiter)
+    return rules
+
+
+rate_limit_rules = create_rules()
+
+
+def reset():
+    for rule in rate_limit_rules.values():
+        rule.allowed = rule.limited = 0
+        rule.limiter.reset()
+
+
+def client_ip(request: Request) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+# --- Route dependencies (declare the same body parameter name as the route) ---
+
+def limit_login(request: Request, user: schemas.UserLogin):
+    rate_limit_rules["login_ip"].check(client_ip(request))
+    rate_limit_rules["login_email"].check(user.email.strip().lower())
+
+
+def limit_register(request: Request):
+    rate_limit_rules["login_ip"].check(client_ip(request))
+
+
+def limit_verify_code(request: Request, data: schemas.VerifyCode):
+    rate_limit_rules["verify_ip"].check(client_ip(request))
+    rate_limit_rules["verify_session"].check(data.session_id)
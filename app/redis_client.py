@@ -0,0 +1,178 @@
+# app/redis_client.py
+"""Minimal blocking Redis (RESP2) client.
+
+Covers the handful of commands the app needs (GET/SET/DEL/INCR/EXPIRE, plus
+pipelining) without adding a dependency. Connections are pooled per client and a connection that
+hit an I/O error is discarded rather than reused.
+"""
+import os
+import socket
+import threading
+from typing import List, Optional
+from urllib.parse import unquote, urlparse
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "1.0"))
+REDIS_MAX_IDLE_CONNECTIONS = int(os.getenv("REDIS_MAX_IDLE_CONNECTIONS", "8"))
+
+
+class RedisError(Exception):
+    """Connection failures and error replies (-ERR ...)"""
+
+
+class RedisConnectionError(RedisError):
+    """The connection is unusable and must not go back to the pool"""
+
+
+def _encode(args) -> bytes:
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, bytes):
+            data = arg
+        elif isinstance(arg, str):
+            data = arg.encode()
+        else:
+            data = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+class _Connection:
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.reader = self.sock.makefile("rb")
+
+    def send(self, args):
+        self.sock.sendall(_encode(args))
+
+    def _line(self) -> bytes:
+        line = self.reader.readline()
+        if not line.endswith(b"\r\n"):
+            raise RedisConnectionError("Connection closed by server")
+        return line[:-2]
+
+    def read_reply(self):
+        line = self._line()
+        kind, rest = line[:1], line[1:]
+        if kind == b"+":
+            return rest.decode()
+        if kind == b"-":
+            raise RedisError(rest.decode())
+        if kind == b":":
+            return int(rest)
+        if kind == b"$":
+            length = int(rest)
+            if length < 0:
+                return None
+            data = self.reader.read(length + 2)
+            if len(data) != length + 2:
+                raise RedisConnectionError("Connection closed by server")
+            return data[:-2]
+        if kind == b"*":
+            count = int(rest)
+            return None if count < 0 else [self.read_reply() for _ in range(count)]
+        raise RedisConnectionError(f"Unexpected reply: {line!r}")
+
+    def close(self):
+        try:
+            self.reader.close()
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class RedisClient:
+    def __init__(self, url: str = REDIS_URL, timeout: float = REDIS_SOCKET_TIMEOUT,
+                 max_idle: int = REDIS_MAX_IDLE_CONNECTIONS):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._idle: List[_Connection] = []
+        self._lock = threading.Lock()
+
+    def _connect(self) -> _Connection:
+        try:
+            conn = _Connection(self.host, self.port, self.timeout)
+        except OSError as e:
+            raise RedisConnectionError(f"Cannot connect to Redis at {self.host}:{self.port}: {e}") from e
+        try:
+            if self.password:
+                conn.send(["AUTH", self.password])
+                conn.read_reply()
+            if self.db:
+                conn.send(["SELECT", self.db])
+                conn.read_reply()
+        except OSError as e:
+            conn.close()
+            raise RedisConnectionError(str(e)) from e
+        except RedisError:
+            conn.close()
+            raise
+        return conn
+
+    def execute(self, *args):
+        return self.execute_many(args)[0]
+
+    def execute_many(self, *commands) -> list:
+        """Pipeline: send every command, then read every reply (one round trip)"""
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            conn.sock.sendall(b"".join(_encode(args) for args in commands))
+            replies = []
+            error = None
+            for _ in commands:
+                try:
+                    replies.append(conn.read_reply())
+                except RedisConnectionError:
+                    raise
+                except RedisError as e:
+                    # Keep reading so the connection stays in sync
+                    error = error or e
+                    replies.append(None)
+        except RedisConnectionError:
+            conn.close()
+            raise
+        except OSError as e:
+            conn.close()
+            raise RedisConnectionError(str(e)) from e
+        self._release(conn)
+        if error is not None:
+            raise error
+        return replies
+
+    def _release(self, conn: _Connection):
+        with self._lock:
+            if len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+    # --- Commands ---
+
+    def ping(self) -> bool:
+        return self.execute("PING") == "PONG"
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.execute("GET", key)
+
+    def set(self, key: str, value, ex: Optional[int] = None) -> bool:
+        args = ["SET", key, value]
+        if ex is not None:
+            args += ["EX", ex]
+        return self.execute(*args) == "OK"
+
+    def delete(self, *keys: str) -> int:
+        return self.execute("DEL", *keys)
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app.database import get_async_db
+from app import analytics, models, schemas
+from app.cache import eye_analytics_cache
+# 本番環境では以下のコメントを外して認証を有効化
+# from app.routers.auth import get_current_user
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"]
+)
+
+def cached_eye_trends(db: Session, child_id: int, window: int):
+    """キャッシュは子供の視力チェックの指紋（最新test_idと件数）が変わっていなければ使う"""
+    fingerprint = analytics.eye_test_fingerprint(db, child_id)
+    cache_key = (child_id, window)
+    cached = eye_analytics_cache.get(cache_key)
+    if cached is not None and cached[0] == fingerprint:
+        return cached[1]
+    trends = analytics.get_eye_trends(db, child_id, window)
+    eye_analytics_cache.set(cache_key, (fingerprint, trends))
+    return trends
+
+@router.get("/eyetests/{child_id}", response_model=schemas.EyeTrendResponse)
+async def get_eye_trends(
+    child_id: int,
+    window: int = Query(3, ge=1, le=30),
+    db: AsyncSession = Depends(get_async_db),
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    """視力の推移（移動平均・左右差・変化率、3m / 30cm の比較）。次の視力チェックまでキャッシュ"""
+    trends = await db.run_sync(cached_eye_trends, child_id, window)
+    return {"child_id": child_id, **trends}
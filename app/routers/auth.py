@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import timedelta
-import os
-import requests
 from typing import Optional
 
-from app import schemas, models, crud, utils
-from app.database import get_db
+from app import schemas, models, crud, rate_limit, utils
+from app.cache import principal_cache, revoked_refresh_tokens
+from app.database import get_db, get_async_db
+from app.line_client import LineError, line_client
+from app.redis_client import RedisError
+from app.verification_store import VERIFICATION_CODE_TTL_SECONDS, verification_store
 
 router = APIRouter(
     prefix="/auth",
@@ -31,48 +35,106 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         parent_id = int(parent_id_str)
     except (ValueError, TypeError):
         raise credentials_exception
+
+    # The JWT is still verified above (signature, exp); only the Parent lookup is cached
+    cache_key = utils.get_token_hash(token)
+    user = principal_cache.get(cache_key)
+    if user is not None:
+        return user
+
     user = db.query(models.Parent).filter(models.Parent.parent_id == parent_id).first()
     if user is None:
         raise credentials_exception
+    user = snapshot_parent(user)
+    principal_cache.set(cache_key, user)
     return user
 
+def snapshot_parent(parent: models.Parent) -> models.Parent:
+    # Detached copy of the column values so the cached principal is never bound to a session
+    return models.Parent(**{
+        column.key: getattr(parent, column.key)
+        for column in models.Parent.__table__.columns
+    })
+
 # --- Email Auth Endpoints ---
 
-@router.post("/register", response_model=schemas.UserResponse)
-def register(user: schemas.UserRegister, db: Session = Depends(get_db)):
-    db_user = crud.get_parent_by_email(db, email=user.email)
+def password_hasher_busy_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many login attempts in progress, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+def verification_unavailable_exception():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Verification service unavailable, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+@router.post("/register", response_model=schemas.UserResponse, dependencies=[Depends(rate_limit.limit_register)])
+async def register(user: schemas.UserRegister, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(crud.get_parent_by_email, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    return crud.create_parent(db=db, user=user)
 
-@router.post("/login")
-def login(user: schemas.UserLogin, db: Session = Depends(get_db)):
-    db_user = crud.get_parent_by_email(db, email=user.email)
-    if not db_user or not utils.verify_password(user.password, db_user.password_hash):
+    # bcrypt runs on its own bounded executor, not on the request threadpool
+    try:
+        hashed_password = await utils.get_password_hash_async(user.password)
+    except utils.PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    return await db.run_sync(crud.create_parent, user, hashed_password)
+
+@router.post("/login", dependencies=[Depends(rate_limit.limit_login)])
+async def login(user: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.run_sync(crud.get_parent_by_email, user.email)
+    if not db_user or not db_user.password_hash:
         raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    try:
+        valid, new_hash = await utils.verify_password_async(user.password, db_user.password_hash)
+    except utils.PasswordHasherBusy:
+        raise password_hasher_busy_exception()
+    if not valid:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+
+    if new_hash:
+        # BCRYPT_ROUNDS changed: upgrade the stored hash (committed with the code below)
+        db_user.password_hash = new_hash
     
     # Generate verification code
     code = utils.generate_verification_code()
     session_id = utils.generate_session_id()
     
-    # Store code
-    crud.store_verification_code(db, user.email, code, session_id)
+    # Store code (the DB store also commits the rehash above)
+    try:
+        if verification_store.uses_db:
+            await db.run_sync(verification_store.save, user.email, code, session_id)
+        else:
+            if new_hash:
+                await db.commit()
+            await run_in_threadpool(verification_store.save, None, user.email, code, session_id)
+    except RedisError:
+        raise verification_unavailable_exception()
     
     # In a real app, send email here. For now, return in response as requested.
     return {
         "message": "Verification code generated",
         "session_id": session_id,
         "verification_code": code, # For display purposes
-        "expires_in": 300
+        "expires_in": VERIFICATION_CODE_TTL_SECONDS
     }
 
-@router.post("/verify-code", response_model=schemas.Token)
+@router.post("/verify-code", response_model=schemas.Token, dependencies=[Depends(rate_limit.limit_verify_code)])
 def verify_code(data: schemas.VerifyCode, db: Session = Depends(get_db)):
-    record = crud.verify_code(db, data.session_id, data.verification_code)
-    if not record:
+    try:
+        email = verification_store.verify(db, data.session_id, data.verification_code)
+    except RedisError:
+        raise verification_unavailable_exception()
+    if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired verification code")
     
-    user = crud.get_parent_by_email(db, record.email)
+    user = crud.get_parent_by_email(db, email)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -101,60 +163,15 @@ def verify_code(data: schemas.VerifyCode, db: Session = Depends(get_db)):
 
 # --- LINE Auth Endpoints ---
 
-LINE_CHANNEL_ID = os.getenv("LINE_CHANNEL_ID")
-LINE_CHANNEL_SECRET = os.getenv("LINE_CHANNEL_SECRET")
-LINE_REDIRECT_URI = os.getenv("LINE_REDIRECT_URI") # e.g. http://localhost:3000/auth/callback
-
 @router.get("/line/login")
 def line_login():
-    if not LINE_CHANNEL_ID or not LINE_REDIRECT_URI:
+    if not line_client.channel_id or not line_client.redirect_uri:
         raise HTTPException(status_code=500, detail="LINE configuration missing")
         
     state = utils.generate_session_id() # Simple state generation
-    # Redirect URL
-    url = f"https://access.line.me/oauth2/v2.1/authorize?response_type=code&client_id={LINE_CHANNEL_ID}&redirect_uri={LINE_REDIRECT_URI}&state={state}&scope=profile%20openid%20email"
-    return {"url": url}
-
-@router.post("/line/callback")
-def line_callback(data: schemas.LineLoginCallback, db: Session = Depends(get_db)):
-    # Verify implementation on frontend calls this with code
-    
-    if not LINE_CHANNEL_ID or not LINE_CHANNEL_SECRET or not LINE_REDIRECT_URI:
-        raise HTTPException(status_code=500, detail="LINE configuration missing")
+    return {"url": line_client.authorize_url(state)}
 
-    # Exchange code for token
-    token_url = "https://api.line.me/oauth2/v2.1/token"
-    headers = {"Content-Type": "application/x-www-form-urlencoded"}
-    payload = {
-        "grant_type": "authorization_code",
-        "code": data.code,
-        "redirect_uri": LINE_REDIRECT_URI,
-        "client_id": LINE_CHANNEL_ID,
-        "client_secret": LINE_CHANNEL_SECRET
-    }
-    
-    res = requests.post(token_url, headers=headers, data=payload)
-    if res.status_code != 200:
-        raise HTTPException(status_code=400, detail="Failed to get LINE token")
-        
-    token_data = res.json()
-    id_token = token_data.get("id_token") # contains user info
-    
-    # Verify ID token (simplified, ideally verify signature)
-    # Get user profile
-    profile_url = "https://api.line.me/v2/profile"
-    profile_headers = {"Authorization": f"Bearer {token_data['access_token']}"}
-    profile_res = requests.get(profile_url, headers=profile_headers)
-    
-    if profile_res.status_code != 200:
-        raise HTTPException(status_code=400, detail="Failed to get LINE profile")
-    
-    profile = profile_res.json()
-    line_user_id = profile["userId"]
-    # Email is available in id_token payload if scope includes email and user permitted
-    # For simplicity, we might generate a dummy email or extract from id_token if critical
-    # Here assuming we just use line_id to login or create
-    
+def login_line_user(db: Session, line_user_id: str) -> dict:
     # Check if user exists by LINE ID
     user = db.query(models.Parent).filter(models.Parent.line_id == line_user_id).first()
     
@@ -183,6 +200,30 @@ def line_callback(data: schemas.LineLoginCallback, db: Session = Depends(get_db)
         }
     }
 
+@router.post("/line/callback")
+async def line_callback(data: schemas.LineLoginCallback, db: AsyncSession = Depends(get_async_db)):
+    # Verify implementation on frontend calls this with code
+    
+    if not line_client.configured:
+        raise HTTPException(status_code=500, detail="LINE configuration missing")
+
+    try:
+        token_data = await line_client.exchange_code(data.code)
+    except LineError:
+        raise HTTPException(status_code=400, detail="Failed to get LINE token")
+
+    # The verified ID token carries the LINE user ID, so the profile call is only a fallback
+    id_token = token_data.get("id_token")
+    try:
+        if id_token:
+            line_user_id = (await line_client.verify_id_token(id_token))["sub"]
+        else:
+            line_user_id = (await line_client.get_profile(token_data["access_token"]))["userId"]
+    except LineError:
+        raise HTTPException(status_code=400, detail="Failed to verify LINE user")
+
+    return await db.run_sync(login_line_user, line_user_id)
+
 @router.get("/me", response_model=schemas.UserResponse)
 def read_users_me(current_user: models.Parent = Depends(get_current_user)):
     return current_user
@@ -210,27 +251,36 @@ def get_my_children(
         ]
     }
 
+def refresh_claims(token: str, credentials_exception) -> tuple:
+    """(parent_id, jti) of a refresh token; access tokens carry no jti and are rejected"""
+    payload = utils.verify_token(token, credentials_exception)
+    jti = payload.get("jti")
+    try:
+        parent_id = int(payload.get("sub"))
+    except (ValueError, TypeError):
+        raise credentials_exception
+    if not jti:
+        raise credentials_exception
+    return parent_id, jti
+
 @router.post("/refresh", response_model=schemas.RefreshResponse)
 def refresh_token(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
-    # Verify refresh token
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    try:
-        payload = utils.verify_token(request.refresh_token, credentials_exception)
-        parent_id_str: str = payload.get("sub")
-        if parent_id_str is None:
-            raise credentials_exception
-        parent_id = int(parent_id_str)
-    except Exception:
+    parent_id, jti = refresh_claims(request.refresh_token, credentials_exception)
+    # Replays of a token this worker already rotated or revoked never reach the database
+    if revoked_refresh_tokens.get(jti):
         raise credentials_exception
-        
-    # Check if refresh token is in DB (optional/TODO: implement proper revocation check)
-    # For now simply issue new access token
-    
+
+    # Rotate: the presented token is checked and replaced in one indexed UPDATE
+    new_refresh_token = utils.create_refresh_token(data={"sub": str(parent_id)})
+    if not crud.rotate_refresh_token(db, jti, request.refresh_token, new_refresh_token):
+        raise credentials_exception
+    revoked_refresh_tokens.set(jti, True)
+
     access_token_expires = timedelta(minutes=utils.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = utils.create_access_token(
         data={"sub": str(parent_id)}, expires_delta=access_token_expires
@@ -238,6 +288,18 @@ def refresh_token(request: schemas.RefreshRequest, db: Session = Depends(get_db)
     
     return {
         "access_token": access_token,
+        "refresh_token": new_refresh_token,
         "token_type": "bearer",
         "expires_in": utils.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     }
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(request: schemas.RefreshRequest, db: Session = Depends(get_db)):
+    """リフレッシュトークンを無効化（無効・期限切れのトークンでも204）"""
+    try:
+        _, jti = refresh_claims(request.refresh_token, HTTPException(status_code=status.HTTP_401_UNAUTHORIZED))
+    except HTTPException:
+        return None
+    crud.revoke_refresh_token(db, jti, request.refresh_token)
+    revoked_refresh_tokens.set(jti, True)
+    return None
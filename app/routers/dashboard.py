@@ -1,8 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from app.database import get_db
-from app import models, schemas
+from app.database import get_async_db
+from app import models, schemas, crud
 
 router = APIRouter(
     prefix="/dashboard",
@@ -10,33 +11,19 @@ router = APIRouter(
 )
 
 @router.get("/child/{child_id}")
-def get_child_dashboard(child_id: int, db: Session = Depends(get_db)):
+async def get_child_dashboard(child_id: int, db: AsyncSession = Depends(get_async_db)):
     import traceback
     try:
-        child = db.query(models.Child).filter(models.Child.child_id == child_id).first()
+        child = await db.scalar(select(models.Child).filter(models.Child.child_id == child_id))
         if not child:
             raise HTTPException(status_code=404, detail="Child not found")
 
         # Fetch recent data (limit 5 for summary)
-        recent_exercises = db.query(models.ExerciseLog)\
-            .filter(models.ExerciseLog.child_id == child_id)\
-            .order_by(models.ExerciseLog.exercise_date.desc())\
-            .limit(5).all()
-
-        recent_distance_checks = db.query(models.DistanceCheck)\
-            .filter(models.DistanceCheck.child_id == child_id)\
-            .order_by(models.DistanceCheck.check_date.desc())\
-            .limit(5).all()
-
-        recent_eye_tests = db.query(models.EyeTest)\
-            .filter(models.EyeTest.child_id == child_id)\
-            .order_by(models.EyeTest.check_date.desc(), models.EyeTest.created_at.desc())\
-            .limit(30).all()
-
-        recent_screentime = db.query(models.ScreenTime)\
-            .filter(models.ScreenTime.child_id == child_id)\
-            .order_by(models.ScreenTime.start_time.desc())\
-            .limit(30).all()
+        recent = (await db.run_sync(crud.load_dashboard_data, [child_id]))[child_id]
+        recent_exercises = recent["recent_exercises"]
+        recent_distance_checks = recent["recent_distance_checks"]
+        recent_eye_tests = recent["recent_eye_tests"]
+        recent_screentime = recent["recent_screentime"]
 
         # Manually validate and return valid model
         try:
@@ -62,42 +49,23 @@ def get_child_dashboard(child_id: int, db: Session = Depends(get_db)):
         raise e
 
 @router.get("/parent/{parent_id}", response_model=schemas.DashboardParentResponse)
-def get_parent_dashboard(parent_id: int, db: Session = Depends(get_db)):
-    parent = db.query(models.Parent).filter(models.Parent.parent_id == parent_id).first()
+async def get_parent_dashboard(parent_id: int, db: AsyncSession = Depends(get_async_db)):
+    parent = await db.scalar(select(models.Parent).filter(models.Parent.parent_id == parent_id))
     if not parent:
         raise HTTPException(status_code=404, detail="Parent not found")
 
-    children = db.query(models.Child).filter(models.Child.parent_id == parent_id).all()
+    children = (await db.scalars(select(models.Child).filter(models.Child.parent_id == parent_id))).all()
     
+    # Fetch recent data for all children at once (fixed number of queries)
+    recent_by_child = await db.run_sync(
+        crud.load_dashboard_data, [child.child_id for child in children]
+    )
+
     children_data = []
     for child in children:
-        # Re-use logic or call internal function (simplifying here by repeating for clarity/speed)
-        recent_exercises = db.query(models.ExerciseLog)\
-            .filter(models.ExerciseLog.child_id == child.child_id)\
-            .order_by(models.ExerciseLog.exercise_date.desc())\
-            .limit(5).all()
-
-        recent_distance_checks = db.query(models.DistanceCheck)\
-            .filter(models.DistanceCheck.child_id == child.child_id)\
-            .order_by(models.DistanceCheck.check_date.desc())\
-            .limit(5).all()
-
-        recent_eye_tests = db.query(models.EyeTest)\
-            .filter(models.EyeTest.child_id == child.child_id)\
-            .order_by(models.EyeTest.check_date.desc(), models.EyeTest.created_at.desc())\
-            .limit(30).all()
-
-        recent_screentime = db.query(models.ScreenTime)\
-            .filter(models.ScreenTime.child_id == child.child_id)\
-            .order_by(models.ScreenTime.start_time.desc())\
-            .limit(30).all()
-            
         children_data.append({
             "child": child,
-            "recent_exercises": recent_exercises,
-            "recent_distance_checks": recent_distance_checks,
-            "recent_eye_tests": recent_eye_tests,
-            "recent_screentime": recent_screentime
+            **recent_by_child[child.child_id]
         })
 
     # Manually validate and return valid model
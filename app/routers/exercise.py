@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app import crud, schemas, models
-from app.database import get_db
+from app.database import get_db, get_async_db
 # 本番環境では以下のコメントを外して認証を有効化
 # from app.routers.auth import get_current_user
 
 router = APIRouter()
 
 @router.get("/child/{child_id}/exercise/stats", response_model=schemas.ExerciseStats)
-def get_stats(
+async def get_stats(
     child_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # 本番環境では以下のコメントを外して認証を有効化
     # current_user: models.Parent = Depends(get_current_user)
 ):
     """統計情報取得"""
     try:
-        stats = crud.get_exercise_stats(db, child_id)
+        # 既存の同期CRUDを非同期コネクション上で実行
+        stats = await db.run_sync(crud.get_exercise_stats, child_id)
         return stats
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -31,20 +33,15 @@ def log_exercise_endpoint(
 ):
     """エクササイズ実施記録"""
     try:
+        # 記録と更新後の統計情報を1トランザクションで取得
         result = crud.log_exercise(
             db, 
             child_id, 
             request.exercise_id, 
             request.exercise_date
         )
-        
-        # 更新された統計情報を取得
-        stats = crud.get_exercise_stats(db, child_id)
-        
-        return {
-            "success": result["success"],
-            "message": result["message"],
-            "stats": stats
-        }
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
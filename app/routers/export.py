@@ -0,0 +1,34 @@
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.database import get_db, get_session_factory
+from app import export, models
+# 本番環境では以下のコメントを外して認証を有効化
+# from app.routers.auth import get_current_user
+
+router = APIRouter(
+    prefix="/export",
+    tags=["export"]
+)
+
+@router.get("/children/{child_id}")
+def export_child_history(
+    child_id: int,
+    fmt: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    db: Session = Depends(get_db),
+    session_factory=Depends(get_session_factory),
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    """子供の全履歴（視力・距離チェック・エクササイズ・スクリーンタイム）をストリーミングで書き出す"""
+    if db.get(models.Child, child_id) is None:
+        raise HTTPException(status_code=404, detail="Child not found")
+
+    media_type, _ = export.FORMATS[fmt]
+    return StreamingResponse(
+        export.stream_child_history(session_factory, child_id, fmt),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="child_{child_id}_history.{fmt}"'}
+    )
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List
 from datetime import date, datetime
 import random
-from app.database import get_db
-from app import models, schemas
+from app.database import get_async_db
+from app import crud, models, schemas
+from app.cache import home_cache
 # 本番環境では以下のコメントを外して認証を有効化
 # from app.routers.auth import get_current_user
 
@@ -13,38 +15,44 @@ router = APIRouter(
     tags=["home"]
 )
 
-@router.get("/{child_id}", response_model=schemas.HomeResponse)
-def get_home_data(
-    child_id: int,
-    db: Session = Depends(get_db),
-    # 本番環境では以下のコメントを外して認証を有効化
-    # current_user: models.Parent = Depends(get_current_user)
-):
+def cached_home_data(db: Session, child_id: int, today: date):
+    """ミッションと前回結果。キャッシュは子供のバージョンが変わっていなければ使う
+
+    ヒットでもバージョンの参照（主キー1件）で1クエリかかる。省けるのはホームデータの取得だけ
+    """
+    version = crud.get_cache_version(db, crud.home_version_name(child_id))
+    cache_key = (child_id, today)
+    cached = home_cache.get(cache_key)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
     # 1. Verify Child Exists
     # 本番環境では認証を有効化した場合、以下のクエリに parent_id チェックを追加
     # child = db.query(models.Child).filter(
     #     models.Child.child_id == child_id,
     #     models.Child.parent_id == current_user.parent_id  # 所有者チェック
     # ).first()
-    child = db.query(models.Child).filter(models.Child.child_id == child_id).first()
-    if not child:
+    # Child and the latest EyeTest / DistanceCheck / completed ScreenTime in one round trip
+    row = db.execute(crud.home_data_statement(child_id)).first()
+    if not row:
         # For development, if child doesn't exist, we might want to return dummy data or create one?
         # But correctly we should 404. 
         # For this prototype, let's just return 404.
         raise HTTPException(status_code=404, detail="Child not found")
+    missions, last_results = build_home_data(row, today)
+    # Stored with the version read before loading: a write in between only causes one more reload
+    home_cache.set(cache_key, (version, missions, last_results))
+    return missions, last_results
 
-    today = date.today()
+def build_home_data(row, today: date):
+    """(Child, 最新EyeTest, 最新DistanceCheck, 最新の終了済みScreenTime) からミッションと前回結果を作る"""
+    child, last_eye_test, last_distance_check, last_screentime = row
 
     # 2. Daily Missions Logic
     missions = []
     
     # Check simple missions based on logs (Dummy logic for now as logs might be empty)
     # Eye Test Status
-    last_eye_test = db.query(models.EyeTest)\
-        .filter(models.EyeTest.child_id == child_id)\
-        .order_by(models.EyeTest.check_date.desc(), models.EyeTest.created_at.desc())\
-        .first()
-        
     eye_test_done = last_eye_test and last_eye_test.check_date == today
     missions.append(schemas.DailyMission(
         mission_id="eye_test",
@@ -54,11 +62,6 @@ def get_home_data(
     ))
 
     # Distance Check Status
-    last_distance_check = db.query(models.DistanceCheck)\
-        .filter(models.DistanceCheck.child_id == child_id)\
-        .order_by(models.DistanceCheck.check_date.desc())\
-        .first()
-        
     distance_done = last_distance_check and last_distance_check.check_date == today
     missions.append(schemas.DailyMission(
         mission_id="distance_check",
@@ -95,16 +98,28 @@ def get_home_data(
         last_results.avg_distance_cm = last_distance_check.avg_distance_cm
         last_results.posture_score = last_distance_check.posture_score
 
-    # Get latest completed screentime session
-    last_screentime = db.query(models.ScreenTime)\
-        .filter(models.ScreenTime.child_id == child_id)\
-        .filter(models.ScreenTime.end_time != None)\
-        .order_by(models.ScreenTime.end_time.desc())\
-        .first()
-
+    # Latest completed screentime session
     if last_screentime:
         last_results.total_screentime_minutes = last_screentime.total_minutes
 
+    return missions, last_results
+
+@router.get("/{child_id}", response_model=schemas.HomeResponse)
+async def get_home_data(
+    child_id: int,
+    db: AsyncSession = Depends(get_async_db),
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    missions, last_results = await db.run_sync(cached_home_data, child_id, date.today())
+
+    return schemas.HomeResponse(
+        missions=missions,
+        last_results=last_results,
+        character_message=pick_character_message()
+    )
+
+def pick_character_message() -> str:
     # 4. Character Message Logic
     # Time-based or general messages (randomly selected)
     now = datetime.now()
@@ -158,11 +173,7 @@ def get_home_data(
         # ふだん用メッセージを表示
         message = random.choice(general_messages)
 
-    return schemas.HomeResponse(
-        missions=missions,
-        last_results=last_results,
-        character_message=message
-    )
+    return message
 
 @router.get("/character/message/{child_id}")
 def get_character_message(
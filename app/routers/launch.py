@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from datetime import date
+from app.database import get_async_db
+from app import crud, models, schemas
+from app.routers.auth import get_current_user
+from app.routers.home import cached_home_data, pick_character_message
+
+router = APIRouter(
+    prefix="/bootstrap",
+    tags=["bootstrap"]
+)
+
+def load_launch_data(db: Session, parent: models.Parent, today: date) -> dict:
+    """起動時に必要なデータをまとめて取得（1セッション・1コネクション）"""
+    children = db.query(models.Child)\
+        .filter(models.Child.parent_id == parent.parent_id)\
+        .order_by(models.Child.child_id)\
+        .all()
+    settings = crud.get_or_create_settings(db, parent.parent_id)
+
+    # 設定の子供が見つからなければ最初の子供を表示
+    child_ids = [child.child_id for child in children]
+    selected_child_id = settings.child_id if settings.child_id in child_ids else (child_ids[0] if child_ids else None)
+
+    home = None
+    exercise_stats = None
+    if selected_child_id is not None:
+        missions, last_results = cached_home_data(db, selected_child_id, today)
+        home = schemas.HomeResponse(
+            missions=missions,
+            last_results=last_results,
+            character_message=pick_character_message()
+        )
+        exercise_stats = crud.get_exercise_stats(db, selected_child_id)
+
+    return {
+        "me": parent,
+        "children": children,
+        "settings": settings,
+        "selected_child_id": selected_child_id,
+        "home": home,
+        "exercise_stats": exercise_stats,
+    }
+
+@router.get("", response_model=schemas.LaunchResponse)
+async def get_launch_data(
+    current_user: models.Parent = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """/auth/me・/auth/children・設定・ホーム・運動統計を1リクエストで返す"""
+    # A single session can only run one statement at a time, so the lookups run back to
+    # back on one connection instead of five requests each checking out their own
+    return await db.run_sync(load_launch_data, current_user, date.today())
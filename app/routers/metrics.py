@@ -0,0 +1,61 @@
+from fastapi import APIRouter
+from app import background, bootstrap, database, rate_limit
+from app.cache import eye_analytics_cache, home_cache, principal_cache
+from app.screentime_registry import screentime_registry
+from app.screentime_heartbeats import heartbeat_buffer
+from app.line_client import line_client
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """DBコネクションプールの利用状況（使用中・待機中・オーバーフロー・待ち時間）"""
+    return database.get_pool_status()
+
+@router.get("/startup")
+def get_startup_metrics():
+    """起動処理の結果と所要時間"""
+    return bootstrap.startup_report
+
+@router.get("/auth-cache")
+def get_auth_cache_metrics():
+    """認証済みユーザーキャッシュのヒット率"""
+    return principal_cache.stats()
+
+@router.get("/screentime-registry")
+def get_screentime_registry_metrics():
+    """使用中スクリーンタイムのメモリ上の一覧（件数・バージョン・再読み込み回数）"""
+    return screentime_registry.stats()
+
+@router.get("/background")
+def get_background_metrics():
+    """バックグラウンド処理の実行回数・所要時間・直近の結果"""
+    return {name: task.stats() for name, task in background.background_tasks.items()}
+
+@router.get("/screentime-heartbeats")
+def get_screentime_heartbeat_metrics():
+    """ハートビートの書き込み待ち件数とまとめ書きの回数"""
+    return heartbeat_buffer.stats()
+
+@router.get("/home-cache")
+def get_home_cache_metrics():
+    """ホーム画面データキャッシュのヒット率"""
+    return home_cache.stats()
+
+@router.get("/analytics-cache")
+def get_analytics_cache_metrics():
+    """視力推移の分析結果キャッシュのヒット率"""
+    return eye_analytics_cache.stats()
+
+@router.get("/line")
+def get_line_client_metrics():
+    """LINE APIへのリクエスト数・リトライ数・署名鍵（JWKS）の取得回数"""
+    return line_client.stats()
+
+@router.get("/rate-limit")
+def get_rate_limit_metrics():
+    """ログイン系エンドポイントのレート制限（ルールごとの許可・拒否数）"""
+    return {name: rule.stats() for name, rule in rate_limit.rate_limit_rules.items()}
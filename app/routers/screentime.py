@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
-import math
-from app.database import get_db
-from app import models, schemas
+import asyncio
+from app.database import get_db, get_async_db, AsyncSessionLocal
+from app import models, schemas, crud
+from app.screentime_alerts import alert_scheduler, create_status_response, inactive_status
+from app.screentime_registry import ensure_fresh, screentime_registry, version_name_for
+from app.screentime_heartbeats import heartbeat_buffer
 # 本番環境では以下のコメントを外して認証を有効化
 # from app.routers.auth import get_current_user
 
@@ -21,10 +27,14 @@ def start_screentime(
 ):
     # Check if there is already an active session for this child
     # If active session exists (end_time is Null), resume it
-    active_session = db.query(models.ScreenTime)\
-        .filter(models.ScreenTime.child_id == request.child_id)\
-        .filter(models.ScreenTime.end_time == None)\
-        .first()
+    ensure_fresh(db)
+    active_session = screentime_registry.get(request.child_id)
+    if not active_session:
+        # Not in this worker's registry yet: another worker may have just started one
+        active_session = db.query(models.ScreenTime)\
+            .filter(models.ScreenTime.child_id == request.child_id)\
+            .filter(models.ScreenTime.end_time == None)\
+            .first()
     
     if active_session:
         # Calculate elapsed
@@ -37,31 +47,28 @@ def start_screentime(
         start_time=datetime.now()
     )
     db.add(new_session)
+    version = crud.bump_cache_version(db, version_name_for(request.child_id))
     db.commit()
     db.refresh(new_session)
+    screentime_registry.put(request.child_id, new_session, version)
+    alert_scheduler.session_started(request.child_id, new_session)
     
     return create_status_response(new_session, 0)
 
 @router.get("/status", response_model=schemas.ScreenTimeStatus)
-def get_status(
+async def get_status(
     child_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     # 本番環境では以下のコメントを外して認証を有効化
     # current_user: models.Parent = Depends(get_current_user)
 ):
-    active_session = db.query(models.ScreenTime)\
-        .filter(models.ScreenTime.child_id == child_id)\
-        .filter(models.ScreenTime.end_time == None)\
-        .first()
+    # Answered from memory; the DB is only touched for the periodic version check
+    if screentime_registry.needs_check():
+        await db.run_sync(ensure_fresh)
+    active_session = screentime_registry.get(child_id)
     
     if not active_session:
-        return schemas.ScreenTimeStatus(
-            screentime_id=0,
-            is_active=False,
-            message="きょうは まだ つかってないよ",
-            alert_level=0,
-            elapsed_seconds=0
-        )
+        return inactive_status()
     
     elapsed = (datetime.now() - active_session.start_time).total_seconds()
     return create_status_response(active_session, elapsed)
@@ -73,52 +80,100 @@ def end_screentime(
     # 本番環境では以下のコメントを外して認証を有効化
     # current_user: models.Parent = Depends(get_current_user)
 ):
-    active_session = db.query(models.ScreenTime)\
-        .filter(models.ScreenTime.child_id == request.child_id)\
-        .filter(models.ScreenTime.end_time == None)\
-        .first()
+    ensure_fresh(db)
+    active_session = None
+    registered = screentime_registry.get(request.child_id)
+    # Lock the row so the abandoned-session sweeper skips it while we close it
+    if registered:
+        active_session = db.get(models.ScreenTime, registered.screentime_id, with_for_update=True)
+    if not active_session or active_session.end_time is not None:
+        active_session = db.query(models.ScreenTime)\
+            .filter(models.ScreenTime.child_id == request.child_id)\
+            .filter(models.ScreenTime.end_time == None)\
+            .with_for_update()\
+            .first()
     
     if not active_session:
         raise HTTPException(status_code=404, detail="Active session not found")
     
-    now = datetime.now()
-    active_session.end_time = now
-    
-    # Calculate minutes rounded up? or standard?
-    delta = now - active_session.start_time
-    total_minutes = math.ceil(delta.total_seconds() / 60)
-    active_session.total_minutes = total_minutes
-    
-    # Check alert flag if > 30 min (dummy logic for now, could be passed from frontend or calculated)
-    if total_minutes >= 30:
-        active_session.alert_flag = True
-        
+    crud.close_screentime_session(db, active_session, datetime.now())
+    version = crud.bump_cache_version(db, version_name_for(request.child_id))
+    crud.bump_home_versions(db, [request.child_id])
     db.commit()
     db.refresh(active_session)
+    screentime_registry.remove(request.child_id, version)
+    alert_scheduler.session_ended(request.child_id)
     return active_session
 
-def create_status_response(session: models.ScreenTime, elapsed_seconds: float) -> schemas.ScreenTimeStatus:
-    minutes = elapsed_seconds / 60
-    
-    # Message Logic
-    if minutes < 10:
-        message = "あと すこし つかう？"
-        alert_level = 0
-    elif minutes < 20:
-        message = "そろそろ めを やすめようか"
-        alert_level = 1
-    elif minutes < 30:
-        message = "ながく みてると つかれちゃうよ"
-        alert_level = 1
-    else:
-        message = "おわったら めを やすめようね"
-        alert_level = 2
-        
-    return schemas.ScreenTimeStatus(
-        screentime_id=session.screentime_id,
-        is_active=True,
-        start_time=session.start_time,
-        elapsed_seconds=int(elapsed_seconds),
-        message=message,
-        alert_level=alert_level
+@router.post("/heartbeat", response_model=schemas.ScreenTimeHeartbeatResponse, status_code=202)
+def heartbeat(
+    request: schemas.ScreenTimeBase,
+    db: Session = Depends(get_db),
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    """使用中のアプリから定期的に呼ぶ。メモリにためてまとめてDBへ書き込む"""
+    ensure_fresh(db)
+    active_session = screentime_registry.get(request.child_id)
+    if not active_session:
+        raise HTTPException(status_code=404, detail="Active session not found")
+
+    if heartbeat_buffer.add(active_session.screentime_id, active_session.start_time, datetime.now()):
+        # Size threshold reached: this request writes the batch. On failure the beats
+        # stay buffered for the periodic flush, so the beat is still accepted.
+        try:
+            heartbeat_buffer.flush(db)
+        except SQLAlchemyError:
+            pass
+    return schemas.ScreenTimeHeartbeatResponse(screentime_id=active_session.screentime_id)
+
+@router.get("/summary", response_model=schemas.ScreenTimeSummaryResponse)
+async def get_summary(
+    child_id: int,
+    days: int = Query(7, ge=1, le=366),
+    db: AsyncSession = Depends(get_async_db),
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    """直近days日分の日別・週別スクリーンタイム（ScreenTimeDailyから集計）"""
+    return await db.run_sync(crud.get_screentime_summary, child_id, days)
+
+# SSE comment sent while idle so proxies (Azure App Service) keep the connection open
+SSE_KEEPALIVE_SECONDS = 15
+
+async def load_active_session(child_id: int):
+    # Own short-lived session: a stream must not hold a pooled connection while it waits
+    if screentime_registry.needs_check():
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(ensure_fresh)
+    return screentime_registry.get(child_id)
+
+@router.get("/stream")
+async def stream_status(
+    child_id: int,
+    request: Request,
+    # 本番環境では以下のコメントを外して認証を有効化
+    # current_user: models.Parent = Depends(get_current_user)
+):
+    """アラート段階やメッセージが変わったときだけステータスを送信（Server-Sent Events）"""
+    queue = await alert_scheduler.subscribe(child_id, load_active_session)
+
+    async def event_stream():
+        try:
+            while True:
+                try:
+                    status = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: status\ndata: {status.model_dump_json()}\n\n"
+        finally:
+            alert_scheduler.unsubscribe(child_id, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
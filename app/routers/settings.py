@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from app.database import get_db
-from app import models, schemas
+from app import crud, models, schemas
+from app.cache import invalidate_principal
 # 本番環境では以下のコメントを外して認証を有効化
 # from app.routers.auth import get_current_user
 
@@ -24,27 +25,7 @@ def get_settings(
     # if parent_id != current_user.parent_id:
     #     raise HTTPException(status_code=403, detail="Access denied")
 
-    settings = db.query(models.Settings).filter(models.Settings.parent_id == parent_id).first()
-    if not settings:
-        # Create default settings if not exists
-        # Ensure parent exists first (Mock logic: create parent if not exists for prototype)
-        parent = db.query(models.Parent).filter(models.Parent.parent_id == parent_id).first()
-        if not parent:
-            parent = models.Parent(parent_id=parent_id, email=f"parent{parent_id}@example.com")
-            db.add(parent)
-            db.commit()
-            
-        settings = models.Settings(parent_id=parent_id, voice_enabled=True)
-        # Try to set default child
-        child = db.query(models.Child).filter(models.Child.parent_id == parent_id).first()
-        if child:
-            settings.child_id = child.child_id
-            
-        db.add(settings)
-        db.commit()
-        db.refresh(settings)
-        
-    return settings
+    return crud.get_or_create_settings(db, parent_id)
 
 @router.put("/settings/{parent_id}", response_model=schemas.Settings)
 def update_settings(
@@ -69,6 +50,7 @@ def update_settings(
         
     db.commit()
     db.refresh(settings)
+    invalidate_principal(parent_id)
     return settings
 
 # --- Child Management API ---
@@ -165,5 +147,6 @@ def delete_child(
         db.add(settings)
 
     db.delete(db_child)
+    crud.bump_home_versions(db, [child_id])
     db.commit()
     return {"status": "deleted"}
@@ -1,10 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.orm import Session
-from app import models, schemas
+from datetime import date, datetime
+from typing import Optional
+from app import bulk, crud, models, schemas
+from app.pagination import decode_cursor, keyset_before, paginate
 from app.database import get_db
 
 router = APIRouter()
 
+# Largest page a client can ask for
+MAX_PAGE_SIZE = 500
+
+# test_type -> test_distance_cm
+TEST_DISTANCE_CM = {"30cm": 30, "3m": 300}
+
 @router.post("/results", response_model=None)
 def create_result(result: schemas.MeasurementResultCreate, db: Session = Depends(get_db)):
     db_result = models.MeasurementResult(
@@ -18,14 +27,27 @@ def create_result(result: schemas.MeasurementResultCreate, db: Session = Depends
     return db_result
 
 @router.get("/results", response_model=None)
-def read_results(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    results = db.query(models.MeasurementResult).offset(skip).limit(limit).all()
-    return results
+def read_results(
+    response: Response,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+):
+    """新しい順。続きは X-Next-Cursor ヘッダーの値を cursor に渡して取得"""
+    MeasurementResult = models.MeasurementResult
+    query = db.query(MeasurementResult)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, (datetime, int))
+        # date is nullable: NULL-date rows come last (DESC order on MySQL / SQLite)
+        query = query.filter(keyset_before(MeasurementResult.date, MeasurementResult.id, last_date, last_id, nullable=True))
+    elif skip:
+        query = query.offset(skip)
+    rows = query.order_by(MeasurementResult.date.desc(), MeasurementResult.id.desc()).limit(limit + 1).all()
+    return paginate(rows, limit, response, lambda row: (row.date, row.id))
 
 @router.post("/eyetests", response_model=None)
 def create_eyetest(eyetest: schemas.RfpEyeTestCreate, db: Session = Depends(get_db)):
-    from datetime import date
-
     # Map test_type to test_distance_cm
     # "30cm" -> 30, "3m" -> 300
     distance_cm = 30
@@ -43,13 +65,45 @@ def create_eyetest(eyetest: schemas.RfpEyeTestCreate, db: Session = Depends(get_
     )
     
     db.add(db_eyetest)
+    crud.bump_home_versions(db, [eyetest.child_id])
     db.commit()
     db.refresh(db_eyetest)
     
     return db_eyetest
 
+@router.post("/eyetests/bulk", response_model=schemas.BulkResponse)
+def create_eyetests_bulk(request: schemas.BulkRequest, db: Session = Depends(get_db)):
+    """オフライン中にためた結果をまとめて登録（1トランザクション・1 INSERT）。結果は項目ごとに返す"""
+    valid, results = bulk.validate_items(request.items, schemas.RfpEyeTestBulkItem)
+    today = date.today()
+    bulk.store_items(db, models.EyeTest, valid, results, lambda item: {
+        "child_id": item.child_id,
+        "check_date": item.check_date or today,
+        "left_eye": item.left_eye,
+        "right_eye": item.right_eye,
+        "test_distance_cm": TEST_DISTANCE_CM[item.test_type],
+    })
+    return bulk.build_response(results)
+
 @router.get("/eyetests", response_model=None)
-def read_eyetests(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+def read_eyetests(
+    response: Response,
+    child_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    skip: int = Query(0, ge=0, deprecated=True),
+    db: Session = Depends(get_db),
+):
+    """新しい順。続きは X-Next-Cursor ヘッダーの値を cursor に渡して取得"""
     # Query EyeTest model instead of RfpEyeTest
-    eyetests = db.query(models.EyeTest).order_by(models.EyeTest.check_date.desc()).offset(skip).limit(limit).all()
-    return eyetests
+    EyeTest = models.EyeTest
+    query = db.query(EyeTest)
+    if child_id is not None:
+        query = query.filter(EyeTest.child_id == child_id)
+    if cursor:
+        last_date, last_id = decode_cursor(cursor, (date, int))
+        query = query.filter(keyset_before(EyeTest.check_date, EyeTest.test_id, last_date, last_id))
+    elif skip:
+        query = query.offset(skip)
+    rows = query.order_by(EyeTest.check_date.desc(), EyeTest.test_id.desc()).limit(limit + 1).all()
+    return paginate(rows, limit, response, lambda row: (row.check_date, row.test_id))
@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Any, Dict, List, Literal, Optional
 
 class LogExerciseRequest(BaseModel):
     exercise_id: int
@@ -163,6 +163,29 @@ class ScreenTimeResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class ScreenTimeHeartbeatResponse(BaseModel):
+    screentime_id: int
+    accepted: bool = True
+
+class ScreenTimeTotals(BaseModel):
+    total_seconds: int = 0
+    session_count: int = 0
+    alert_count: int = 0
+    total_minutes: int = 0
+
+class ScreenTimeDailySummary(ScreenTimeTotals):
+    day: date
+
+class ScreenTimeWeeklySummary(ScreenTimeTotals):
+    week_start: date # 月曜日
+
+class ScreenTimeSummaryResponse(BaseModel):
+    child_id: int
+    days: List[ScreenTimeDailySummary]
+    weeks: List[ScreenTimeWeeklySummary]
+    total_seconds: int
+    total_minutes: int
+
 # --- Dashboard Schemas ---
 
 class ExerciseLogResponse(BaseModel):
@@ -215,6 +238,7 @@ class RefreshRequest(BaseModel):
 
 class RefreshResponse(BaseModel):
     access_token: str
+    refresh_token: str # 使ったリフレッシュトークンは無効になるので、次回はこちらを使う
     token_type: str
     expires_in: int
 
@@ -242,6 +266,38 @@ class RfpEyeTestCreate(BaseModel):
     right_eye: Optional[float] = None
     test_type: str = "3m"
 
+# --- Bulk ingestion Schemas (offline replay) ---
+
+def _not_in_future(value: Optional[date]) -> Optional[date]:
+    if value is not None and value > date.today():
+        raise ValueError("check_date is in the future")
+    return value
+
+class RfpEyeTestBulkItem(RfpEyeTestCreate):
+    test_type: Literal["30cm", "3m"] = "3m"
+    check_date: Optional[date] = None # 省略時はサーバーの今日
+
+    _check_date = field_validator("check_date")(_not_in_future)
+
+class DistanceCheckBulkItem(DistanceCheckCreate):
+    check_date: Optional[date] = None # 省略時はサーバーの今日
+
+    _check_date = field_validator("check_date")(_not_in_future)
+
+class BulkRequest(BaseModel):
+    # Items are validated one by one so a bad item doesn't reject the whole batch
+    items: List[Dict[str, Any]] = Field(..., min_length=1, max_length=500)
+
+class BulkItemResult(BaseModel):
+    index: int
+    status: Literal["created", "invalid"]
+    errors: List[str] = []
+
+class BulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkItemResult]
+
 class RfpEyeTest(BaseModel):
     id: int
     child_id: int
@@ -254,3 +310,43 @@ class RfpEyeTest(BaseModel):
     class Config:
         from_attributes = True
 
+# --- Launch (bootstrap) Schemas ---
+
+class LaunchResponse(BaseModel):
+    me: UserResponse
+    children: List[Child]
+    settings: Settings
+    selected_child_id: Optional[int] = None
+    home: Optional[HomeResponse] = None
+    exercise_stats: Optional[ExerciseStats] = None
+
+# --- Analytics Schemas ---
+
+class EyeTrendPoint(BaseModel):
+    test_id: int
+    check_date: date
+    test_type: Optional[str] = None # "30cm" / "3m"（不明ならNone）
+    left_eye: Optional[float] = None
+    right_eye: Optional[float] = None
+    average: Optional[float] = None
+    left_moving_avg: Optional[float] = None
+    right_moving_avg: Optional[float] = None
+    divergence: Optional[float] = None # 左 - 右
+    left_rate: Optional[float] = None # 30日あたりの変化
+    right_rate: Optional[float] = None
+
+class EyeDistanceSummary(BaseModel):
+    test_type: str
+    count: int
+    left_mean: Optional[float] = None
+    right_mean: Optional[float] = None
+    latest_average: Optional[float] = None
+    trend_per_30_days: Optional[float] = None
+
+class EyeTrendResponse(BaseModel):
+    child_id: int
+    count: int
+    window: int
+    mean_divergence: Optional[float] = None
+    series: List[EyeTrendPoint]
+    by_distance: List[EyeDistanceSummary]
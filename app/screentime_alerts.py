@@ -0,0 +1,211 @@
+# app/screentime_alerts.py
+import asyncio
+import os
+from collections import namedtuple
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app import schemas
+
+# 経過時間（分）ごとのメッセージとアラートレベル
+ALERT_STAGES = [
+    (0, "あと すこし つかう？", 0),
+    (10, "そろそろ めを やすめようか", 1),
+    (20, "ながく みてると つかれちゃうよ", 1),
+    (30, "おわったら めを やすめようね", 2),
+]
+
+# How often a watched child's session is re-read, to pick up starts/ends handled by other workers
+STREAM_RESYNC_SECONDS = int(os.getenv("SCREENTIME_STREAM_RESYNC_SECONDS", "60"))
+
+# Minimal view of a ScreenTime row; ORM objects work too
+ActiveSession = namedtuple("ActiveSession", ["screentime_id", "start_time"])
+
+
+def get_alert_stage(minutes: float):
+    message, alert_level = ALERT_STAGES[0][1], ALERT_STAGES[0][2]
+    for threshold, stage_message, stage_level in ALERT_STAGES:
+        if minutes >= threshold:
+            message, alert_level = stage_message, stage_level
+    return message, alert_level
+
+def seconds_until_next_stage(elapsed_seconds: float) -> Optional[float]:
+    """次にメッセージが変わるまでの秒数（最後の段階ならNone）"""
+    for threshold, _, _ in ALERT_STAGES:
+        if threshold * 60 > elapsed_seconds:
+            return threshold * 60 - elapsed_seconds
+    return None
+
+def create_status_response(session, elapsed_seconds: float) -> schemas.ScreenTimeStatus:
+    message, alert_level = get_alert_stage(elapsed_seconds / 60)
+
+    return schemas.ScreenTimeStatus(
+        screentime_id=session.screentime_id,
+        is_active=True,
+        start_time=session.start_time,
+        elapsed_seconds=int(elapsed_seconds),
+        message=message,
+        alert_level=alert_level
+    )
+
+def inactive_status() -> schemas.ScreenTimeStatus:
+    return schemas.ScreenTimeStatus(
+        screentime_id=0,
+        is_active=False,
+        message="きょうは まだ つかってないよ",
+        alert_level=0,
+        elapsed_seconds=0
+    )
+
+
+SessionLoader = Callable[[int], Awaitable[Optional[ActiveSession]]]
+
+
+class _ChildWatch:
+    def __init__(self, loader: SessionLoader):
+        self.loader = loader
+        self.session: Optional[ActiveSession] = None
+        self.subscribers: Set[asyncio.Queue] = set()
+        self.stage_timer: Optional[asyncio.TimerHandle] = None
+        self.resync_timer: Optional[asyncio.TimerHandle] = None
+        self.last_key = None
+
+
+class ScreenTimeAlertScheduler:
+    """Pushes screen time status events to subscribers when the alert stage changes.
+
+    Each watched child has one timer armed for the next stage boundary of its
+    session, shared by all of that child's subscribers. The DB is read when the
+    first subscriber arrives and then only every STREAM_RESYNC_SECONDS.
+    """
+
+    def __init__(self, clock: Callable[[], datetime] = datetime.now, resync_seconds: float = STREAM_RESYNC_SECONDS):
+        self._watches: Dict[int, _ChildWatch] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._clock = clock
+        self._resync_seconds = resync_seconds
+
+    @property
+    def watched_children(self) -> int:
+        return len(self._watches)
+
+    async def subscribe(self, child_id: int, loader: SessionLoader) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=16)
+
+        watch = self._watches.get(child_id)
+        if watch is None:
+            session = await loader(child_id)
+            # Another subscriber may have created the watch while we were loading
+            watch = self._watches.get(child_id)
+            if watch is None:
+                watch = _ChildWatch(loader)
+                watch.session = session
+                self._watches[child_id] = watch
+                self._arm_resync(child_id, watch)
+                self._arm_stage_timer(child_id, watch)
+
+        watch.subscribers.add(queue)
+        # New subscribers always get the current status first
+        queue.put_nowait(self._current_status(watch))
+        return queue
+
+    def unsubscribe(self, child_id: int, queue: asyncio.Queue):
+        watch = self._watches.get(child_id)
+        if watch is None:
+            return
+        watch.subscribers.discard(queue)
+        if not watch.subscribers:
+            self._cancel_timers(watch)
+            del self._watches[child_id]
+
+    # --- Called from request handlers (possibly from threadpool workers) ---
+
+    def session_started(self, child_id: int, session):
+        self._call_in_loop(self._set_session, child_id, ActiveSession(session.screentime_id, session.start_time))
+
+    def session_ended(self, child_id: int):
+        self._call_in_loop(self._set_session, child_id, None)
+
+    def _call_in_loop(self, callback, *args):
+        if self._loop is None or self._loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            callback(*args)
+        else:
+            self._loop.call_soon_threadsafe(callback, *args)
+
+    # --- Event loop side ---
+
+    def _set_session(self, child_id: int, session: Optional[ActiveSession]):
+        watch = self._watches.get(child_id)
+        if watch is None:
+            return
+        watch.session = session
+        self._arm_stage_timer(child_id, watch)
+
+    def _current_status(self, watch: _ChildWatch) -> schemas.ScreenTimeStatus:
+        if watch.session is None:
+            status = inactive_status()
+        else:
+            elapsed = (self._clock() - watch.session.start_time).total_seconds()
+            status = create_status_response(watch.session, max(elapsed, 0))
+        watch.last_key = (status.screentime_id, status.is_active, status.alert_level, status.message)
+        return status
+
+    def _publish(self, watch: _ChildWatch):
+        previous_key = watch.last_key
+        status = self._current_status(watch)
+        if watch.last_key == previous_key:
+            return
+        for queue in list(watch.subscribers):
+            if queue.full():
+                # Slow consumer: drop the stale event, the newest status matters
+                queue.get_nowait()
+            queue.put_nowait(status)
+
+    def _arm_stage_timer(self, child_id: int, watch: _ChildWatch):
+        if watch.stage_timer is not None:
+            watch.stage_timer.cancel()
+            watch.stage_timer = None
+
+        self._publish(watch)
+        if watch.session is None:
+            return
+        elapsed = (self._clock() - watch.session.start_time).total_seconds()
+        delay = seconds_until_next_stage(max(elapsed, 0))
+        if delay is not None:
+            watch.stage_timer = self._loop.call_later(delay, self._arm_stage_timer, child_id, watch)
+
+    def _arm_resync(self, child_id: int, watch: _ChildWatch):
+        if self._resync_seconds > 0:
+            watch.resync_timer = self._loop.call_later(
+                self._resync_seconds, lambda: asyncio.ensure_future(self._resync(child_id, watch))
+            )
+
+    async def _resync(self, child_id: int, watch: _ChildWatch):
+        if self._watches.get(child_id) is not watch:
+            return
+        try:
+            session = await watch.loader(child_id)
+        except Exception:
+            session = watch.session
+        if self._watches.get(child_id) is not watch:
+            return
+        if session != watch.session:
+            self._set_session(child_id, session)
+        self._arm_resync(child_id, watch)
+
+    def _cancel_timers(self, watch: _ChildWatch):
+        for timer in (watch.stage_timer, watch.resync_timer):
+            if timer is not None:
+                timer.cancel()
+        watch.stage_timer = None
+        watch.resync_timer = None
+
+
+alert_scheduler = ScreenTimeAlertScheduler()
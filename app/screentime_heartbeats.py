@@ -0,0 +1,114 @@
+# app/screentime_heartbeats.py
+"""Write-behind buffer for screen time heartbeats.
+
+Flush guarantees:
+- A beat acknowledged by /screentime/heartbeat is held in this worker's memory
+  and written by the next flush: when the buffer reaches HEARTBEAT_FLUSH_SIZE
+  sessions, every HEARTBEAT_FLUSH_SECONDS, and once more on graceful shutdown.
+- A hard crash loses at most the beats received since the last flush.
+- Only the newest beat per session is kept, so the buffer is bounded by the
+  number of open sessions and a flush is one executemany UPDATE.
+- A failed flush puts the beats back (keeping the newest per session) for the
+  next attempt. Beats for sessions that were ended meanwhile are dropped by
+  the UPDATE's end_time IS NULL guard.
+"""
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Tuple
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.background import PeriodicTask, register
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_FLUSH_SIZE = int(os.getenv("SCREENTIME_HEARTBEAT_FLUSH_SIZE", "200"))
+HEARTBEAT_FLUSH_SECONDS = int(os.getenv("SCREENTIME_HEARTBEAT_FLUSH_SECONDS", "10"))
+
+
+class HeartbeatBuffer:
+    def __init__(self, flush_size: int = HEARTBEAT_FLUSH_SIZE):
+        self.flush_size = flush_size
+        # screentime_id -> (start_time, newest beat)
+        self._pending: Dict[int, Tuple[datetime, datetime]] = {}
+        self._lock = threading.Lock()
+        # Serializes flushes so an older batch never lands after a newer one
+        self._flush_lock = threading.Lock()
+        self.received = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.failures = 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, screentime_id: int, start_time: datetime, beat_at: datetime) -> bool:
+        """Buffer a beat; returns True when the buffer should be flushed now"""
+        with self._lock:
+            self._merge(screentime_id, start_time, beat_at)
+            self.received += 1
+            return len(self._pending) >= self.flush_size
+
+    def _merge(self, screentime_id: int, start_time: datetime, beat_at: datetime):
+        current = self._pending.get(screentime_id)
+        if current is None or current[1] < beat_at:
+            self._pending[screentime_id] = (start_time, beat_at)
+
+    def flush(self, db: Session) -> int:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            try:
+                crud.record_screentime_heartbeats(
+                    db, [(screentime_id, start, beat_at) for screentime_id, (start, beat_at) in pending.items()]
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    for screentime_id, (start, beat_at) in pending.items():
+                        self._merge(screentime_id, start, beat_at)
+                    self.failures += 1
+                logger.warning("Heartbeat flush failed; %d sessions re-queued", len(pending))
+                raise
+            self.flushed += len(pending)
+            self.flushes += 1
+            return len(pending)
+
+    def reset(self):
+        with self._lock:
+            self._pending = {}
+            self.received = self.flushed = self.flushes = self.failures = 0
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self._pending),
+            "received": self.received,
+            "flushed": self.flushed,
+            "flushes": self.flushes,
+            "failures": self.failures,
+            "flush_size": self.flush_size,
+            "flush_seconds": HEARTBEAT_FLUSH_SECONDS,
+        }
+
+
+heartbeat_buffer = HeartbeatBuffer()
+
+
+def flush_heartbeats(session_factory=SessionLocal) -> dict:
+    db = session_factory()
+    try:
+        return {"flushed": heartbeat_buffer.flush(db)}
+    finally:
+        db.close()
+
+
+heartbeat_flusher = register(
+    PeriodicTask("screentime_heartbeat_flush", flush_heartbeats, HEARTBEAT_FLUSH_SECONDS, run_on_stop=True)
+)
@@ -0,0 +1,145 @@
+# app/screentime_registry.py
+import os
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.database import SessionLocal
+from app.screentime_alerts import ActiveSession
+
+# How often a worker confirms its registry against the shared version counters.
+# Writes from this worker are visible immediately; other workers' writes within this many seconds.
+REGISTRY_CHECK_SECONDS = float(os.getenv("SCREENTIME_REGISTRY_CHECK_SECONDS", "2"))
+# Children are spread over this many version rows (child_id % shards), so concurrent
+# starts/ends lock different rows and a write only reloads its own shard elsewhere.
+REGISTRY_VERSION_SHARDS = int(os.getenv("SCREENTIME_REGISTRY_SHARDS", "16"))
+VERSION_PREFIX = "screentime_sessions:"
+
+
+def shard_of(child_id: int, shards: int = REGISTRY_VERSION_SHARDS) -> int:
+    return child_id % shards
+
+
+def version_name(shard: int) -> str:
+    return f"{VERSION_PREFIX}{shard}"
+
+
+def version_name_for(child_id: int) -> str:
+    return version_name(shard_of(child_id))
+
+
+class ActiveSessionRegistry:
+    """Write-through in-memory map of child_id -> open ScreenTime session.
+
+    Every start/end bumps the child's `screentime_sessions:<shard>` row in
+    cache_versions in the same transaction. A worker reads the shard rows (one
+    query) at most once per REGISTRY_CHECK_SECONDS and reloads the open
+    sessions of the shards that changed.
+    """
+
+    def __init__(self, check_seconds: float = REGISTRY_CHECK_SECONDS, shards: int = REGISTRY_VERSION_SHARDS):
+        self.check_seconds = check_seconds
+        self.shards = shards
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._sessions: Dict[int, ActiveSession] = {}
+            # shard -> version; empty until the first load
+            self.versions: Dict[int, int] = {}
+            self._checked_at: Optional[float] = None
+            self.reloads = 0
+            self.shard_reloads = 0
+
+    def get(self, child_id: int) -> Optional[ActiveSession]:
+        return self._sessions.get(child_id)
+
+    def needs_check(self) -> bool:
+        checked_at = self._checked_at
+        return checked_at is None or time.monotonic() - checked_at >= self.check_seconds
+
+    def mark_checked(self):
+        self._checked_at = time.monotonic()
+
+    def replace_shards(self, sessions: Dict[int, ActiveSession], versions: Dict[int, int]):
+        """Swap in the open sessions of the shards in `versions` (sessions must cover exactly those shards)"""
+        with self._lock:
+            kept = {
+                child_id: session for child_id, session in self._sessions.items()
+                if shard_of(child_id, self.shards) not in versions
+            }
+            kept.update(sessions)
+            self._sessions = kept
+            self.versions.update(versions)
+            self._checked_at = time.monotonic()
+            self.reloads += 1
+            self.shard_reloads += len(versions)
+
+    def put(self, child_id: int, session, version: int):
+        with self._lock:
+            self._sessions[child_id] = ActiveSession(session.screentime_id, session.start_time)
+            self._advance(shard_of(child_id, self.shards), version)
+
+    def remove(self, child_id: int, version: int):
+        with self._lock:
+            self._sessions.pop(child_id, None)
+            self._advance(shard_of(child_id, self.shards), version)
+
+    def remove_many(self, child_ids: Iterable[int], versions: Dict[int, int]):
+        with self._lock:
+            for child_id in child_ids:
+                self._sessions.pop(child_id, None)
+            for shard, version in versions.items():
+                self._advance(shard, version)
+
+    def _advance(self, shard: int, version: int):
+        # Only our own write happened in this shard since the last sync: stay in sync without reloading.
+        # Otherwise keep the old version so the next check reloads the shard.
+        current = self.versions.get(shard)
+        if current is not None and version == current + 1:
+            self.versions[shard] = version
+
+    def stats(self) -> dict:
+        return {
+            "active_sessions": len(self._sessions),
+            "version_shards": self.shards,
+            "reloads": self.reloads,
+            "shard_reloads": self.shard_reloads,
+            "check_seconds": self.check_seconds,
+        }
+
+
+screentime_registry = ActiveSessionRegistry()
+
+
+def ensure_fresh(db: Session, force: bool = False):
+    """Reload the shards another worker changed since the last check"""
+    if not force and not screentime_registry.needs_check():
+        return
+    shards = range(screentime_registry.shards)
+    names = {shard: version_name(shard) for shard in shards}
+    stored = crud.get_cache_versions(db, names.values())
+    versions = {shard: stored[name] for shard, name in names.items()}
+    changed = {
+        shard: version for shard, version in versions.items()
+        if force or screentime_registry.versions.get(shard) != version
+    }
+    if not changed:
+        screentime_registry.mark_checked()
+        return
+    sessions = crud.get_active_screentime_sessions(
+        db, shards=None if len(changed) == len(versions) else changed.keys(), shard_count=screentime_registry.shards
+    )
+    screentime_registry.replace_shards(sessions, changed)
+
+
+def rebuild_registry(session_factory=SessionLocal):
+    db = session_factory()
+    try:
+        ensure_fresh(db, force=True)
+    finally:
+        db.close()
@@ -0,0 +1,79 @@
+# app/screentime_sweeper.py
+"""Closes screen time sessions whose client never called /screentime/end.
+
+A session that sends heartbeats is closed at its last heartbeat once none has
+arrived for SCREENTIME_HEARTBEAT_TIMEOUT_MINUTES. A session without heartbeats
+that is still open SCREENTIME_IDLE_CAP_MINUTES after it started is closed as
+if it had ended at start + cap. total_minutes/alert_flag are computed like
+end_screentime and the daily rollup is updated.
+"""
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from app import crud
+from app.background import PeriodicTask, register
+from app.database import SessionLocal
+from app.screentime_alerts import alert_scheduler
+from app.screentime_registry import screentime_registry, shard_of, version_name
+
+logger = logging.getLogger(__name__)
+
+SCREENTIME_IDLE_CAP_MINUTES = int(os.getenv("SCREENTIME_IDLE_CAP_MINUTES", "180"))
+SCREENTIME_HEARTBEAT_TIMEOUT_MINUTES = int(os.getenv("SCREENTIME_HEARTBEAT_TIMEOUT_MINUTES", "10"))
+SCREENTIME_SWEEP_INTERVAL_SECONDS = int(os.getenv("SCREENTIME_SWEEP_INTERVAL_SECONDS", "300"))
+SCREENTIME_SWEEP_BATCH_SIZE = int(os.getenv("SCREENTIME_SWEEP_BATCH_SIZE", "500"))
+
+
+def sweep_abandoned_sessions(
+    session_factory=SessionLocal,
+    now: Optional[datetime] = None,
+    idle_cap_minutes: int = SCREENTIME_IDLE_CAP_MINUTES,
+    heartbeat_timeout_minutes: int = SCREENTIME_HEARTBEAT_TIMEOUT_MINUTES,
+    batch_size: int = SCREENTIME_SWEEP_BATCH_SIZE,
+) -> dict:
+    """One sweep pass: close abandoned sessions batch by batch, one transaction per batch"""
+    start = time.perf_counter()
+    now = now or datetime.now()
+    idle_cap = timedelta(minutes=idle_cap_minutes)
+    heartbeat_timeout = timedelta(minutes=heartbeat_timeout_minutes)
+    swept = 0
+    batches = 0
+
+    db = session_factory()
+    try:
+        while True:
+            closed = crud.close_abandoned_screentime(db, idle_cap, heartbeat_timeout, now, batch_size)
+            if not closed:
+                db.rollback()
+                break
+            child_ids = {session.child_id for session in closed}
+            # Sorted so concurrent sweeps take the version row locks in the same order
+            versions = {
+                shard: crud.bump_cache_version(db, version_name(shard))
+                for shard in sorted({shard_of(child_id) for child_id in child_ids})
+            }
+            crud.bump_home_versions(db, child_ids)
+            db.commit()
+
+            screentime_registry.remove_many(child_ids, versions)
+            for child_id in child_ids:
+                alert_scheduler.session_ended(child_id)
+            swept += len(closed)
+            batches += 1
+            if len(closed) < batch_size:
+                break
+    finally:
+        db.close()
+
+    duration_ms = round((time.perf_counter() - start) * 1000, 1)
+    if swept:
+        logger.info("Closed %d abandoned screen time sessions in %.1f ms", swept, duration_ms)
+    return {"swept": swept, "batches": batches, "duration_ms": duration_ms}
+
+
+screentime_sweeper = register(
+    PeriodicTask("screentime_sweeper", sweep_abandoned_sessions, SCREENTIME_SWEEP_INTERVAL_SECONDS)
+)
@@ -1,10 +1,15 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import os
 import secrets
 import string
 import hashlib
+import threading
+import uuid
 
 # --- Configuration ---
 # In production, these should be environment variables
@@ -13,7 +18,19 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 REFRESH_TOKEN_EXPIRE_DAYS = 7
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt cost. Existing hashes with a different cost are rehashed on the next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Threads dedicated to bcrypt, and how many more requests may wait for one before we reject
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "16"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT)
+
+class PasswordHasherBusy(Exception):
+    """Raised when the bcrypt queue is full; callers should answer 503"""
 
 # --- Password Hashing ---
 def verify_password(plain_password, hashed_password):
@@ -22,6 +39,23 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def run_password_hashing(func, *args):
+    # Fail fast instead of letting a login burst pile up behind bcrypt
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_slots.release()
+
+async def verify_password_async(plain_password, hashed_password) -> Tuple[bool, Optional[str]]:
+    """Returns (valid, new_hash). new_hash is set when the stored hash uses an outdated cost."""
+    return await run_password_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password) -> str:
+    return await run_password_hashing(pwd_context.hash, password)
+
 # --- Token Hashing (SHA256) ---
 # Becrypt has a 72 byte limit, which JWTs exceed. Use SHA256 for tokens.
 def get_token_hash(token: str) -> str:
@@ -47,10 +81,15 @@ def create_refresh_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
-    to_encode.update({"exp": expire})
+    # jti identifies the token's row in refresh_tokens (indexed lookup instead of scanning hashes)
+    to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def get_unverified_claims(token: str) -> dict:
+    """Claims of a token this server just issued (no signature check)"""
+    return jwt.get_unverified_claims(token)
+
 def verify_token(token: str, credentials_exception):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
@@ -62,7 +101,5 @@ def verify_token(token: str, credentials_exception):
 def generate_verification_code(length=6):
     return ''.join(secrets.choice(string.digits) for _ in range(length))
 
-import uuid
-
 def generate_session_id():
     return str(uuid.uuid4())
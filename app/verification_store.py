@@ -0,0 +1,106 @@
+# app/verification_store.py
+"""Where two-step login codes live between /auth/login and /auth/verify-code.
+
+VERIFICATION_STORE selects the backend:
+- "db" (default): the verification_codes table.
+- "memory": a TTL cache in this process. Only for a single worker, since the
+  verify request must reach the worker that issued the code.
+- "redis": a Redis server at REDIS_URL, shared by every worker.
+
+Codes are stored as SHA256 hashes, expire after VERIFICATION_CODE_TTL_SECONDS
+and can be used once.
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from app import crud, utils
+from app.cache import LocalCache
+from app.redis_client import RedisClient
+
+VERIFICATION_STORE = os.getenv("VERIFICATION_STORE", "db")
+VERIFICATION_CODE_TTL_SECONDS = int(os.getenv("VERIFICATION_CODE_TTL_SECONDS", "300"))
+VERIFICATION_MEMORY_SIZE = int(os.getenv("VERIFICATION_MEMORY_SIZE", "10000"))
+VERIFICATION_REDIS_PREFIX = "verification:"
+
+
+class VerificationCodeStore(ABC):
+    """save() / verify() take the request's sync Session; only the DB store uses it"""
+
+    uses_db = False
+
+    @abstractmethod
+    def save(self, db: Optional[Session], email: str, code: str, session_id: str):
+        ...
+
+    @abstractmethod
+    def verify(self, db: Optional[Session], session_id: str, code: str) -> Optional[str]:
+        """Returns the email the code was issued for, or None if unknown, expired, used or wrong"""
+
+
+class DatabaseVerificationStore(VerificationCodeStore):
+    uses_db = True
+
+    def __init__(self, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+
+    def save(self, db, email, code, session_id):
+        crud.store_verification_code(db, email, code, session_id, self.ttl_seconds)
+
+    def verify(self, db, session_id, code):
+        record = crud.verify_code(db, session_id, code)
+        return record.email if record else None
+
+
+class MemoryVerificationStore(VerificationCodeStore):
+    def __init__(self, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS, maxsize: int = VERIFICATION_MEMORY_SIZE):
+        self.ttl_seconds = ttl_seconds
+        # session_id -> (email, code hash)
+        self._codes = LocalCache(maxsize, ttl_seconds)
+
+    def save(self, db, email, code, session_id):
+        self._codes.set(session_id, (email, utils.get_token_hash(code)))
+
+    def verify(self, db, session_id, code):
+        entry = self._codes.get(session_id)
+        if entry is None or not utils.verify_token_hash(code, entry[1]):
+            return None
+        # pop decides which of two concurrent verifications wins
+        return entry[0] if self._codes.pop(session_id) is not None else None
+
+
+class RedisVerificationStore(VerificationCodeStore):
+    def __init__(self, client: RedisClient, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+
+    def _key(self, session_id: str) -> str:
+        return VERIFICATION_REDIS_PREFIX + session_id
+
+    def save(self, db, email, code, session_id):
+        self.client.set(self._key(session_id), f"{utils.get_token_hash(code)}:{email}", ex=self.ttl_seconds)
+
+    def verify(self, db, session_id, code):
+        value = self.client.get(self._key(session_id))
+        if value is None:
+            return None
+        code_hash, _, email = value.decode().partition(":")
+        if not utils.verify_token_hash(code, code_hash):
+            return None
+        # DEL returns 1 for only one of two concurrent verifications
+        return email if self.client.delete(self._key(session_id)) == 1 else None
+
+
+def create_verification_store(backend: str = VERIFICATION_STORE) -> VerificationCodeStore:
+    if backend == "db":
+        return DatabaseVerificationStore()
+    if backend == "memory":
+        return MemoryVerificationStore()
+    if backend == "redis":
+        return RedisVerificationStore(RedisClient())
+    raise ValueError(f"Unknown VERIFICATION_STORE: {backend}")
+
+
+verification_store = create_verification_store()
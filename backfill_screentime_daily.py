@@ -0,0 +1,44 @@
+from dotenv import load_dotenv
+
+# Load .env
+load_dotenv()
+
+from app.database import SessionLocal
+from app import crud, models
+
+BATCH_SIZE = 1000
+
+def backfill():
+    """Rebuild ScreenTimeDaily from all closed ScreenTime sessions (safe to re-run)"""
+    print("Starting ScreenTimeDaily backfill...")
+    db = SessionLocal()
+    try:
+        db.query(models.ScreenTimeDaily).delete(synchronize_session=False)
+
+        # Keyset batches: the upserts run on the same connection, so no streaming cursor
+        count = 0
+        last_id = 0
+        while True:
+            rows = db.query(models.ScreenTime)\
+                .filter(models.ScreenTime.end_time != None)\
+                .filter(models.ScreenTime.screentime_id > last_id)\
+                .order_by(models.ScreenTime.screentime_id)\
+                .limit(BATCH_SIZE)\
+                .all()
+            if not rows:
+                break
+            crud.add_screentime_to_daily(db, rows)
+            count += len(rows)
+            last_id = rows[-1].screentime_id
+            db.expunge_all()
+
+        db.commit()
+        print(f"Backfilled {count} sessions.")
+    except Exception as e:
+        db.rollback()
+        print(f"Backfill failed: {e}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    backfill()
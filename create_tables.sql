@@ -60,6 +60,7 @@ CREATE TABLE ExerciseLog (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_log_id (log_id),
     INDEX idx_child_id (child_id),
+    INDEX idx_exerciselog_child_date (child_id, exercise_date),
     CONSTRAINT fk_exerciselog_exercise FOREIGN KEY (exercise_id) REFERENCES Exercise(exercise_id),
     CONSTRAINT unique_child_exercise_date UNIQUE (child_id, exercise_id, exercise_date)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
@@ -76,6 +77,7 @@ CREATE TABLE DistanceCheck (
     alert_flag BOOLEAN DEFAULT FALSE,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_distance_id (distance_id),
+    INDEX idx_distancecheck_child_date (child_id, check_date),
     CONSTRAINT fk_distancecheck_child FOREIGN KEY (child_id) REFERENCES Child(child_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -85,10 +87,13 @@ CREATE TABLE DistanceCheck (
 CREATE TABLE refresh_tokens (
     token_id INT AUTO_INCREMENT PRIMARY KEY,
     parent_id INT NOT NULL,
+    jti VARCHAR(36) NULL,
     token_hash VARCHAR(255) NOT NULL,
     expires_at DATETIME NOT NULL,
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_token_id (token_id),
+    UNIQUE INDEX ix_refresh_tokens_jti (jti),
+    INDEX idx_refreshtoken_expires (expires_at),
     CONSTRAINT fk_refreshtoken_parent FOREIGN KEY (parent_id) REFERENCES Parent(parent_id) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -105,7 +110,8 @@ CREATE TABLE verification_codes (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_verification_id (verification_id),
     INDEX idx_session_id (session_id),
-    INDEX idx_email (email)
+    INDEX idx_email (email),
+    INDEX idx_verification_expires (expires_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- ==========================================
@@ -134,6 +140,9 @@ CREATE TABLE EyeTest (
     created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
     INDEX idx_test_id (test_id),
     INDEX idx_child_id (child_id),
+    INDEX idx_eyetest_child_date_created (child_id, check_date, created_at),
+    INDEX idx_eyetest_child_date_id (child_id, check_date, test_id),
+    INDEX idx_eyetest_date_id (check_date, test_id),
     CONSTRAINT fk_eyetest_child FOREIGN KEY (child_id) REFERENCES Child(child_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
@@ -147,11 +156,57 @@ CREATE TABLE ScreenTime (
     end_time DATETIME,
     total_minutes INT,
     alert_flag BOOLEAN DEFAULT FALSE,
+    last_heartbeat_at DATETIME,
     INDEX idx_screentime_id (screentime_id),
     INDEX idx_child_id (child_id),
+    INDEX idx_screentime_child_start (child_id, start_time),
+    INDEX idx_screentime_child_end (child_id, end_time),
     CONSTRAINT fk_screentime_child FOREIGN KEY (child_id) REFERENCES Child(child_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- ==========================================
+-- 11. app_metaテーブル（起動処理のメタ情報）
+-- ==========================================
+CREATE TABLE app_meta (
+    meta_key VARCHAR(50) PRIMARY KEY,
+    meta_value VARCHAR(255),
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- 12. ExerciseStreakテーブル（トレーニング集計）
+-- ==========================================
+CREATE TABLE ExerciseStreak (
+    child_id INT PRIMARY KEY,
+    current_streak INT NOT NULL DEFAULT 0,
+    last_exercise_date DATE,
+    last_day_types VARCHAR(255),
+    week_start DATE,
+    week_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- 13. cache_versionsテーブル（プロセス内キャッシュの整合性確認用）
+-- ==========================================
+CREATE TABLE cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version INT NOT NULL DEFAULT 0
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- ==========================================
+-- 14. ScreenTimeDailyテーブル（スクリーンタイムの日別集計）
+-- ==========================================
+CREATE TABLE ScreenTimeDaily (
+    child_id INT NOT NULL,
+    day DATE NOT NULL,
+    total_seconds INT NOT NULL DEFAULT 0,
+    session_count INT NOT NULL DEFAULT 0,
+    alert_count INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (child_id, day)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- ==========================================
 -- 実行方法
 -- ==========================================
@@ -50,6 +50,24 @@ def migrate():
                 print("Adding column 'grade'...")
                 cursor.execute("ALTER TABLE Child ADD COLUMN grade VARCHAR(20) NULL")
                 
+            cursor.execute("SHOW COLUMNS FROM ScreenTime LIKE 'last_heartbeat_at'")
+            if cursor.fetchone():
+                print("Column 'last_heartbeat_at' already exists.")
+            else:
+                print("Adding column 'last_heartbeat_at'...")
+                cursor.execute("ALTER TABLE ScreenTime ADD COLUMN last_heartbeat_at DATETIME NULL")
+                
+            cursor.execute("SHOW COLUMNS FROM refresh_tokens LIKE 'jti'")
+            if cursor.fetchone():
+                print("Column 'jti' already exists.")
+            else:
+                # Rows issued before this have no jti and can no longer be refreshed (users log in again)
+                print("Adding column 'jti'...")
+                cursor.execute(
+                    "ALTER TABLE refresh_tokens ADD COLUMN jti VARCHAR(36) NULL, "
+                    "ADD UNIQUE INDEX ix_refresh_tokens_jti (jti)"
+                )
+                
             conn.commit()
             print("Migration successful.")
             
@@ -0,0 +1,107 @@
+"""In-process stand-in for a Redis server, speaking enough RESP for the app's client.
+
+Supports PING, AUTH, SELECT, GET, SET [EX], DEL, INCR and EXPIRE, with key expiry.
+"""
+import socketserver
+import threading
+import time
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def _write(self, reply):
+        if reply is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(reply, int):
+            self.wfile.write(b":%d\r\n" % reply)
+        elif isinstance(reply, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(reply), reply))
+        elif isinstance(reply, Exception):
+            self.wfile.write(b"-ERR %s\r\n" % str(reply).encode())
+        else:
+            self.wfile.write(b"+%s\r\n" % reply.encode())
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            self.server.commands.append(args[0].decode().upper())
+            self._write(self.server.run(args[0].decode().upper(), args[1:]))
+
+
+class FakeRedisServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.data = {}  # key -> (value, expires_at or None)
+        self.commands = []
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"redis://{host}:{port}/0"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+    def _live(self, key):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def run(self, command, args):
+        with self.lock:
+            if command == "PING":
+                return "PONG"
+            if command in ("AUTH", "SELECT"):
+                return "OK"
+            if command == "GET":
+                entry = self._live(args[0])
+                return entry[0] if entry else None
+            if command == "SET":
+                expires_at = None
+                if len(args) >= 4 and args[2].upper() == b"EX":
+                    expires_at = time.time() + int(args[3])
+                self.data[args[0]] = (args[1], expires_at)
+                return "OK"
+            if command == "DEL":
+                removed = 0
+                for key in args:
+                    if self._live(key):
+                        del self.data[key]
+                        removed += 1
+                return removed
+            if command == "INCR":
+                entry = self._live(args[0])
+                value = int(entry[0]) + 1 if entry else 1
+                self.data[args[0]] = (str(value).encode(), entry[1] if entry else None)
+                return value
+            if command == "EXPIRE":
+                entry = self._live(args[0])
+                if not entry:
+                    return 0
+                self.data[args[0]] = (entry[0], time.time() + int(args[1]))
+                return 1
+            return Exception(f"unknown command '{command}'")
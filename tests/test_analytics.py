@@ -0,0 +1,136 @@
+import pytest
+import pandas as pd
+from datetime import date, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.analytics import compute_eye_trends, eye_test_fingerprint, get_eye_trends
+from app.cache import ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL_SECONDS, LocalCache, eye_analytics_cache, home_cache
+from app import models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_analytics.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_analytics.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    eye_analytics_cache.clear()
+    home_cache.clear()
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="analytics@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="Analytics Child"))
+    start = date.today() - timedelta(days=90)
+    for offset, left, right in [(0, 1.0, 1.0), (30, 0.9, 0.8), (60, 0.8, 0.7)]:
+        db.add(models.EyeTest(child_id=1, check_date=start + timedelta(days=offset), left_eye=left, right_eye=right, test_distance_cm=300))
+    db.add(models.EyeTest(child_id=1, check_date=start + timedelta(days=10), left_eye=1.2, right_eye=1.2, test_distance_cm=30))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    eye_analytics_cache.clear()
+    home_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+def count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def test_compute_eye_trends_per_distance():
+    frame = pd.DataFrame({
+        "test_id": [1, 2, 3, 4],
+        "check_date": pd.to_datetime(["2024-01-01", "2024-01-11", "2024-01-31", "2024-03-01"]),
+        "left_eye": [1.0, 1.2, 0.9, 0.8],
+        "right_eye": [0.8, 1.2, 0.9, None],
+        "test_distance_cm": [300.0, 30.0, 300.0, 300.0],
+    })
+    trends = compute_eye_trends(frame, window=2)
+    series = trends["series"]
+
+    assert [point["test_type"] for point in series] == ["3m", "30cm", "3m", "3m"]
+    # The 30cm result does not enter the 3m moving average or rate
+    assert series[2]["left_moving_avg"] == 0.95
+    assert series[2]["left_rate"] == -0.1
+    assert series[1]["left_rate"] is None
+    assert series[0]["divergence"] == 0.2
+    assert series[3]["right_eye"] is None
+    assert series[3]["average"] == 0.8
+
+    by_distance = {summary["test_type"]: summary for summary in trends["by_distance"]}
+    assert by_distance["3m"]["count"] == 3
+    assert by_distance["30cm"]["count"] == 1
+    assert by_distance["30cm"]["trend_per_30_days"] is None
+    assert by_distance["3m"]["trend_per_30_days"] < 0
+
+def test_compute_eye_trends_without_tests():
+    empty = pd.DataFrame(columns=["test_id", "check_date", "left_eye", "right_eye", "test_distance_cm"])
+    assert compute_eye_trends(empty)["series"] == []
+
+def test_trends_endpoint_is_cached_until_next_eye_test(test_db):
+    # Fingerprint + history
+    response, statements = count_queries(lambda: client.get("/api/v1/analytics/eyetests/1"))
+    assert response.status_code == 200
+    assert len(statements) == 2
+    body = response.json()
+    assert body["count"] == 4
+    assert {summary["test_type"] for summary in body["by_distance"]} == {"3m", "30cm"}
+
+    # Only the fingerprint
+    response, statements = count_queries(lambda: client.get("/api/v1/analytics/eyetests/1"))
+    assert len(statements) == 1
+    assert response.json() == body
+
+    client.post("/api/eyetests", json={"child_id": 1, "left_eye": 0.7, "right_eye": 0.6, "test_distance_cm": 300})
+    assert client.get("/api/v1/analytics/eyetests/1").json()["count"] == 5
+
+def test_eye_test_written_on_another_worker_is_seen(test_db):
+    count = client.get("/api/v1/analytics/eyetests/1").json()["count"]
+    # Another worker commits an eye test and caches the result in its own instance;
+    # nothing reaches this worker's eye_analytics_cache
+    test_db.add(models.EyeTest(child_id=1, check_date=date.today(), left_eye=0.5, right_eye=0.5, test_distance_cm=300))
+    test_db.commit()
+    other_worker_cache = LocalCache(ANALYTICS_CACHE_SIZE, ANALYTICS_CACHE_TTL_SECONDS)
+    other_worker_cache.set((1, 3), (eye_test_fingerprint(test_db, 1), get_eye_trends(test_db, 1, 3)))
+
+    assert client.get("/api/v1/analytics/eyetests/1").json()["count"] == count + 1
+    assert eye_analytics_cache.get((1, 3)) == other_worker_cache.get((1, 3))
+
+def test_trends_window_is_validated(test_db):
+    assert client.get("/api/v1/analytics/eyetests/1?window=0").status_code == 422
@@ -0,0 +1,190 @@
+import pytest
+from fastapi.testclient import TestClient
+import threading
+from passlib.context import CryptContext
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.cache import principal_cache, revoked_refresh_tokens
+from app import crud, models, utils
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_auth.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="auth@example.com"))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    principal_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+def parent_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if 'FROM "Parent"' in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+def auth_headers(parent_id=1):
+    token = utils.create_access_token(data={"sub": str(parent_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_current_user_is_cached(test_db):
+    principal_cache.clear()
+    headers = auth_headers()
+
+    response, queries = parent_queries(lambda: client.get("/api/v1/auth/me", headers=headers))
+    assert response.status_code == 200
+    assert response.json()["email"] == "auth@example.com"
+    assert queries == 1
+
+    response, queries = parent_queries(lambda: client.get("/api/v1/auth/me", headers=headers))
+    assert response.status_code == 200
+    assert queries == 0
+    assert principal_cache.stats()["hit_ratio"] == 0.5
+
+def test_parent_update_invalidates_cache(test_db):
+    principal_cache.clear()
+    headers = auth_headers()
+    client.get("/api/v1/auth/me", headers=headers)
+
+    crud.update_parent_line_id(test_db, 1, "line-user-1")
+
+    response, queries = parent_queries(lambda: client.get("/api/v1/auth/me", headers=headers))
+    assert queries == 1
+    assert response.json()["line_id"] == "line-user-1"
+
+def test_invalid_token_is_rejected(test_db):
+    response = client.get("/api/v1/auth/me", headers={"Authorization": "Bearer invalid"})
+    assert response.status_code == 401
+
+def test_register_and_login(test_db):
+    response = client.post("/api/v1/auth/register", json={"email": "new@example.com", "password": "secret"})
+    assert response.status_code == 200
+    assert response.json()["email"] == "new@example.com"
+
+    response = client.post("/api/v1/auth/login", json={"email": "new@example.com", "password": "secret"})
+    assert response.status_code == 200
+    assert "session_id" in response.json()
+
+    response = client.post("/api/v1/auth/login", json={"email": "new@example.com", "password": "wrong"})
+    assert response.status_code == 400
+
+def test_login_rehashes_outdated_cost(test_db):
+    weak_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("secret")
+    test_db.add(models.Parent(email="rehash@example.com", password_hash=weak_hash))
+    test_db.commit()
+
+    response = client.post("/api/v1/auth/login", json={"email": "rehash@example.com", "password": "secret"})
+    assert response.status_code == 200
+
+    test_db.expire_all()
+    stored = crud.get_parent_by_email(test_db, "rehash@example.com").password_hash
+    assert stored != weak_hash
+    assert stored.startswith(f"$2b${utils.BCRYPT_ROUNDS:02d}$")
+
+def test_login_rejected_when_hash_queue_full(test_db, monkeypatch):
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(utils, "_hash_slots", slots)
+
+    response = client.post("/api/v1/auth/login", json={"email": "new@example.com", "password": "secret"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def issue_refresh_token(db, parent_id=1):
+    token = utils.create_refresh_token(data={"sub": str(parent_id)})
+    crud.store_refresh_token(db, parent_id, token)
+    return token
+
+def test_refresh_rotates_token(test_db):
+    revoked_refresh_tokens.clear()
+    token = issue_refresh_token(test_db)
+
+    response = client.post("/api/v1/auth/refresh", json={"refresh_token": token})
+    assert response.status_code == 200
+    rotated = response.json()["refresh_token"]
+    assert rotated != token
+    assert utils.verify_token(response.json()["access_token"], None)["sub"] == "1"
+
+    # The old token is single-use; the new one works once
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 401
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": rotated}).status_code == 200
+
+def test_refresh_is_one_indexed_query(test_db):
+    revoked_refresh_tokens.clear()
+    token = issue_refresh_token(test_db)
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 200
+        # A replay is answered from the revocation set
+        assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 401
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    assert len(statements) == 1
+    assert statements[0].startswith("UPDATE refresh_tokens")
+
+def test_replay_is_rejected_by_database_without_cache(test_db):
+    token = issue_refresh_token(test_db)
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 200
+    revoked_refresh_tokens.clear()
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 401
+
+def test_logout_revokes_refresh_token(test_db):
+    revoked_refresh_tokens.clear()
+    token = issue_refresh_token(test_db)
+    jti = utils.get_unverified_claims(token)["jti"]
+
+    assert client.post("/api/v1/auth/logout", json={"refresh_token": token}).status_code == 204
+    assert crud.get_refresh_token_record(test_db, jti, token) is None
+    revoked_refresh_tokens.clear()
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": token}).status_code == 401
+
+def test_access_token_cannot_refresh(test_db):
+    access_token = utils.create_access_token(data={"sub": "1"})
+    assert client.post("/api/v1/auth/refresh", json={"refresh_token": access_token}).status_code == 401
@@ -0,0 +1,55 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.auth_purge import purge_expired_auth_rows
+from app.database import Base
+from app import models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_auth_purge.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="purge@example.com"))
+    db.commit()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+def add_code(db, session_id, expires_at):
+    db.add(models.VerificationCode(session_id=session_id, email="purge@example.com", code_hash="x", expires_at=expires_at))
+
+def add_token(db, jti, expires_at):
+    db.add(models.RefreshToken(parent_id=1, jti=jti, token_hash="x", expires_at=expires_at))
+
+def test_purges_expired_rows_in_batches(db):
+    for i in range(5):
+        add_code(db, f"expired-{i}", NOW - timedelta(minutes=i + 1))
+    add_code(db, "live", NOW + timedelta(minutes=5))
+    add_token(db, "expired", NOW - timedelta(days=1))
+    add_token(db, "live", NOW + timedelta(days=7))
+    db.commit()
+
+    result = purge_expired_auth_rows(TestingSessionLocal, now=NOW, batch_size=2)
+    assert result["verification_codes"] == 5
+    assert result["refresh_tokens"] == 1
+    assert result["batches"] == 4
+
+    assert [c.session_id for c in db.query(models.VerificationCode).all()] == ["live"]
+    assert [t.jti for t in db.query(models.RefreshToken).all()] == ["live"]
+
+def test_purge_without_expired_rows(db):
+    add_code(db, "live", NOW + timedelta(minutes=5))
+    db.commit()
+
+    result = purge_expired_auth_rows(TestingSessionLocal, now=NOW)
+    assert result["verification_codes"] == 0
+    assert result["refresh_tokens"] == 0
+    assert result["batches"] == 0
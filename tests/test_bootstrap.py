@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app import bootstrap, models
+
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_bootstrap.db"
+
+@pytest.fixture
+def bootstrap_db():
+    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    models.Base.metadata.drop_all(bind=engine)
+    yield engine, sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    models.Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+def test_first_startup_creates_schema_and_seeds(bootstrap_db):
+    engine, session_factory = bootstrap_db
+    report = bootstrap.run_startup(engine, session_factory)
+    assert report["status"] == "applied"
+
+    db = session_factory()
+    assert db.query(models.Exercise).count() == 3
+    assert db.query(models.Parent).filter(models.Parent.email == "demo@example.com").count() == 1
+    db.close()
+    assert bootstrap.stored_fingerprint(engine) == report["fingerprint"]
+
+def test_second_startup_is_skipped(bootstrap_db):
+    engine, session_factory = bootstrap_db
+    bootstrap.run_startup(engine, session_factory)
+    report = bootstrap.run_startup(engine, session_factory)
+    assert report["status"] == "skipped"
+    assert bootstrap.startup_report["status"] == "skipped"
+
+def test_seed_version_change_reruns_bootstrap(bootstrap_db, monkeypatch):
+    engine, session_factory = bootstrap_db
+    first = bootstrap.run_startup(engine, session_factory)
+    monkeypatch.setattr(bootstrap, "SEED_VERSION", "test-next")
+    second = bootstrap.run_startup(engine, session_factory)
+    assert second["status"] == "applied"
+    assert second["fingerprint"] != first["fingerprint"]
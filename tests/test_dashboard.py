@@ -0,0 +1,111 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app import models
+from datetime import date, datetime, timedelta
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_dashboard.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# TestClient runs each request on its own event loop, so don't pool async connections
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_dashboard.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+
+    parent = models.Parent(parent_id=1, email="dashboard@example.com")
+    db.add(parent)
+    db.add(models.Exercise(exercise_id=1, exercise_type="blink", exercise_name="まばたき"))
+    for child_id in (1, 2, 3):
+        db.add(models.Child(child_id=child_id, parent_id=1, name=f"Child{child_id}"))
+    db.commit()
+
+    today = date.today()
+    for child_id in (1, 2):
+        for i in range(8):
+            day = today - timedelta(days=i)
+            db.add(models.ExerciseLog(child_id=child_id, exercise_id=1, exercise_date=day))
+            db.add(models.DistanceCheck(child_id=child_id, check_date=day, avg_distance_cm=30 + i))
+            db.add(models.EyeTest(child_id=child_id, check_date=day, left_eye=1.0, right_eye=1.0))
+            db.add(models.ScreenTime(child_id=child_id, start_time=datetime.now() - timedelta(days=i)))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return result, len(statements)
+
+def test_parent_dashboard_limits_per_child(test_db):
+    response = client.get("/api/v1/dashboard/parent/1")
+    assert response.status_code == 200
+    children = {c["child"]["child_id"]: c for c in response.json()["children_data"]}
+    assert set(children) == {1, 2, 3}
+
+    for child_id in (1, 2):
+        data = children[child_id]
+        assert len(data["recent_exercises"]) == 5
+        assert len(data["recent_distance_checks"]) == 5
+        assert len(data["recent_eye_tests"]) == 8
+        assert len(data["recent_screentime"]) == 8
+        assert all(x["child_id"] == child_id for x in data["recent_exercises"])
+        dates = [x["exercise_date"] for x in data["recent_exercises"]]
+        assert dates == sorted(dates, reverse=True)
+        assert dates[0] == date.today().isoformat()
+
+    assert children[3]["recent_exercises"] == []
+
+def test_parent_dashboard_query_count_is_constant(test_db):
+    response, query_count = count_queries(lambda: client.get("/api/v1/dashboard/parent/1"))
+    assert response.status_code == 200
+    # Parent + Children + 4 windowed queries, regardless of the number of children
+    assert query_count == 6
+
+def test_child_dashboard(test_db):
+    response = client.get("/api/v1/dashboard/child/2")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["child"]["child_id"] == 2
+    assert len(data["recent_distance_checks"]) == 5
+    assert data["recent_distance_checks"][0]["avg_distance_cm"] == 30
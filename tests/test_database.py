@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import create_engine, exc
+from app import database
+from app.database import InstrumentedQueuePool, PoolMetrics, pool_metrics
+
+@pytest.fixture
+def pool_engine():
+    engine = create_engine(
+        "sqlite:///./test_pool.db",
+        connect_args={"check_same_thread": False},
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.1,
+    )
+    pool_metrics.reset()
+    yield engine
+    engine.dispose()
+    pool_metrics.reset()
+
+def test_pool_options_from_environment():
+    options = database.pool_options()
+    assert options["poolclass"] is InstrumentedQueuePool
+    assert options["pool_size"] == database.DB_POOL_SIZE
+    assert options["pool_pre_ping"] == database.DB_POOL_PRE_PING
+
+def test_pool_metrics_reports_checked_out_and_overflow(pool_engine):
+    conn1 = pool_engine.connect()
+    conn2 = pool_engine.connect()
+    status = pool_metrics.snapshot(pool_engine.pool)
+    assert status["checked_out"] == 2
+    assert status["overflow"] == 1
+    assert status["checkouts"] == 2
+
+    with pytest.raises(exc.TimeoutError):
+        pool_engine.connect()
+    status = pool_metrics.snapshot(pool_engine.pool)
+    assert status["timeouts"] == 1
+    assert status["max_wait_ms"] >= 100
+
+    conn1.close()
+    conn2.close()
+    status = pool_metrics.snapshot(pool_engine.pool)
+    assert status["checked_out"] == 0
+    assert status["idle"] == 1
+
+def test_pool_metrics_average_wait():
+    metrics = PoolMetrics()
+    metrics.record_wait(0.002)
+    metrics.record_wait(0.004)
+    assert metrics.wait_count == 2
+    assert metrics.max_wait_seconds == 0.004
@@ -0,0 +1,140 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import Base, get_db
+from app import crud, models
+from datetime import date, timedelta
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_exercise.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    db.add_all([
+        models.Child(child_id=1, parent_id=1, name="Exercise Child"),
+        models.Exercise(exercise_id=1, exercise_type="distance_view", exercise_name="遠くを見よう"),
+        models.Exercise(exercise_id=2, exercise_type="blink", exercise_name="まばたき"),
+        models.Exercise(exercise_id=3, exercise_type="eye_tracking", exercise_name="目の体操"),
+    ])
+    db.commit()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+def days_ago(n):
+    return date.today() - timedelta(days=n)
+
+def test_stats_without_history(db):
+    stats = crud.get_exercise_stats(db, 1)
+    assert stats["consecutive_days"] == 0
+    assert stats["this_week_count"] == 0
+    assert stats["today_completed"] == []
+    assert db.get(models.ExerciseStreak, 1) is None
+
+def test_streak_is_updated_incrementally(db):
+    for n in (2, 1, 0):
+        assert crud.log_exercise(db, 1, 1, days_ago(n))["success"] is True
+    crud.log_exercise(db, 1, 2, days_ago(0))
+
+    streak = db.get(models.ExerciseStreak, 1)
+    assert streak.current_streak == 3
+    assert streak.last_exercise_date == date.today()
+
+    stats = crud.get_exercise_stats(db, 1)
+    assert stats["consecutive_days"] == 3
+    assert stats["today_completed"] == ["distance_view", "blink"]
+    assert stats["today_pending"] == ["eye_tracking"]
+    assert stats["this_week_count"] == len([n for n in (2, 1, 0) if days_ago(n) >= crud.get_week_start(date.today())])
+
+def test_gap_resets_streak(db):
+    crud.log_exercise(db, 1, 1, days_ago(5))
+    crud.log_exercise(db, 1, 1, days_ago(1))
+    stats = crud.get_exercise_stats(db, 1)
+    assert stats["consecutive_days"] == 1
+    assert stats["today_completed"] == []
+
+def test_duplicate_log_is_rejected(db):
+    crud.log_exercise(db, 1, 1, days_ago(0))
+    assert crud.log_exercise(db, 1, 1, days_ago(0))["success"] is False
+    assert crud.get_exercise_stats(db, 1)["consecutive_days"] == 1
+
+def test_backfilled_date_matches_full_rebuild(db):
+    crud.log_exercise(db, 1, 1, days_ago(0))
+    crud.log_exercise(db, 1, 1, days_ago(2))
+    assert crud.get_exercise_stats(db, 1)["consecutive_days"] == 1
+
+    # Filling the gap joins both runs into one streak
+    crud.log_exercise(db, 1, 1, days_ago(1))
+    assert crud.get_exercise_stats(db, 1)["consecutive_days"] == 3
+
+def test_existing_history_is_summarized_on_first_read(db):
+    for n in (3, 2, 1):
+        db.add(models.ExerciseLog(child_id=2, exercise_id=1, exercise_date=days_ago(n)))
+    db.commit()
+
+    stats = crud.get_exercise_stats(db, 2)
+    assert stats["consecutive_days"] == 3
+    assert db.get(models.ExerciseStreak, 2).last_exercise_date == days_ago(1)
+
+def test_stats_expire_after_a_missed_day():
+    streak = models.ExerciseStreak(
+        child_id=1,
+        current_streak=4,
+        last_exercise_date=date(2025, 1, 8),
+        last_day_types="blink",
+        week_start=date(2025, 1, 6),
+        week_count=3,
+    )
+    assert crud.exercise_stats_from_streak(streak, today=date(2025, 1, 9))["consecutive_days"] == 4
+    stats = crud.exercise_stats_from_streak(streak, today=date(2025, 1, 10))
+    assert stats["consecutive_days"] == 0
+    assert stats["this_week_count"] == 3
+    assert crud.exercise_stats_from_streak(streak, today=date(2025, 1, 13))["this_week_count"] == 0
+
+def test_log_returns_updated_stats(db):
+    crud.log_exercise(db, 1, 1, days_ago(1))
+    result = crud.log_exercise(db, 1, 3, days_ago(0))
+    assert result["success"] is True
+    assert result["stats"]["consecutive_days"] == 2
+    assert result["stats"]["today_completed"] == ["eye_tracking"]
+
+    duplicate = crud.log_exercise(db, 1, 3, days_ago(0))
+    assert duplicate["success"] is False
+    assert duplicate["stats"] == result["stats"]
+    assert db.query(models.ExerciseLog).filter(models.ExerciseLog.child_id == 1).count() == 2
+
+def test_log_unknown_exercise(db):
+    with pytest.raises(ValueError):
+        crud.log_exercise(db, 1, 99, days_ago(0))
+    assert db.query(models.ExerciseLog).count() == 0
+
+def test_log_unknown_child(db):
+    with pytest.raises(ValueError):
+        crud.log_exercise(db, 999, 1, days_ago(0))
+    assert db.query(models.ExerciseLog).count() == 0
+
+def test_log_endpoint_returns_404_for_unknown_child(db):
+    def override_get_db():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        response = TestClient(app).post("/api/child/999/exercise/log", json={"exercise_id": 1, "exercise_date": days_ago(0).isoformat()})
+    finally:
+        if previous_override:
+            app.dependency_overrides[get_db] = previous_override
+        else:
+            app.dependency_overrides.pop(get_db, None)
+    assert response.status_code == 404
+    assert db.query(models.ExerciseLog).count() == 0
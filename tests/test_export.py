@@ -0,0 +1,86 @@
+import csv
+import io
+import json
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import get_db, get_session_factory, Base
+from app.export import iter_record_batches
+from app import models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_export.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_session_factory] = lambda: TestingSessionLocal
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="export@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="Export Child"))
+    db.add(models.Exercise(exercise_id=1, exercise_type="eye_exercise", exercise_name="Blink"))
+    start = date(2023, 1, 1)
+    for day in range(5):
+        db.add(models.EyeTest(child_id=1, check_date=start + timedelta(days=day), left_eye=1.0, right_eye=0.9, test_distance_cm=300))
+    db.add(models.DistanceCheck(child_id=1, check_date=start, avg_distance_cm=35, posture_score=80, alert_flag=False))
+    db.add(models.ExerciseLog(child_id=1, exercise_id=1, exercise_date=start))
+    db.add(models.ScreenTime(child_id=1, start_time=datetime(2023, 1, 1, 9), end_time=datetime(2023, 1, 1, 10), total_minutes=60))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_session_factory, None)
+    Base.metadata.drop_all(bind=engine)
+
+def test_records_are_read_in_batches(test_db):
+    batches = list(iter_record_batches(test_db, 1, batch_size=2))
+    assert [len(batch) for batch in batches] == [2, 2, 1, 1, 1, 1]
+    assert [batch[0]["record_type"] for batch in batches] == [
+        "eye_test", "eye_test", "eye_test", "distance_check", "exercise_log", "screen_time",
+    ]
+
+def test_export_ndjson(test_db):
+    response = client.get("/api/v1/export/children/1")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert len(records) == 8
+    assert records[0]["record_type"] == "eye_test"
+    assert records[0]["date"] == "2023-01-01"
+    exercise = next(r for r in records if r["record_type"] == "exercise_log")
+    assert exercise["exercise_type"] == "eye_exercise"
+    assert records[-1]["start_time"] == "2023-01-01T09:00:00"
+
+def test_export_csv(test_db):
+    response = client.get("/api/v1/export/children/1?format=csv")
+    assert response.status_code == 200
+    assert 'filename="child_1_history.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 8
+    assert rows[5]["record_type"] == "distance_check"
+    assert rows[5]["avg_distance_cm"] == "35"
+    assert rows[5]["left_eye"] == ""
+
+def test_export_unknown_child(test_db):
+    assert client.get("/api/v1/export/children/999").status_code == 404
+    assert client.get("/api/v1/export/children/1?format=xml").status_code == 422
@@ -0,0 +1,131 @@
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.cache import home_cache
+from app.screentime_registry import screentime_registry
+from app import crud, models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_home_cache.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_home_cache.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    home_cache.clear()
+    screentime_registry.reset()
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="home@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="Home Child"))
+    db.add(models.Child(child_id=2, parent_id=1, name="Deleted Child"))
+    db.add(models.EyeTest(child_id=1, check_date=date.today() - timedelta(days=3), left_eye=1.0, right_eye=0.8))
+    db.add(models.ScreenTime(
+        child_id=1,
+        start_time=datetime.now() - timedelta(hours=2),
+        end_time=datetime.now() - timedelta(hours=1),
+        total_minutes=60,
+    ))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    home_cache.clear()
+    screentime_registry.reset()
+    Base.metadata.drop_all(bind=engine)
+
+def count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def missions(response):
+    return {m["mission_id"]: m["status"] for m in response.json()["missions"]}
+
+def test_home_loads_in_one_query_then_from_cache(test_db):
+    # Version check + home data
+    response, statements = count_queries(lambda: client.get("/api/v1/home/1"))
+    assert response.status_code == 200
+    assert len(statements) == 2
+    last_results = response.json()["last_results"]
+    assert last_results["left_eye"] == 1.0
+    assert last_results["distance_check_date"] is None
+    assert last_results["total_screentime_minutes"] == 60
+
+    # Only the version check
+    response, statements = count_queries(lambda: client.get("/api/v1/home/1"))
+    assert response.status_code == 200
+    assert len(statements) == 1
+    assert "cache_versions" in statements[0]
+    assert response.json()["character_message"]
+
+def test_distance_check_invalidates_cache(test_db):
+    assert missions(client.get("/api/v1/home/1"))["distance_check"] == "pending"
+    client.post("/api/distance-check", json={"child_id": 1, "distance_cm": 40.0, "alert_flag": False})
+    assert missions(client.get("/api/v1/home/1"))["distance_check"] == "completed"
+
+def test_eye_test_invalidates_cache(test_db):
+    assert missions(client.get("/api/v1/home/1"))["eye_test"] == "pending"
+    client.post("/api/eyetests", json={"child_id": 1, "left_eye": 1.2, "right_eye": 1.0, "test_type": "3m"})
+    assert missions(client.get("/api/v1/home/1"))["eye_test"] == "completed"
+
+def test_screentime_end_invalidates_cache(test_db):
+    client.get("/api/v1/home/1")
+    client.post("/api/v1/screentime/start", json={"child_id": 1})
+    client.post("/api/v1/screentime/end", json={"child_id": 1})
+    assert client.get("/api/v1/home/1").json()["last_results"]["total_screentime_minutes"] == 1
+
+def test_deleted_child_is_not_served_from_cache(test_db):
+    assert client.get("/api/v1/home/2").status_code == 200
+    assert client.delete("/api/child/2").status_code == 200
+    assert client.get("/api/v1/home/2").status_code == 404
+
+def test_write_on_another_worker_is_seen(test_db):
+    assert client.get("/api/v1/home/1").json()["last_results"]["total_screentime_minutes"] == 1
+    # Another worker commits a row and bumps the version; this worker's home_cache is never told
+    test_db.add(models.ScreenTime(
+        child_id=1,
+        start_time=datetime.now() - timedelta(minutes=30),
+        end_time=datetime.now(),
+        total_minutes=30,
+    ))
+    crud.bump_home_versions(test_db, [1])
+    test_db.commit()
+    assert client.get("/api/v1/home/1").json()["last_results"]["total_screentime_minutes"] == 30
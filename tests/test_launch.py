@@ -0,0 +1,102 @@
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.cache import home_cache, principal_cache
+from app import models, utils
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_launch.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_launch.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    home_cache.clear()
+    principal_cache.clear()
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="launch@example.com"))
+    db.add(models.Parent(parent_id=2, email="nochild@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="First"))
+    db.add(models.Child(child_id=2, parent_id=1, name="Second"))
+    db.add(models.Settings(parent_id=1, child_id=2, voice_enabled=True))
+    db.add(models.DistanceCheck(child_id=2, check_date=date.today(), avg_distance_cm=35.0, posture_score=0))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    home_cache.clear()
+    principal_cache.clear()
+    Base.metadata.drop_all(bind=engine)
+
+def auth_headers(parent_id):
+    token = utils.create_access_token(data={"sub": str(parent_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+def test_launch_data_for_selected_child(test_db):
+    response = client.get("/api/v1/bootstrap", headers=auth_headers(1))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["me"]["email"] == "launch@example.com"
+    assert [c["child_id"] for c in data["children"]] == [1, 2]
+    assert data["settings"]["child_id"] == 2
+    assert data["selected_child_id"] == 2
+    missions = {m["mission_id"]: m["status"] for m in data["home"]["missions"]}
+    assert missions["distance_check"] == "completed"
+    assert data["home"]["last_results"]["avg_distance_cm"] == 35.0
+    assert data["exercise_stats"]["consecutive_days"] == 0
+
+def test_launch_uses_one_connection(test_db):
+    checkouts = []
+
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.append(connection_record)
+
+    event.listen(async_engine.sync_engine, "checkout", on_checkout)
+    try:
+        response = client.get("/api/v1/bootstrap", headers=auth_headers(1))
+    finally:
+        event.remove(async_engine.sync_engine, "checkout", on_checkout)
+    assert response.status_code == 200
+    assert len(checkouts) == 1
+
+def test_launch_without_children_creates_settings(test_db):
+    response = client.get("/api/v1/bootstrap", headers=auth_headers(2))
+    assert response.status_code == 200
+    data = response.json()
+    assert data["children"] == []
+    assert data["selected_child_id"] is None
+    assert data["home"] is None
+    assert data["settings"]["parent_id"] == 2
+
+def test_launch_requires_auth(test_db):
+    assert client.get("/api/v1/bootstrap").status_code == 401
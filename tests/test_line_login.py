@@ -0,0 +1,155 @@
+import asyncio
+import time
+import httpx
+import pytest
+import ecdsa
+from fastapi.testclient import TestClient
+from jose import jwk, jwt
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.line_client import LineClient, LineError
+from app.routers import auth
+from app import line_client as line_module, models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_line_login.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_line_login.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+CHANNEL_ID = "1234567890"
+CHANNEL_SECRET = "channel-secret"
+API_BASE = "http://line.mock"
+
+_signing_key = ecdsa.SigningKey.generate(curve=ecdsa.NIST256p)
+EC_KEY = _signing_key.to_pem().decode()
+EC_PUBLIC_JWK = {**jwk.construct(_signing_key.get_verifying_key().to_pem().decode(), "ES256").to_dict(), "kid": "key-1"}
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    app.dependency_overrides.pop(get_async_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(line_module, "RETRY_BACKOFF_SECONDS", 0)
+
+def id_token(sub="U123", algorithm="HS256", key=CHANNEL_SECRET, audience=CHANNEL_ID, kid=None):
+    claims = {"iss": "https://access.line.me", "sub": sub, "aud": audience, "exp": int(time.time()) + 600}
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+class MockLine:
+    """Handler for httpx.MockTransport that records the paths it was called with"""
+
+    def __init__(self, token_response=None, failures=0):
+        self.token_response = token_response or {"access_token": "line-access", "id_token": id_token()}
+        self.failures = failures
+        self.calls = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        if self.failures:
+            self.failures -= 1
+            return httpx.Response(503)
+        if request.url.path == "/oauth2/v2.1/token":
+            return httpx.Response(200, json=self.token_response)
+        if request.url.path == "/v2/profile":
+            return httpx.Response(200, json={"userId": "U-profile"})
+        if request.url.path == "/oauth2/v2.1/certs":
+            return httpx.Response(200, json={"keys": [EC_PUBLIC_JWK]})
+        return httpx.Response(404)
+
+def make_client(handler):
+    return LineClient(
+        channel_id=CHANNEL_ID, channel_secret=CHANNEL_SECRET, redirect_uri="http://app/callback",
+        api_base_url=API_BASE, transport=httpx.MockTransport(handler),
+    )
+
+def test_callback_uses_verified_id_token(test_db, monkeypatch):
+    handler = MockLine()
+    monkeypatch.setattr(auth, "line_client", make_client(handler))
+
+    response = client.post("/api/v1/auth/line/callback", json={"code": "abc", "state": "s"})
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "U123@line.user"
+    # No profile round trip when the ID token is present
+    assert handler.calls == ["/oauth2/v2.1/token"]
+
+    # A second login finds the same parent
+    assert client.post("/api/v1/auth/line/callback", json={"code": "abc", "state": "s"}).status_code == 200
+    assert test_db.query(models.Parent).filter_by(line_id="U123").count() == 1
+
+def test_callback_falls_back_to_profile(test_db, monkeypatch):
+    handler = MockLine(token_response={"access_token": "line-access"})
+    monkeypatch.setattr(auth, "line_client", make_client(handler))
+
+    response = client.post("/api/v1/auth/line/callback", json={"code": "abc", "state": "s"})
+    assert response.status_code == 200
+    assert handler.calls == ["/oauth2/v2.1/token", "/v2/profile"]
+
+def test_callback_rejects_forged_id_token(test_db, monkeypatch):
+    handler = MockLine(token_response={"access_token": "x", "id_token": id_token(key="wrong-secret")})
+    monkeypatch.setattr(auth, "line_client", make_client(handler))
+    response = client.post("/api/v1/auth/line/callback", json={"code": "abc", "state": "s"})
+    assert response.status_code == 400
+
+def test_retries_unavailable_responses():
+    handler = MockLine(failures=2)
+    line = make_client(handler)
+    token_data = asyncio.run(line.exchange_code("abc"))
+    assert token_data["access_token"] == "line-access"
+    assert line.stats()["retried"] == 2
+
+    handler = MockLine(failures=5)
+    with pytest.raises(LineError):
+        asyncio.run(make_client(handler).exchange_code("abc"))
+    assert len(handler.calls) == 3
+
+def test_es256_keys_are_cached():
+    handler = MockLine()
+    line = make_client(handler)
+
+    async def verify_twice():
+        token = id_token(algorithm="ES256", key=EC_KEY, kid="key-1")
+        first = await line.verify_id_token(token)
+        second = await line.verify_id_token(token)
+        await line.close()
+        return first, second
+
+    first, second = asyncio.run(verify_twice())
+    assert first["sub"] == second["sub"] == "U123"
+    assert handler.calls == ["/oauth2/v2.1/certs"]
+
+def test_unknown_kid_is_rejected():
+    handler = MockLine()
+    line = make_client(handler)
+    with pytest.raises(LineError):
+        asyncio.run(line.verify_id_token(id_token(algorithm="ES256", key=EC_KEY, kid="rotated")))
+
+def test_wrong_audience_is_rejected():
+    with pytest.raises(LineError):
+        asyncio.run(make_client(MockLine()).verify_id_token(id_token(audience="other-channel")))
+
+def test_login_url_uses_configured_base(monkeypatch):
+    line = LineClient(channel_id=CHANNEL_ID, channel_secret="s", redirect_uri="http://app/cb", access_base_url="http://mock")
+    monkeypatch.setattr(auth, "line_client", line)
+    url = client.get("/api/v1/auth/line/login").json()["url"]
+    assert url.startswith("http://mock/oauth2/v2.1/authorize?")
+    assert "redirect_uri=http%3A%2F%2Fapp%2Fcb" in url
@@ -0,0 +1,9 @@
+from app.database import Base
+from app import models  # noqa: F401  (registers tables)
+import migrate_indexes
+
+def test_index_migration_matches_models():
+    for table_name, index_name, columns in migrate_indexes.INDEXES:
+        table = Base.metadata.tables[table_name]
+        indexes = {index.name: [c.name for c in index.columns] for index in table.indexes}
+        assert indexes.get(index_name) == columns, f"{table_name}.{index_name}"
@@ -0,0 +1,134 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.rate_limit import RedisSlidingWindowLimiter, TokenBucketLimiter
+from app.redis_client import RedisClient
+from app import models, rate_limit, utils
+from tests.fake_redis import FakeRedisServer
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_rate_limit.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_rate_limit.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="limit@example.com", password_hash=utils.get_password_hash("secret")))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    rate_limit.reset()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(autouse=True)
+def reset_limits():
+    rate_limit.reset()
+
+def count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def test_token_bucket_refills():
+    limiter = TokenBucketLimiter(limit=2, window_seconds=10)
+    assert limiter.hit("a", now=0) is None
+    assert limiter.hit("a", now=0) is None
+    assert limiter.hit("a", now=0) == pytest.approx(5.0)
+    # Other keys have their own bucket
+    assert limiter.hit("b", now=0) is None
+    # One token is back after limit / window seconds
+    assert limiter.hit("a", now=5) is None
+    assert limiter.hit("a", now=5) is not None
+
+def test_token_bucket_memory_is_bounded():
+    limiter = TokenBucketLimiter(limit=1, window_seconds=60, max_keys=100)
+    for i in range(1000):
+        limiter.hit(f"ip-{i}")
+    assert len(limiter._buckets) == 100
+
+def test_redis_sliding_window():
+    with FakeRedisServer() as server:
+        redis = RedisClient(server.url)
+        limiter = RedisSlidingWindowLimiter(redis, "test", limit=2, window_seconds=10)
+        assert limiter.hit("a", now=100) is None
+        assert limiter.hit("a", now=101) is None
+        assert limiter.hit("a", now=102) == pytest.approx(8.0)
+        # Halfway into the next window the previous one (rejected hits included) still counts for half
+        assert limiter.hit("a", now=115) is not None
+        assert limiter.hit("a", now=125) is None
+        # Limiter state is shared: a second client (another worker) sees the same counts
+        other = RedisSlidingWindowLimiter(RedisClient(server.url), "test", limit=2, window_seconds=10)
+        assert other.hit("a", now=125.5) is not None
+        redis.close()
+
+def test_redis_unavailable_allows_requests():
+    limiter = RedisSlidingWindowLimiter(RedisClient("redis://127.0.0.1:1/0"), "test", limit=1, window_seconds=10)
+    assert limiter.hit("a") is None
+    assert limiter.hit("a") is None
+
+def test_login_is_limited_per_email_before_db(test_db):
+    limit, _ = rate_limit.parse_rule(rate_limit.RATE_LIMIT_RULES["login_email"])
+    for _ in range(limit):
+        response = client.post("/api/v1/auth/login", json={"email": "limit@example.com", "password": "wrong"})
+        assert response.status_code == 400
+
+    response, statements = count_queries(
+        lambda: client.post("/api/v1/auth/login", json={"email": "Limit@Example.com", "password": "wrong"})
+    )
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert statements == []
+
+    # Another email from the same client still gets through
+    response = client.post("/api/v1/auth/login", json={"email": "other@example.com", "password": "wrong"})
+    assert response.status_code == 400
+
+def test_verify_code_guesses_are_limited(test_db):
+    limit, _ = rate_limit.parse_rule(rate_limit.RATE_LIMIT_RULES["verify_session"])
+    for _ in range(limit):
+        response = client.post("/api/v1/auth/verify-code", json={"session_id": "s", "verification_code": "000000"})
+        assert response.status_code == 400
+    response = client.post("/api/v1/auth/verify-code", json={"session_id": "s", "verification_code": "000000"})
+    assert response.status_code == 429
+
+    stats = client.get("/api/v1/metrics/rate-limit").json()
+    assert stats["verify_session"]["limited"] == 1
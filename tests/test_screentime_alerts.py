@@ -0,0 +1,78 @@
+import asyncio
+from datetime import datetime, timedelta
+from app.screentime_alerts import (
+    ActiveSession,
+    ScreenTimeAlertScheduler,
+    create_status_response,
+    get_alert_stage,
+    seconds_until_next_stage,
+)
+
+def test_alert_stages():
+    assert get_alert_stage(0) == ("あと すこし つかう？", 0)
+    assert get_alert_stage(10)[1] == 1
+    assert get_alert_stage(25) == ("ながく みてると つかれちゃうよ", 1)
+    assert get_alert_stage(45)[1] == 2
+
+def test_seconds_until_next_stage():
+    assert seconds_until_next_stage(0) == 600
+    assert seconds_until_next_stage(630) == 570
+    assert seconds_until_next_stage(1800) is None
+
+def test_status_response():
+    session = ActiveSession(screentime_id=3, start_time=datetime.now())
+    status = create_status_response(session, 1250)
+    assert status.screentime_id == 3
+    assert status.elapsed_seconds == 1250
+    assert status.alert_level == 1
+
+def test_scheduler_pushes_only_on_stage_change():
+    async def scenario():
+        loads = []
+        # Session is 0.2s away from the 10 minute boundary
+        session = ActiveSession(1, datetime.now() - timedelta(minutes=10) + timedelta(seconds=0.2))
+
+        async def loader(child_id):
+            loads.append(child_id)
+            return session
+
+        scheduler = ScreenTimeAlertScheduler(resync_seconds=0)
+        first = await scheduler.subscribe(1, loader)
+        second = await scheduler.subscribe(1, loader)
+        assert loads == [1]
+
+        initial = await first.get()
+        assert initial.alert_level == 0
+        assert (await second.get()).alert_level == 0
+
+        changed = await asyncio.wait_for(first.get(), timeout=2)
+        assert changed.alert_level == 1
+        assert changed.message == "そろそろ めを やすめようか"
+        assert first.empty()
+
+        scheduler.session_ended(1)
+        ended = await asyncio.wait_for(first.get(), timeout=1)
+        assert ended.is_active is False
+
+        scheduler.unsubscribe(1, first)
+        scheduler.unsubscribe(1, second)
+        assert scheduler.watched_children == 0
+
+    asyncio.run(scenario())
+
+def test_scheduler_picks_up_started_session():
+    async def scenario():
+        async def loader(child_id):
+            return None
+
+        scheduler = ScreenTimeAlertScheduler(resync_seconds=0)
+        queue = await scheduler.subscribe(5, loader)
+        assert (await queue.get()).is_active is False
+
+        scheduler.session_started(5, ActiveSession(9, datetime.now()))
+        started = await asyncio.wait_for(queue.get(), timeout=1)
+        assert started.is_active is True
+        assert started.screentime_id == 9
+        scheduler.unsubscribe(5, queue)
+
+    asyncio.run(scenario())
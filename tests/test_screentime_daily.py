@@ -0,0 +1,63 @@
+import pytest
+from datetime import date, datetime
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app import crud, models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_screentime_daily.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    Base.metadata.drop_all(bind=engine)
+
+def close_session(db, start, end, alert_flag=False):
+    session = models.ScreenTime(child_id=1, start_time=start, end_time=end, alert_flag=alert_flag)
+    db.add(session)
+    crud.add_screentime_to_daily(db, [session])
+    db.commit()
+
+def test_split_by_day():
+    assert crud.split_by_day(datetime(2024, 5, 1, 10, 0), datetime(2024, 5, 1, 10, 30)) == [(date(2024, 5, 1), 1800)]
+    assert crud.split_by_day(datetime(2024, 5, 1, 23, 50), datetime(2024, 5, 3, 0, 5)) == [
+        (date(2024, 5, 1), 600),
+        (date(2024, 5, 2), 86400),
+        (date(2024, 5, 3), 300),
+    ]
+
+def test_sessions_accumulate_per_day(db):
+    close_session(db, datetime(2024, 5, 1, 9, 0), datetime(2024, 5, 1, 9, 20))
+    close_session(db, datetime(2024, 5, 1, 18, 0), datetime(2024, 5, 1, 18, 40), alert_flag=True)
+
+    row = db.get(models.ScreenTimeDaily, (1, date(2024, 5, 1)))
+    assert row.total_seconds == 3600
+    assert row.session_count == 2
+    assert row.alert_count == 1
+
+def test_midnight_crossing_session(db):
+    close_session(db, datetime(2024, 5, 5, 23, 30), datetime(2024, 5, 6, 0, 15), alert_flag=True)
+
+    sunday = db.get(models.ScreenTimeDaily, (1, date(2024, 5, 5)))
+    monday = db.get(models.ScreenTimeDaily, (1, date(2024, 5, 6)))
+    assert (sunday.total_seconds, sunday.session_count, sunday.alert_count) == (1800, 1, 1)
+    assert (monday.total_seconds, monday.session_count, monday.alert_count) == (900, 0, 0)
+
+def test_summary_fills_days_and_groups_weeks(db):
+    close_session(db, datetime(2024, 5, 5, 23, 30), datetime(2024, 5, 6, 0, 15))
+    close_session(db, datetime(2024, 5, 7, 8, 0), datetime(2024, 5, 7, 8, 10))
+
+    summary = crud.get_screentime_summary(db, 1, 4, today=date(2024, 5, 7))
+    assert [d["day"] for d in summary["days"]] == [date(2024, 5, 4), date(2024, 5, 5), date(2024, 5, 6), date(2024, 5, 7)]
+    assert [d["total_minutes"] for d in summary["days"]] == [0, 30, 15, 10]
+    assert [(w["week_start"], w["total_minutes"], w["session_count"]) for w in summary["weeks"]] == [
+        (date(2024, 4, 29), 30, 1),
+        (date(2024, 5, 6), 25, 1),
+    ]
+    assert summary["total_minutes"] == 55
@@ -0,0 +1,114 @@
+import pytest
+from datetime import datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.screentime_heartbeats import flush_heartbeats, heartbeat_buffer
+from app.screentime_registry import screentime_registry
+from app.screentime_sweeper import sweep_abandoned_sessions
+from app import models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_screentime_heartbeats.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_screentime_heartbeats.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    screentime_registry.reset()
+    heartbeat_buffer.reset()
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="heartbeat@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="Heartbeat Child"))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    screentime_registry.reset()
+    heartbeat_buffer.reset()
+    Base.metadata.drop_all(bind=engine)
+
+def test_heartbeats_are_buffered_then_flushed(test_db):
+    screentime_id = client.post("/api/v1/screentime/start", json={"child_id": 1}).json()["screentime_id"]
+    for _ in range(3):
+        response = client.post("/api/v1/screentime/heartbeat", json={"child_id": 1})
+        assert response.status_code == 202
+        assert response.json()["screentime_id"] == screentime_id
+
+    # One pending entry per session, nothing written yet
+    assert len(heartbeat_buffer) == 1
+    assert test_db.get(models.ScreenTime, screentime_id).last_heartbeat_at is None
+
+    assert flush_heartbeats(TestingSessionLocal) == {"flushed": 1}
+    test_db.expire_all()
+    session = test_db.get(models.ScreenTime, screentime_id)
+    assert session.last_heartbeat_at is not None
+    assert session.total_minutes == 1
+    assert session.end_time is None
+    assert heartbeat_buffer.stats()["received"] == 3
+
+def test_flush_on_size_threshold(test_db, monkeypatch):
+    monkeypatch.setattr(heartbeat_buffer, "flush_size", 1)
+    screentime_id = client.post("/api/v1/screentime/start", json={"child_id": 1}).json()["screentime_id"]
+    client.post("/api/v1/screentime/heartbeat", json={"child_id": 1})
+
+    assert len(heartbeat_buffer) == 0
+    assert test_db.get(models.ScreenTime, screentime_id).last_heartbeat_at is not None
+
+def test_heartbeat_without_session(test_db):
+    response = client.post("/api/v1/screentime/heartbeat", json={"child_id": 1})
+    assert response.status_code == 404
+
+def test_beats_for_ended_session_are_dropped(test_db):
+    screentime_id = client.post("/api/v1/screentime/start", json={"child_id": 1}).json()["screentime_id"]
+    client.post("/api/v1/screentime/heartbeat", json={"child_id": 1})
+    client.post("/api/v1/screentime/end", json={"child_id": 1})
+
+    flush_heartbeats(TestingSessionLocal)
+    test_db.expire_all()
+    assert test_db.get(models.ScreenTime, screentime_id).last_heartbeat_at is None
+
+def test_sweeper_closes_at_last_heartbeat(test_db):
+    now = datetime(2024, 5, 10, 12, 0)
+    session = models.ScreenTime(
+        child_id=1,
+        start_time=now - timedelta(minutes=50),
+        last_heartbeat_at=now - timedelta(minutes=15),
+    )
+    test_db.add(session)
+    test_db.commit()
+
+    result = sweep_abandoned_sessions(TestingSessionLocal, now=now, idle_cap_minutes=180, heartbeat_timeout_minutes=10)
+    assert result["swept"] == 1
+    test_db.expire_all()
+    assert session.end_time == now - timedelta(minutes=15)
+    assert session.total_minutes == 35
+    assert session.alert_flag is True
@@ -0,0 +1,136 @@
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.screentime_registry import ensure_fresh, screentime_registry, shard_of, version_name_for
+from app import crud, models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_screentime_registry.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_screentime_registry.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="registry@example.com"))
+    db.add(models.Child(child_id=1, parent_id=1, name="Registry Child"))
+    db.add(models.Child(child_id=2, parent_id=1, name="Other Worker Child"))
+    db.commit()
+    screentime_registry.reset()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    screentime_registry.reset()
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def check_seconds(monkeypatch):
+    def set_interval(seconds):
+        monkeypatch.setattr(screentime_registry, "check_seconds", seconds)
+    return set_interval
+
+def count_queries(func):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def test_status_answered_from_memory(test_db, check_seconds):
+    check_seconds(60)
+    response = client.post("/api/v1/screentime/start", json={"child_id": 1})
+    assert response.status_code == 200
+    screentime_id = response.json()["screentime_id"]
+
+    response, statements = count_queries(lambda: client.get("/api/v1/screentime/status?child_id=1"))
+    assert response.status_code == 200
+    assert response.json()["is_active"] is True
+    assert response.json()["screentime_id"] == screentime_id
+    assert statements == []
+
+def test_picks_up_other_worker_sessions(test_db, check_seconds):
+    check_seconds(0)
+    # Another worker starts a session: row + version bump in one transaction
+    db = TestingSessionLocal()
+    db.add(models.ScreenTime(child_id=2, start_time=datetime.now()))
+    crud.bump_cache_version(db, version_name_for(2))
+    db.commit()
+    db.close()
+
+    response = client.get("/api/v1/screentime/status?child_id=2")
+    assert response.json()["is_active"] is True
+
+def test_other_worker_write_reloads_only_its_shard(test_db, check_seconds):
+    check_seconds(0)
+    ensure_fresh(test_db, force=True)
+    shard_reloads = screentime_registry.stats()["shard_reloads"]
+
+    db = TestingSessionLocal()
+    db.add(models.Child(child_id=3, parent_id=1, name="Third Child"))
+    db.add(models.ScreenTime(child_id=3, start_time=datetime.now()))
+    crud.bump_cache_version(db, version_name_for(3))
+    db.commit()
+    db.close()
+
+    response, statements = count_queries(lambda: client.get("/api/v1/screentime/status?child_id=3"))
+    assert response.json()["is_active"] is True
+    # One query for the version rows, one for the open sessions of the changed shard
+    assert len(statements) == 2
+    assert screentime_registry.stats()["shard_reloads"] == shard_reloads + 1
+    assert screentime_registry.versions[shard_of(3)] == 1
+    # Sessions of other shards are kept as they were
+    assert screentime_registry.get(1) is not None
+    assert screentime_registry.get(2) is not None
+
+def test_end_clears_registry(test_db, check_seconds):
+    check_seconds(60)
+    response = client.post("/api/v1/screentime/end", json={"child_id": 1})
+    assert response.status_code == 200
+    assert response.json()["end_time"] is not None
+
+    response = client.get("/api/v1/screentime/status?child_id=1")
+    assert response.json()["is_active"] is False
+    assert screentime_registry.get(2) is not None
+
+def test_summary_includes_ended_session(test_db):
+    response = client.get("/api/v1/screentime/summary?child_id=1&days=7")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["days"]) == 7
+    assert data["days"][-1]["session_count"] == 1
@@ -0,0 +1,102 @@
+import asyncio
+import pytest
+from datetime import date, datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.background import PeriodicTask
+from app.database import Base
+from app.screentime_registry import ensure_fresh, screentime_registry, shard_of, version_name
+from app.screentime_sweeper import sweep_abandoned_sessions
+from app import crud, models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_screentime_sweeper.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+NOW = datetime(2024, 5, 10, 12, 0)
+
+@pytest.fixture
+def db():
+    Base.metadata.create_all(bind=engine)
+    screentime_registry.reset()
+    db = TestingSessionLocal()
+    yield db
+    db.close()
+    screentime_registry.reset()
+    Base.metadata.drop_all(bind=engine)
+
+def add_session(db, child_id, start, end=None):
+    session = models.ScreenTime(child_id=child_id, start_time=start, end_time=end)
+    db.add(session)
+    db.commit()
+    return session.screentime_id
+
+def test_sweeps_only_sessions_past_idle_cap(db):
+    abandoned = add_session(db, 1, NOW - timedelta(days=2))
+    late_night = add_session(db, 2, datetime(2024, 5, 9, 23, 30))
+    recent = add_session(db, 3, NOW - timedelta(minutes=20))
+    add_session(db, 4, NOW - timedelta(days=1), NOW - timedelta(days=1) + timedelta(minutes=5))
+    ensure_fresh(db, force=True)
+
+    result = sweep_abandoned_sessions(TestingSessionLocal, now=NOW, idle_cap_minutes=60, batch_size=1)
+    assert result["swept"] == 2
+    assert result["batches"] == 2
+
+    db.expire_all()
+    row = db.get(models.ScreenTime, abandoned)
+    assert row.end_time == row.start_time + timedelta(minutes=60)
+    assert row.total_minutes == 60
+    assert row.alert_flag is True
+    assert db.get(models.ScreenTime, recent).end_time is None
+
+    # The rollup is split across midnight like a normal end
+    assert db.get(models.ScreenTimeDaily, (2, date(2024, 5, 9))).total_seconds == 1800
+    assert db.get(models.ScreenTimeDaily, (2, date(2024, 5, 10))).total_seconds == 1800
+    assert db.get(models.ScreenTime, late_night).end_time == datetime(2024, 5, 10, 0, 30)
+
+    assert screentime_registry.get(1) is None
+    assert screentime_registry.get(2) is None
+    assert screentime_registry.get(3) is not None
+    # Our own bumps kept the registry in sync without a reload
+    assert screentime_registry.versions[shard_of(1)] == crud.get_cache_version(db, version_name(shard_of(1)))
+    assert screentime_registry.versions[shard_of(2)] == crud.get_cache_version(db, version_name(shard_of(2)))
+    assert screentime_registry.versions[shard_of(3)] == 0
+
+def test_sweep_without_abandoned_sessions(db):
+    add_session(db, 1, NOW - timedelta(minutes=5))
+    result = sweep_abandoned_sessions(TestingSessionLocal, now=NOW, idle_cap_minutes=60)
+    assert result["swept"] == 0
+    assert crud.get_cache_version(db, version_name(shard_of(1))) == 0
+
+def test_periodic_task_records_runs_and_errors():
+    calls = []
+
+    def work():
+        calls.append(1)
+        if len(calls) == 2:
+            raise RuntimeError("boom")
+        return {"swept": len(calls)}
+
+    async def scenario():
+        task = PeriodicTask("test", work, interval_seconds=0.01)
+        task.start()
+        while task.runs < 3:
+            await asyncio.sleep(0.01)
+        await task.stop()
+        return task
+
+    task = asyncio.run(scenario())
+    stats = task.stats()
+    assert stats["running"] is False
+    assert stats["runs"] >= 3
+    assert stats["errors"] == 1
+    assert stats["last_duration_ms"] is not None
+
+def test_disabled_task_does_not_start():
+    async def scenario():
+        task = PeriodicTask("disabled", lambda: None, interval_seconds=0)
+        task.start()
+        return task.running
+
+    assert asyncio.run(scenario()) is False
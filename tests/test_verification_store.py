@@ -0,0 +1,155 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.main import app
+from app.database import get_db, get_async_db, Base
+from app.redis_client import RedisClient, RedisError
+from app.routers import auth
+from app.verification_store import (
+    DatabaseVerificationStore, MemoryVerificationStore, RedisVerificationStore, VerificationCodeStore,
+)
+from app import models, utils
+from tests.fake_redis import FakeRedisServer
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_verification_store.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+async_engine = create_async_engine("sqlite+aiosqlite:///./test_verification_store.db", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+async def override_get_async_db():
+    async with TestingAsyncSessionLocal() as db:
+        yield db
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    db = TestingSessionLocal()
+    db.add(models.Parent(parent_id=1, email="code@example.com", password_hash=utils.get_password_hash("secret")))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    app.dependency_overrides.pop(get_async_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture(scope="module")
+def redis_server():
+    with FakeRedisServer() as server:
+        yield server
+
+@pytest.fixture(params=["db", "memory", "redis"])
+def store(request, test_db, redis_server):
+    redis = RedisClient(redis_server.url)
+    yield {
+        "db": DatabaseVerificationStore(),
+        "memory": MemoryVerificationStore(),
+        "redis": RedisVerificationStore(redis),
+    }[request.param]
+    redis.close()
+
+def test_code_is_single_use(store, test_db):
+    session_id = utils.generate_session_id()
+    store.save(test_db, "code@example.com", "123456", session_id)
+
+    assert store.verify(test_db, session_id, "000000") is None
+    assert store.verify(test_db, session_id, "123456") == "code@example.com"
+    assert store.verify(test_db, session_id, "123456") is None
+
+def test_db_code_succeeds_once_under_concurrent_verifies(test_db):
+    store = DatabaseVerificationStore()
+    session_id = utils.generate_session_id()
+    store.save(test_db, "race@example.com", "123456", session_id)
+    barrier = threading.Barrier(8)
+
+    def verify():
+        db = TestingSessionLocal()
+        try:
+            barrier.wait()
+            return store.verify(db, session_id, "123456")
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: verify(), range(8)))
+    assert results.count("race@example.com") == 1
+    assert results.count(None) == 7
+
+def test_unknown_session(store, test_db):
+    assert store.verify(test_db, "missing", "123456") is None
+
+def test_store_must_implement_save_and_verify():
+    class SaveOnlyStore(VerificationCodeStore):
+        def save(self, db, email, code, session_id):
+            pass
+
+    with pytest.raises(TypeError):
+        SaveOnlyStore()
+
+def test_memory_code_expires():
+    store = MemoryVerificationStore(ttl_seconds=0.05)
+    store.save(None, "code@example.com", "123456", "s1")
+    time.sleep(0.1)
+    assert store.verify(None, "s1", "123456") is None
+
+def test_redis_keys_expire_and_hold_no_plain_code(redis_server):
+    redis = RedisClient(redis_server.url)
+    RedisVerificationStore(redis, ttl_seconds=300).save(None, "code@example.com", "123456", "s2")
+    value, expires_at = redis_server.data[b"verification:s2"]
+    assert b"123456" not in value
+    assert 299 <= expires_at - time.time() <= 300
+    redis.close()
+
+def test_redis_connections_are_reused(redis_server):
+    redis = RedisClient(redis_server.url)
+    for _ in range(3):
+        assert redis.ping()
+    assert len(redis._idle) == 1
+    with pytest.raises(RedisError):
+        redis.execute("NOPE")
+    # An error reply does not cost the connection
+    assert len(redis._idle) == 1
+    redis.close()
+
+def test_login_flow_with_memory_store(test_db, monkeypatch):
+    monkeypatch.setattr(auth, "verification_store", MemoryVerificationStore())
+    response = client.post("/api/v1/auth/login", json={"email": "code@example.com", "password": "secret"})
+    assert response.status_code == 200
+    body = response.json()
+    assert test_db.query(models.VerificationCode).filter_by(session_id=body["session_id"]).first() is None
+
+    response = client.post("/api/v1/auth/verify-code", json={
+        "session_id": body["session_id"], "verification_code": body["verification_code"],
+    })
+    assert response.status_code == 200
+    assert response.json()["user"]["email"] == "code@example.com"
+
+def test_redis_unavailable_returns_503(test_db, monkeypatch):
+    # Nothing listens on port 1
+    monkeypatch.setattr(auth, "verification_store", RedisVerificationStore(RedisClient("redis://127.0.0.1:1/0")))
+    response = client.post("/api/v1/auth/verify-code", json={"session_id": "s", "verification_code": "123456"})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,146 @@
+import pytest
+from datetime import date, datetime, timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.database import get_db, Base
+from app import models
+
+# Setup Test DB
+SQLALCHEMY_DATABASE_URL = "sqlite:///./test_vision_test.db"
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+client = TestClient(app)
+
+@pytest.fixture(scope="module")
+def test_db():
+    Base.metadata.create_all(bind=engine)
+    previous_override = app.dependency_overrides.get(get_db)
+    app.dependency_overrides[get_db] = override_get_db
+    db = TestingSessionLocal()
+    db.add(models.Child(child_id=1, parent_id=1, name="Vision Child"))
+    db.add(models.Child(child_id=2, parent_id=1, name="Other Child"))
+    start = date(2024, 1, 1)
+    for day in range(5):
+        # Two tests on the same day so the id tie-breaker matters
+        for child_id in (1, 1, 2):
+            db.add(models.EyeTest(child_id=child_id, check_date=start + timedelta(days=day), left_eye=1.0, right_eye=1.0))
+    for n in range(7):
+        db.add(models.MeasurementResult(date=datetime(2024, 1, 1) + timedelta(hours=n // 2), eye="left", distance="3m", visual_acuity=1.0))
+    db.commit()
+
+    yield db
+    db.close()
+    if previous_override:
+        app.dependency_overrides[get_db] = previous_override
+    else:
+        app.dependency_overrides.pop(get_db, None)
+    Base.metadata.drop_all(bind=engine)
+
+def read_all(url):
+    pages = []
+    cursor = None
+    while True:
+        response = client.get(url + (f"&cursor={cursor}" if cursor else ""))
+        assert response.status_code == 200
+        pages.append(response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return pages
+
+def test_eyetests_keyset_pages_for_child(test_db):
+    pages = read_all("/api/eyetests?child_id=1&limit=3")
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+    rows = [row for page in pages for row in page]
+    assert {row["child_id"] for row in rows} == {1}
+    keys = [(row["check_date"], row["test_id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+    assert len(set(keys)) == 10
+
+def test_eyetests_without_filter(test_db):
+    rows = [row for page in read_all("/api/eyetests?limit=4") for row in page]
+    assert len(rows) == 15
+
+def test_results_are_ordered_and_paged(test_db):
+    pages = read_all("/api/results?limit=2")
+    rows = [row for page in pages for row in page]
+    assert len(rows) == 7
+    keys = [(row["date"], row["id"]) for row in rows]
+    assert keys == sorted(keys, reverse=True)
+
+def test_results_with_null_dates_are_paged_last(test_db):
+    for _ in range(3):
+        test_db.add(models.MeasurementResult(date=None, eye="right", distance="30cm", visual_acuity=0.8))
+    test_db.commit()
+
+    # Pages of 2 end on a dated row, then on a NULL-date row
+    pages = read_all("/api/results?limit=2")
+    rows = [row for page in pages for row in page]
+    assert len(rows) == 10
+    assert len({row["id"] for row in rows}) == 10
+    dated = [(row["date"], row["id"]) for row in rows[:7]]
+    assert dated == sorted(dated, reverse=True)
+    assert [row["date"] for row in rows[7:]] == [None, None, None]
+    assert [row["id"] for row in rows[7:]] == sorted((row["id"] for row in rows[7:]), reverse=True)
+
+def test_invalid_cursor(test_db):
+    assert client.get("/api/eyetests?cursor=not-a-cursor").status_code == 400
+
+def inserts_during(func):
+    """Row INSERTs only; the home cache version bump is an upsert into cache_versions"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT") and "cache_versions" not in statement:
+            statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        result = func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return result, statements
+
+def test_bulk_eyetests_with_per_item_status(test_db):
+    items = [
+        {"child_id": 2, "left_eye": 0.8, "right_eye": 0.9, "test_type": "30cm", "check_date": "2024-02-01"},
+        {"child_id": 2, "left_eye": "not a number"},
+        {"child_id": 999, "left_eye": 1.0},
+        {"child_id": 2, "check_date": "2999-01-01"},
+        {"child_id": 2, "right_eye": 1.2},
+    ]
+    response, inserts = inserts_during(lambda: client.post("/api/eyetests/bulk", json={"items": items}))
+    assert response.status_code == 200
+    data = response.json()
+    assert (data["created"], data["failed"]) == (2, 3)
+    assert [r["status"] for r in data["results"]] == ["created", "invalid", "invalid", "invalid", "created"]
+    assert data["results"][1]["errors"][0].startswith("left_eye")
+    assert data["results"][2]["errors"] == ["child_id: Child not found"]
+    assert len(inserts) == 1
+
+    saved = test_db.query(models.EyeTest).filter(models.EyeTest.check_date == date(2024, 2, 1)).one()
+    assert (saved.child_id, saved.test_distance_cm) == (2, 30)
+
+def test_bulk_distance_checks(test_db):
+    items = [
+        {"child_id": 1, "distance_cm": 30, "alert_flag": True, "check_date": "2024-03-01"},
+        {"child_id": 1, "distance_cm": 45, "alert_flag": False},
+        {"child_id": 1, "alert_flag": False},
+    ]
+    response, inserts = inserts_during(lambda: client.post("/api/distance-check/bulk", json={"items": items}))
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()["results"]] == ["created", "created", "invalid"]
+    assert len(inserts) == 1
+    assert test_db.query(models.DistanceCheck).filter(models.DistanceCheck.child_id == 1).count() == 2
+
+def test_bulk_rejects_empty_batch(test_db):
+    assert client.post("/api/eyetests/bulk", json={"items": []}).status_code == 422